@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the manager workflows.
+
+Starts the local stub server, points `CoinglassAPIBase.BASE_URL` at it and measures
+throughput, latency percentiles, peak memory and import time. Results are written to a
+JSON report which can be compared against a previous run with `--compare`.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --latency 0.05 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.stub_server import StubConfig, StubServer  # noqa: E402
+
+IMPORT_TARGETS = [
+    "services.base",
+    "managers.market_data_manager",
+    "managers.liquidation_manager",
+    "managers.indicators_manager",
+    "managers.base",
+]
+
+
+def _workflows() -> Dict[str, Callable[[], Any]]:
+    from managers.base import FundingRateManager, TopPairsManager
+    from managers.liquidation_manager import LiquidationManager
+    from managers.market_data_manager import MarketDataManager
+    from services.funding_rates import OHLCHistoryService
+
+    market_manager = MarketDataManager()
+    liquidation_manager = LiquidationManager()
+    top_pairs_manager = TopPairsManager()
+    funding_rate_manager = FundingRateManager(Service=OHLCHistoryService)
+
+    def funding_rate_sweep():
+        pairs = top_pairs_manager.get_top_pairs(top_n=20)
+        return funding_rate_manager.get_funding_rate(pairs)
+
+    return {
+        "get_market_overview": lambda: market_manager.get_market_overview(top_n=10),
+        "analyze_liquidation_trends": lambda: liquidation_manager.analyze_liquidation_trends("BTC", interval="1h", periods=24),
+        "compare_exchanges": lambda: market_manager.compare_exchanges("BTC"),
+        "funding_rate_sweep": funding_rate_sweep,
+    }
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def measure_workflow(func: Callable[[], Any], iterations: int, concurrency: int, warmup: int = 1) -> Dict[str, Any]:
+    """Run `func` `iterations` times across `concurrency` threads and collect latency statistics"""
+    for _ in range(warmup):
+        try:
+            func()
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    remaining = [iterations]
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception:
+                with lock:
+                    errors += 1
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "throughput_ops_s": iterations / wall_time if wall_time else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+    }
+
+
+def measure_memory(func: Callable[[], Any]) -> Dict[str, Any]:
+    """Peak and retained Python allocations for one call of `func`"""
+    tracemalloc.start()
+    result = error = None
+    try:
+        result = func()
+    except Exception as e:
+        error = str(e)
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    del result
+    return {"peak_kib": peak / 1024, "retained_kib": current / 1024, "error": error}
+
+
+def measure_import_time(modules: List[str], repeats: int = 5) -> Dict[str, float]:
+    """Median cold import time in milliseconds per module, each measured in a fresh interpreter"""
+    results = {}
+    for module in modules:
+        code = (
+            "import time; start = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - start)"
+        )
+        samples = []
+        for _ in range(repeats):
+            output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+            if output.returncode == 0:
+                samples.append(float(output.stdout.strip().splitlines()[-1]))
+        results[module] = statistics.median(samples) * 1000 if samples else None
+    return results
+
+
+def _project_version() -> str:
+    try:
+        with open(os.path.join(ROOT, "pyproject.toml")) as f:
+            for line in f:
+                if line.startswith("version"):
+                    return line.split("=", 1)[1].strip().strip('"')
+    except OSError:
+        pass
+    return "unknown"
+
+
+def _git_revision() -> str:
+    output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return output.stdout.strip() if output.returncode == 0 else "unknown"
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from services.base import CoinglassAPIBase
+
+    config = StubConfig(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                        error_rate=args.error_rate, coins=args.coins, history_length=args.history_length)
+    report: Dict[str, Any] = {
+        "version": _project_version(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "stub_config": vars(config),
+        "workflows": {},
+    }
+
+    original_url = CoinglassAPIBase.BASE_URL
+    with StubServer(config) as server:
+        CoinglassAPIBase.BASE_URL = server.url
+        try:
+            workflows = _workflows()
+            for name, func in workflows.items():
+                if args.only and name not in args.only:
+                    continue
+                server.reset_counters()
+                result = measure_workflow(func, args.iterations, args.concurrency)
+                result["upstream_requests"] = server.request_count
+                result["rate_limited"] = server.rate_limited_count
+                result["injected_errors"] = server.error_count
+                result["memory"] = measure_memory(func)
+                report["workflows"][name] = result
+                print(f"{name:<28} {result['throughput_ops_s']:8.2f} ops/s  "
+                      f"p50 {result['latency_ms']['p50']:8.2f} ms  p95 {result['latency_ms']['p95']:8.2f} ms  "
+                      f"peak {result['memory']['peak_kib']:10.1f} KiB")
+        finally:
+            CoinglassAPIBase.BASE_URL = original_url
+
+    if not args.skip_import:
+        report["import_time_ms"] = measure_import_time(IMPORT_TARGETS)
+        for module, value in report["import_time_ms"].items():
+            print(f"import {module:<34} {value:8.2f} ms" if value is not None else f"import {module:<34} failed")
+    return report
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print relative changes of the headline metrics against a previous report"""
+    def delta(new, old):
+        if not old or new is None:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nComparison against {baseline.get('revision')} ({baseline.get('timestamp')})")
+    for name, result in current["workflows"].items():
+        old = baseline.get("workflows", {}).get(name)
+        if not old:
+            continue
+        print(f"{name:<28} throughput {delta(result['throughput_ops_s'], old['throughput_ops_s']):>8}  "
+              f"p95 {delta(result['latency_ms']['p95'], old['latency_ms']['p95']):>8}  "
+              f"peak memory {delta(result['memory']['peak_kib'], old['memory']['peak_kib']):>8}")
+    for module, value in current.get("import_time_ms", {}).items():
+        old = baseline.get("import_time_ms", {}).get(module)
+        print(f"import {module:<34} {delta(value, old):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark manager workflows against a local stub server")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Stub latency jitter in seconds")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Stub requests per minute (0 disables)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--coins", type=int, default=800, help="Size of the simulated coin universe")
+    parser.add_argument("--history-length", type=int, default=1000, help="Bars returned by history endpoints")
+    parser.add_argument("--only", nargs="*", help="Run only the named workflows")
+    parser.add_argument("--skip-import", action="store_true", help="Skip import time measurement")
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
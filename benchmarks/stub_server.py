@@ -0,0 +1,730 @@
+#!/usr/bin/env python3
+"""Local stub server emulating the CoinGlass v4 endpoints used by the services"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+
+EXCHANGES = ["Binance", "OKX", "Bybit", "Bitget", "Gate", "HTX", "Deribit", "Bitmex", "Kraken", "Coinbase",
+             "Hyperliquid", "dYdX", "MEXC", "BingX", "CoinEx", "Bitfinex", "KuCoin", "Crypto.com", "WhiteBIT", "Bitunix"]
+
+ETF_TICKERS = ["IBIT", "FBTC", "GBTC", "ARKB", "BITB", "HODL", "BRRR", "EZBC", "BTCO", "BTCW", "BTC"]
+
+CHAIN_ASSETS = ["BTC", "ETH", "USDT", "USDC", "SOL"]
+
+# Payloads of these routes depend on the current time and are rebuilt on every request
+LIVE_ROUTES = {"/exchange/chain/tx/list", "/hyperliquid/whale-alert", "/hyperliquid/whale-position",
+               "/onchain/whale-transactions", "/hyperliquid/market-data", "/hyperliquid/orderbook",
+               "/hyperliquid/trades"}
+
+WINDOW_PARAMS = ("start_time", "end_time", "limit")
+
+# Daily indicator histories: time field (`time` in seconds) and value ranges of the fields
+INDICATOR_HISTORIES = {
+    "/index/ahr999": ("date_string", {"average_price": (5000, 90000), "ahr999_value": (0.2, 3.0),
+                                      "current_value": (5000, 100000)}),
+    "/index/bitcoin-net-unrealized-pnl": ("timestamp", {"price": (15000, 110000), "net_unrealized_pnl": (-0.3, 0.8)}),
+    "/index/bitcoin-short-term-holder-sopr": ("timestamp", {"price": (15000, 110000),
+                                                            "short_term_holder_sopr": (0.9, 1.1)}),
+    "/index/bitcoin-long-term-holder-sopr": ("timestamp", {"price": (15000, 110000),
+                                                           "long_term_holder_sopr": (0.5, 3.0)}),
+    "/index/bitcoin-rhodl-ratio": ("timestamp", {"price": (15000, 110000), "rhodl_ratio": (100, 50000)}),
+    "/index/bitcoin-reserve-risk": ("timestamp", {"price": (15000, 110000), "reserve_risk_index": (0.0005, 0.02)}),
+    "/index/altcoin-season-index": ("timestamp", {"altcoin_index": (0, 100), "altcoin_marketcap": (2e11, 1.5e12)}),
+    "/puell-multiple": ("timestamp", {"price": (15000, 110000), "puell_multiple": (0.3, 4.0)}),
+    "/coinbase-premium-index": ("time", {"premium": (-50, 50), "premium_rate": (-0.3, 0.3)}),
+}
+
+# Field names of long/short ratio and taker volume histories
+RATIO_HISTORIES = {
+    "/futures/global-long-short-account-ratio/history": ("global_account_long_percent",
+                                                         "global_account_short_percent",
+                                                         "global_account_long_short_ratio"),
+    "/futures/top-long-short-account-ratio/history": ("top_account_long_percent", "top_account_short_percent",
+                                                      "top_account_long_short_ratio"),
+    "/futures/top-long-short-position-ratio/history": ("top_position_long_percent", "top_position_short_percent",
+                                                       "top_position_long_short_ratio"),
+    "/futures/taker-buy-sell-volume/history": ("taker_buy_volume_usd", "taker_sell_volume_usd"),
+    "/futures/aggregated-taker-buy-sell-volume/history": ("aggregated_buy_volume_usd", "aggregated_sell_volume_usd"),
+}
+
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400,
+    "6h": 21600, "8h": 28800, "12h": 43200, "1d": 86400, "1w": 604800,
+}
+
+
+class StubConfig:
+    """
+    Behaviour knobs for the stub server
+
+    :param latency: Base response latency in seconds.
+    :param jitter: Uniform random latency added on top of `latency`.
+    :param rate_limit: Max requests per minute before answering 429 (0 disables).
+    :param error_rate: Fraction of requests answered with an HTTP 500.
+    :param api_error_rate: Fraction of requests answered 200 with a non-zero `code`.
+    :param coins: Number of coins in the simulated universe.
+    :param history_length: Number of bars returned by history endpoints.
+    :param missing_bar_rate: Fraction of bars left out of history responses without a time window.
+    :param option_expiries: Number of weekly expiries in option strike chains.
+    :param seed: Seed for payload generation and error injection.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit: int = 0,
+                 error_rate: float = 0.0, api_error_rate: float = 0.0, coins: int = 800,
+                 history_length: int = 1000, missing_bar_rate: float = 0.0, option_expiries: int = 12,
+                 seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.api_error_rate = api_error_rate
+        self.coins = coins
+        self.history_length = history_length
+        self.missing_bar_rate = missing_bar_rate
+        self.option_expiries = option_expiries
+        self.seed = seed
+
+
+def _symbols(count: int) -> List[str]:
+    head = ["BTC", "ETH", "SOL", "XRP", "DOGE", "BNB", "ADA", "AVAX", "LINK", "TON", "SUI", "TRX", "DOT", "LTC"]
+    return head[:count] + [f"COIN{i}" for i in range(max(0, count - len(head)))]
+
+
+class PayloadFactory:
+    """Builds realistic, deterministic payloads per (path, params) and caches the encoded bytes"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.symbols = _symbols(config.coins)
+        self._cache: Dict[Tuple[str, Tuple], bytes] = {}
+        self._history_cache: Dict[Tuple[str, Tuple], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.routes: Dict[str, Callable[[Dict[str, str], random.Random], Any]] = {
+            "/futures/supported-coins": self._supported_coins,
+            "/futures/supported-exchange-pairs": self._supported_pairs,
+            "/futures/coins-markets": self._coins_markets,
+            "/futures/pairs-markets": self._pairs_markets,
+            "/spot/coins-markets": self._spot_coins_markets,
+            "/futures/coins-price-change": self._price_change,
+            "/futures/exchange-rank": self._exchange_rank,
+            "/futures/open-interest/exchange-list": self._oi_exchange_list,
+            "/futures/open-interest/exchange-history-chart": self._oi_exchange_chart,
+            "/futures/funding-rate/exchange-list": self._funding_exchange_list,
+            "/futures/funding-rate/accumulated-exchange-list": self._funding_exchange_list,
+            "/futures/liquidation/order": self._liquidation_orders,
+            "/futures/liquidation/coin-list": self._liquidation_coin_list,
+            "/futures/liquidation/exchange-list": self._liquidation_exchange_list,
+            "/hyperliquid/whale-alert": self._whale_alerts,
+            "/hyperliquid/whale-position": self._whale_positions,
+            "/onchain/whale-transactions": self._onchain_whale_transfers,
+            "/hyperliquid/market-data": self._hl_market_data,
+            "/hyperliquid/funding-rates": self._hl_funding,
+            "/hyperliquid/liquidations": self._hl_liquidations,
+            "/hyperliquid/volume": self._hl_volume,
+            "/hyperliquid/open-interest": self._hl_open_interest,
+            "/hyperliquid/orderbook": self._hl_orderbook,
+            "/hyperliquid/trades": self._hl_trades,
+            "/index/fear-greed-history": self._fear_greed,
+            **{path: (lambda params, rng, path=path: self._indicator_history(path, params, rng))
+               for path in INDICATOR_HISTORIES},
+            "/etf/bitcoin/flow-history": self._etf_flows,
+            "/etf/ethereum/flow-history": self._etf_flows,
+            "/hk-etf/bitcoin/flow-history": self._etf_flows,
+            "/hk-etf/ethereum/flow-history": self._etf_flows,
+            "/etf/bitcoin/net-assets/history": self._etf_net_assets,
+            "/etf/ethereum/net-assets/history": self._etf_net_assets,
+            "/etf/bitcoin/premium-discount/history": self._etf_premium,
+            "/etf/ethereum/premium-discount/history": self._etf_premium,
+            "/grayscale/premium/history": self._grayscale_premium,
+            "/exchange/chain/tx/list": self._chain_transfers,
+            "/exchange/balance/list": self._exchange_balances,
+            "/option/max-pain": self._option_max_pain,
+            "/option/oi-by-strike": self._option_strikes,
+            "/option/volume-by-strike": self._option_strikes,
+        }
+
+    def payload(self, path: str, params: Dict[str, str]) -> bytes:
+        key = (path, tuple(sorted(params.items())))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        rng = random.Random(f"{self.config.seed}:{path}:{key[1]}")
+        builder = self.routes.get(path)
+        if builder is None:
+            data = self._windowed_history(path, params) if "history" in path else self._generic_list(rng)
+        else:
+            data = builder(params, rng)
+        body = json.dumps({"code": "0", "msg": "success", "data": data}, separators=(",", ":")).encode()
+        if path not in LIVE_ROUTES:
+            with self._lock:
+                self._cache[key] = body
+        return body
+
+    def _supported_coins(self, params, rng):
+        return self.symbols
+
+    def _supported_pairs(self, params, rng):
+        return {
+            exchange: [
+                {"instrument_id": f"{symbol}USDT", "instrumentId": f"{symbol}USDT",
+                 "baseAsset": symbol, "quoteAsset": "USDT"}
+                for symbol in self.symbols[:rng.randint(50, 300)]
+            ]
+            for exchange in EXCHANGES
+        }
+
+    def _coins_markets(self, params, rng):
+        rows = []
+        for rank, symbol in enumerate(self.symbols):
+            price = rng.uniform(0.01, 100000) / (rank + 1)
+            rows.append({
+                "symbol": symbol,
+                "current_price": price,
+                "avg_funding_rate_by_oi": rng.uniform(-0.05, 0.05),
+                "avg_funding_rate_by_vol": rng.uniform(-0.05, 0.05),
+                "market_cap_usd": rng.uniform(1e6, 1e12) / (rank + 1),
+                "open_interest_market_cap_ratio": rng.random(),
+                "open_interest_volume_ratio": rng.random() * 3,
+                "open_interest_usd": rng.uniform(1e5, 5e10) / (rank + 1),
+                "open_interest_quantity": rng.uniform(1e3, 1e9),
+                "open_interest_change_percent_5m": rng.uniform(-2, 2),
+                "open_interest_change_percent_15m": rng.uniform(-3, 3),
+                "open_interest_change_percent_30m": rng.uniform(-4, 4),
+                "open_interest_change_percent_1h": rng.uniform(-5, 5),
+                "open_interest_change_percent_4h": rng.uniform(-8, 8),
+                "open_interest_change_percent_24h": rng.uniform(-20, 20),
+                "volume_usd_24h": rng.uniform(1e5, 1e11) / (rank + 1),
+                "volume_change_percent_24h": rng.uniform(-50, 50),
+                "price_change_percent_24h": rng.uniform(-15, 15),
+                "price_change_percent_1h": rng.uniform(-3, 3),
+                "price_change_percent_4h": rng.uniform(-6, 6),
+                "long_short_ratio_24h": rng.uniform(0.5, 2),
+                "liquidation_usd_24h": rng.uniform(0, 1e8),
+                "long_liquidation_usd_24h": rng.uniform(0, 5e7),
+                "short_liquidation_usd_24h": rng.uniform(0, 5e7),
+            })
+        return rows
+
+    def _pairs_markets(self, params, rng):
+        rows = []
+        for exchange in EXCHANGES:
+            for symbol in self.symbols[:rng.randint(40, 200)]:
+                rows.append({
+                    "instrument_id": f"{symbol}USDT",
+                    "exchange_name": exchange,
+                    "symbol": f"{symbol}/USDT",
+                    "current_price": rng.uniform(0.01, 100000),
+                    "index_price": rng.uniform(0.01, 100000),
+                    "price_change_percent_24h": rng.uniform(-15, 15),
+                    "volume_usd": rng.uniform(1e4, 1e10),
+                    "volume_usd_change_percent_24h": rng.uniform(-50, 50),
+                    "long_volume_usd": rng.uniform(1e4, 5e9),
+                    "short_volume_usd": rng.uniform(1e4, 5e9),
+                    "open_interest_usd": rng.uniform(1e4, 1e10),
+                    "open_interest_quantity": rng.uniform(1e2, 1e8),
+                    "open_interest_change_percent_24h": rng.uniform(-20, 20),
+                    "long_liquidation_usd_24h": rng.uniform(0, 1e7),
+                    "short_liquidation_usd_24h": rng.uniform(0, 1e7),
+                    "funding_rate": rng.uniform(-0.05, 0.05),
+                    "next_funding_time": 1700000000000,
+                })
+        return rows
+
+    def _spot_coins_markets(self, params, rng):
+        # Spot prices track the futures universe with a small basis; some coins have no spot market
+        futures = self._coins_markets({}, random.Random(f"{self.config.seed}:/futures/coins-markets:()"))
+        rows = []
+        for row in futures:
+            if row["symbol"] not in ("BTC", "ETH") and rng.random() < 0.1:
+                continue
+            volume = row["volume_usd_24h"] * rng.uniform(0.1, 0.8)
+            buy = volume * rng.uniform(0.4, 0.6)
+            rows.append({
+                "symbol": row["symbol"],
+                "current_price": row["current_price"] * (1 - rng.uniform(-0.002, 0.004)),
+                "market_cap_usd": row["market_cap_usd"],
+                "price_change_percent_24h": row["price_change_percent_24h"] + rng.uniform(-0.5, 0.5),
+                "volume_usd_24h": volume,
+                "buy_volume_usd_24h": buy,
+                "sell_volume_usd_24h": volume - buy,
+                "volume_flow_usd_24h": 2 * buy - volume,
+            })
+        return rows
+
+    def _price_change(self, params, rng):
+        return [
+            {"symbol": symbol, "current_price": rng.uniform(0.01, 100000),
+             **{f"price_change_percent_{period}": rng.uniform(-20, 20) for period in ("5m", "15m", "30m", "1h", "4h", "12h", "24h")},
+             **{f"price_amplitude_percent_{period}": rng.uniform(0, 20) for period in ("5m", "15m", "30m", "1h", "4h", "12h", "24h")}}
+            for symbol in self.symbols
+        ]
+
+    def _exchange_rank(self, params, rng):
+        return [
+            {"exchange": exchange, "open_interest_usd": rng.uniform(1e8, 5e10), "volume_usd": rng.uniform(1e8, 1e11),
+             "liquidation_usd_24h": rng.uniform(1e5, 1e9)}
+            for exchange in EXCHANGES
+        ]
+
+    def _oi_exchange_list(self, params, rng):
+        return [
+            {"exchange": exchange, "symbol": params.get("symbol", "BTC"), "open_interest_usd": total,
+             "open_interest_quantity": rng.uniform(1e2, 1e6), "open_interest_by_stable_coin_margin": total * rng.uniform(0.5, 0.95),
+             "open_interest_quantity_by_coin_margin": rng.uniform(0, 1e5), "open_interest_change_percent_1h": rng.uniform(-5, 5),
+             "open_interest_change_percent_24h": rng.uniform(-20, 20)}
+            for exchange, total in zip(["All"] + EXCHANGES, (rng.uniform(1e6, 2e10) for _ in range(len(EXCHANGES) + 1)))
+        ]
+
+    def _oi_exchange_chart(self, params, rng):
+        step = INTERVAL_SECONDS.get(params.get("range", "4h"), 14400) * 1000
+        end = int(time.time() * 1000) // step * step
+        length = min(self.config.history_length, 500)
+        price = rng.uniform(1, 100000)
+        prices, levels = [], {exchange: rng.uniform(1e7, 1e10) for exchange in EXCHANGES[:12]}
+        data_map: Dict[str, List[float]] = {exchange: [] for exchange in levels}
+        for _ in range(length):
+            price *= 1 + rng.gauss(0, 0.01)
+            prices.append(round(price, 6))
+            for exchange in levels:
+                levels[exchange] *= 1 + rng.gauss(0, 0.02)
+                data_map[exchange].append(round(levels[exchange], 2))
+        return {"time_list": [end - (length - 1 - i) * step for i in range(length)], "price_list": prices,
+                "data_map": data_map}
+
+    def _funding_exchange_list(self, params, rng):
+        symbols = [params["symbol"]] if params.get("symbol") else self.symbols
+        return [
+            {"symbol": symbol,
+             "stablecoin_margin_list": [
+                 {"exchange": exchange, "funding_rate": rng.uniform(-0.05, 0.05),
+                  "funding_rate_interval": rng.choice((1, 4, 8)), "next_funding_time": 1700000000000}
+                 for exchange in EXCHANGES if rng.random() > 0.2],
+             "token_margin_list": [
+                 {"exchange": exchange, "funding_rate": rng.uniform(-0.05, 0.05),
+                  "funding_rate_interval": 8, "next_funding_time": 1700000000000}
+                 for exchange in EXCHANGES[:5] if rng.random() > 0.5]}
+            for symbol in symbols
+        ]
+
+    def _liquidation_orders(self, params, rng):
+        now = int(time.time() * 1000)
+        return [
+            {"exchange_name": rng.choice(EXCHANGES), "symbol": rng.choice(self.symbols[:50]) + "USDT",
+             "base_asset": "", "price": rng.uniform(0.01, 100000), "usd_value": rng.uniform(1e4, 5e6),
+             "side": rng.choice((1, 2)), "time": now - i * 1000}
+            for i in range(200)
+        ]
+
+    def _liquidation_coin_list(self, params, rng):
+        return [{"symbol": symbol, "liquidation_usd_24h": rng.uniform(0, 1e8)} for symbol in self.symbols]
+
+    def _liquidation_exchange_list(self, params, rng):
+        return [{"exchange": exchange, "liquidation_usd": rng.uniform(0, 1e8)} for exchange in EXCHANGES]
+
+    def _whale_alerts(self, params, rng):
+        # One alert every 5s, identical across calls, newest first
+        now = int(time.time() * 1000)
+        rows = []
+        for slot in range(now // 5000, now // 5000 - 100, -1):
+            slot_rng = random.Random(f"{self.config.seed}:whale-alert:{slot}")
+            rows.append({"user": f"0x{slot_rng.getrandbits(160):040x}", "symbol": slot_rng.choice(self.symbols[:30]),
+                         "position_size": slot_rng.uniform(-1e4, 1e4), "entry_price": slot_rng.uniform(1, 100000),
+                         "liq_price": slot_rng.uniform(1, 100000), "position_value_usd": slot_rng.uniform(1e6, 1e8),
+                         "position_action": slot_rng.choice((1, 2)), "create_time": slot * 5000})
+        return rows
+
+    def _whale_positions(self, params, rng):
+        # A fixed set of whales whose sizes drift every 30s
+        now = int(time.time() * 1000)
+        slot = now // 30000
+        rows = []
+        for i in range(200):
+            whale = random.Random(f"{self.config.seed}:whale:{i}")
+            drift = random.Random(f"{self.config.seed}:whale:{i}:{slot}")
+            size = whale.uniform(-1e4, 1e4) * (1 + (drift.uniform(-0.2, 0.2) if drift.random() < 0.1 else 0))
+            mark = whale.uniform(1, 100000)
+            rows.append({"user": f"0x{whale.getrandbits(160):040x}", "symbol": whale.choice(self.symbols[:30]),
+                         "position_size": size, "entry_price": whale.uniform(1, 100000), "mark_price": mark,
+                         "liq_price": whale.uniform(1, 100000), "leverage": whale.randint(1, 50),
+                         "margin_balance": whale.uniform(1e5, 1e7), "position_value_usd": abs(size) * mark,
+                         "unrealized_pnl": whale.uniform(-1e6, 1e6), "funding_fee": whale.uniform(-1e4, 1e4),
+                         "margin_mode": "cross", "create_time": now - i * 60000, "update_time": slot * 30000})
+        return rows
+
+    def _onchain_whale_transfers(self, params, rng):
+        # One transfer every 15s, identical across calls, newest first
+        now = int(time.time() * 1000)
+        chain = params.get("chain", "BTC")
+        rows = []
+        for slot in range(now // 15000, now // 15000 - 100, -1):
+            slot_rng = random.Random(f"{self.config.seed}:whale-tx:{chain}:{slot}")
+            rows.append({"transaction_hash": f"0x{slot_rng.getrandbits(256):064x}", "chain": chain,
+                         "symbol": chain, "from_address": f"0x{slot_rng.getrandbits(160):040x}",
+                         "to_address": f"0x{slot_rng.getrandbits(160):040x}",
+                         "amount": slot_rng.uniform(10, 5000), "amount_usd": slot_rng.uniform(1e6, 3e8),
+                         "from_label": slot_rng.choice(("", "Binance", "Coinbase")),
+                         "to_label": slot_rng.choice(("", "OKX", "Kraken")), "time": slot * 15000})
+        return rows
+
+    def _fear_greed(self, params, rng):
+        length = self.config.history_length
+        return {"data_list": [rng.uniform(0, 100) for _ in range(length)],
+                "price_list": [rng.uniform(20000, 100000) for _ in range(length)],
+                "time_list": self._days()}
+
+    def _indicator_history(self, path, params, rng):
+        time_field, fields = INDICATOR_HISTORIES[path]
+        levels = {field: rng.random() for field in fields}
+        rows = []
+        for day in self._days():
+            if time_field == "date_string":
+                row = {time_field: datetime.fromtimestamp(day / 1000, timezone.utc).strftime("%Y/%m/%d")}
+            else:
+                row = {time_field: day // 1000 if time_field == "time" else day}
+            for field, (low, high) in fields.items():
+                levels[field] = min(1.0, max(0.0, levels[field] + rng.gauss(0, 0.03)))
+                row[field] = round(low + (high - low) * levels[field], 6)
+            rows.append(row)
+        return rows
+
+    def _chain_transfers(self, params, rng):
+        # One transfer per exchange every 20s, identical across calls, newest first
+        exchange = params.get("exchange", "Binance")
+        now = int(time.time() * 1000)
+        start = max(int(params.get("start_time", 0)), now - 3600000)
+        per_page = int(params.get("per_page", 100))
+        page = int(params.get("page", 1))
+        rows = []
+        for slot in range(now // 20000, start // 20000 - 1, -1):
+            slot_rng = random.Random(f"{self.config.seed}:{exchange}:{slot}")
+            asset = slot_rng.choice(CHAIN_ASSETS)
+            tx_time = slot * 20000 + slot_rng.randrange(20000)
+            if not start <= tx_time <= now or params.get("symbol") not in (None, asset):
+                continue
+            price = {"BTC": 60000.0, "ETH": 3000.0, "SOL": 150.0}.get(asset, 1.0)
+            quantity = slot_rng.uniform(1e3, 5e6) / price
+            rows.append({"transaction_hash": f"0x{slot_rng.getrandbits(256):064x}", "asset_symbol": asset,
+                         "amount_usd": quantity * price, "asset_quantity": quantity, "exchange_name": exchange,
+                         "transfer_type": slot_rng.choice((1, 1, 2, 2, 3)), "transaction_time": tx_time,
+                         "from_address": f"0x{slot_rng.getrandbits(160):040x}",
+                         "to_address": f"0x{slot_rng.getrandbits(160):040x}"})
+        return rows[(page - 1) * per_page:page * per_page]
+
+    def _exchange_balances(self, params, rng):
+        return [{"exchange_name": exchange, "total_balance": rng.uniform(1e3, 1e6),
+                 "balance_change_1d": rng.uniform(-1e3, 1e3), "balance_change_percent_1d": rng.uniform(-2, 2)}
+                for exchange in EXCHANGES]
+
+    def _hl_mid(self, symbol: str, slot: int) -> float:
+        base = random.Random(f"{self.config.seed}:hl:{symbol}").uniform(1, 100000)
+        return base * (1 + random.Random(f"{self.config.seed}:hl:{symbol}:{slot}").uniform(-0.002, 0.002))
+
+    def _hl_symbols(self, params) -> List[str]:
+        return [params["symbol"]] if params.get("symbol") else self.symbols[:150]
+
+    def _hl_market_data(self, params, rng):
+        slot = int(time.time())
+        return [{"symbol": symbol, "mark_price": self._hl_mid(symbol, slot), "index_price": self._hl_mid(symbol, slot - 1),
+                 "price_change_percent_24h": rng.uniform(-10, 10), "volume_usd_24h": rng.uniform(1e5, 1e9),
+                 "open_interest_usd": rng.uniform(1e5, 5e9)} for symbol in self._hl_symbols(params)]
+
+    def _hl_funding(self, params, rng):
+        return [{"symbol": symbol, "funding_rate": rng.uniform(-0.01, 0.01), "next_funding_time": 1700000000000}
+                for symbol in self._hl_symbols(params)]
+
+    def _hl_liquidations(self, params, rng):
+        return [{"symbol": symbol, "long_liquidation_usd": rng.uniform(0, 1e7), "short_liquidation_usd": rng.uniform(0, 1e7)}
+                for symbol in self._hl_symbols(params)]
+
+    def _hl_volume(self, params, rng):
+        return [{"symbol": symbol, "volume_usd": rng.uniform(1e5, 1e9)} for symbol in self._hl_symbols(params)]
+
+    def _hl_open_interest(self, params, rng):
+        return {"symbol": params.get("symbol", "BTC"), "open_interest_usd": rng.uniform(1e6, 5e9),
+                "open_interest_quantity": rng.uniform(1e2, 1e6)}
+
+    def _hl_orderbook(self, params, rng):
+        symbol = params.get("symbol", "BTC")
+        slot = int(time.time())
+        mid = self._hl_mid(symbol, slot)
+        depth = int(params.get("depth", 20))
+        tick = mid * 0.0001
+        levels = random.Random(f"{self.config.seed}:hl-book:{symbol}:{slot}")
+        return {"symbol": symbol, "time": slot * 1000,
+                "bids": [[round(mid - (i + 1) * tick, 6), round(levels.uniform(0.1, 50), 4)] for i in range(depth)],
+                "asks": [[round(mid + (i + 1) * tick, 6), round(levels.uniform(0.1, 50), 4)] for i in range(depth)]}
+
+    def _hl_trades(self, params, rng):
+        # One trade every 250ms per symbol, identical across calls, newest first
+        symbol = params.get("symbol", "BTC")
+        now = int(time.time() * 1000)
+        rows = []
+        for slot in range(now // 250, now // 250 - int(params.get("limit", 100)), -1):
+            trade = random.Random(f"{self.config.seed}:hl-trade:{symbol}:{slot}")
+            rows.append({"tid": slot, "price": self._hl_mid(symbol, slot // 4) * (1 + trade.uniform(-1e-4, 1e-4)),
+                         "size": trade.uniform(0.01, 10), "side": trade.choice(("buy", "sell")), "time": slot * 250})
+        return rows
+
+    def _days(self) -> List[int]:
+        today = int(time.time() // 86400) * 86400000
+        return [today - (self.config.history_length - i) * 86400000 for i in range(self.config.history_length)]
+
+    @staticmethod
+    def _since(rows: List[Dict[str, Any]], params: Dict[str, str], field: str = "timestamp") -> List[Dict[str, Any]]:
+        """Rows at or after `start_time`, generated over the full history so every window agrees"""
+        start = int(params.get("start_time", 0))
+        return [row for row in rows if row[field] >= start]
+
+    def _etf_flows(self, params, rng):
+        rows = []
+        for day in self._days():
+            flows = [{"etf_ticker": ticker, "flow_usd": rng.gauss(0, 5e7)} for ticker in ETF_TICKERS]
+            rows.append({"timestamp": day, "flow_usd": sum(f["flow_usd"] for f in flows),
+                         "price_usd": rng.uniform(20000, 100000), "etf_flows": flows})
+        return self._since(rows, params)
+
+    def _etf_net_assets(self, params, rng):
+        assets = 3e10
+        rows = []
+        for day in self._days():
+            change = rng.gauss(0, 3e8)
+            assets += change
+            rows.append({"timestamp": day, "net_assets_usd": assets, "change_usd": change,
+                         "price_usd": rng.uniform(20000, 100000)})
+        return self._since(rows, params)
+
+    def _etf_premium(self, params, rng):
+        return self._since([{"timestamp": day, "list": [{"ticker": ticker,
+                                                         "premium_discount_percent": rng.gauss(0, 0.3),
+                                                         "nav_usd": rng.uniform(20, 60)} for ticker in ETF_TICKERS]}
+                            for day in self._days()], params)
+
+    def _grayscale_premium(self, params, rng):
+        rows = [{"time": day, "premium_rate": rng.gauss(-5, 3), "secondary_market_price": rng.uniform(10, 60)}
+                for day in self._days()]
+        return self._since(rows, params, "time")
+
+    def _option_expiries(self) -> List[str]:
+        day = datetime.now(timezone.utc).date()
+        fridays = [day + timedelta(days=(4 - day.weekday()) % 7 + 7 * week) for week in range(self.config.option_expiries)]
+        return [d.strftime("%d%b%y").upper() for d in fridays]
+
+    def _option_max_pain(self, params, rng):
+        spot = {"BTC": 60000.0, "ETH": 3000.0}.get(params.get("symbol", "BTC"), 100.0)
+        return [{"date": expiry, "max_pain_price": round(spot * rng.uniform(0.9, 1.1), 2),
+                 "call_open_interest": rng.uniform(1e3, 5e4), "put_open_interest": rng.uniform(1e3, 5e4)}
+                for expiry in self._option_expiries()]
+
+    def _option_strikes(self, params, rng):
+        spot = {"BTC": 60000.0, "ETH": 3000.0}.get(params.get("symbol", "BTC"), 100.0)
+        expiries = self._option_expiries()
+        if params.get("expiry"):
+            expiries = [e for e in expiries if e == params["expiry"]]
+        step = spot / 40
+        rows = []
+        for expiry in expiries:
+            for i in range(-20, 21):
+                strike = round(spot + i * step, 2)
+                smile = 0.55 + 0.0004 * i * i - 0.004 * i
+                rows.append({"expiry": expiry, "strike": strike, "underlying_price": spot,
+                             "call_open_interest": rng.uniform(0, 2000) / (1 + abs(i) / 5),
+                             "put_open_interest": rng.uniform(0, 2000) / (1 + abs(i) / 5),
+                             "call_volume": rng.uniform(0, 500), "put_volume": rng.uniform(0, 500),
+                             "call_iv": round(smile * 100 - 1, 2), "put_iv": round(smile * 100 + 1, 2)})
+        return rows
+
+    def _windowed_history(self, path: str, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """History bars honouring start_time/end_time/limit, consistent across windows of one series"""
+        base = {k: v for k, v in params.items() if k not in WINDOW_PARAMS}
+        key = (path, tuple(sorted(base.items())))
+        with self._lock:
+            rows = self._history_cache.get(key)
+        if rows is None:
+            rng = random.Random(f"{self.config.seed}:{path}:{key[1]}")
+            if path in RATIO_HISTORIES:
+                rows = self._ratio_history(RATIO_HISTORIES[path], base, rng)
+            else:
+                rows = self._history(base, rng)
+            with self._lock:
+                self._history_cache[key] = rows
+        if not any(k in params for k in WINDOW_PARAMS):
+            if self.config.missing_bar_rate:
+                drop = random.Random(f"{self.config.seed}:missing:{key}")
+                rows = [row for row in rows if drop.random() >= self.config.missing_bar_rate]
+            return rows
+        start = int(params.get("start_time", 0))
+        end = int(params.get("end_time", 2 ** 62))
+        window = [row for row in rows if start <= row["time"] <= end]
+        if "limit" in params:
+            window = window[-int(params["limit"]):]
+        return window
+
+    def _history(self, params, rng):
+        step = INTERVAL_SECONDS.get(params.get("interval", "1h"), 3600) * 1000
+        end = int(time.time() * 1000) // step * step
+        length = self.config.history_length
+        price = rng.uniform(1, 100000)
+        rows = []
+        for i in range(length):
+            open_price = price
+            price = max(0.0001, price * (1 + rng.gauss(0, 0.01)))
+            rows.append({
+                "time": end - (length - 1 - i) * step,
+                "open": f"{open_price:.6f}", "high": f"{max(open_price, price) * 1.005:.6f}",
+                "low": f"{min(open_price, price) * 0.995:.6f}", "close": f"{price:.6f}",
+                "volume_usd": f"{rng.uniform(1e5, 1e9):.2f}",
+                "long_liquidation_usd": f"{rng.uniform(0, 5e7):.2f}",
+                "short_liquidation_usd": f"{rng.uniform(0, 5e7):.2f}",
+            })
+        return rows
+
+    def _ratio_history(self, fields, params, rng):
+        step = INTERVAL_SECONDS.get(params.get("interval", "1h"), 3600) * 1000
+        end = int(time.time() * 1000) // step * step
+        length = self.config.history_length
+        long = rng.uniform(40, 60)
+        rows = []
+        for i in range(length):
+            long = min(80.0, max(20.0, long + rng.gauss(0, 1.5)))
+            row = {"time": end - (length - 1 - i) * step}
+            if len(fields) == 3:
+                row.update(zip(fields, (round(long, 2), round(100 - long, 2), round(long / (100 - long), 4))))
+            else:
+                volume = rng.uniform(1e6, 1e9)
+                row.update(zip(fields, (round(volume * long / 100, 2), round(volume * (100 - long) / 100, 2))))
+            rows.append(row)
+        return rows
+
+    def _generic_list(self, rng):
+        return [{"symbol": symbol, "value": rng.random()} for symbol in self.symbols[:100]]
+
+
+class StubServer:
+    """
+    Threaded HTTP server serving `/api/<v4 path>` with configurable latency, rate limits
+    and error injection. Usable as a context manager.
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.factory = PayloadFactory(self.config)
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.error_count = 0
+        self._window: deque = deque()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.request_count = 0
+            self.rate_limited_count = 0
+            self.error_count = 0
+
+    def _admit(self) -> Tuple[int, Optional[bytes]]:
+        """Apply rate limiting and error injection; returns (status, body) overrides"""
+        config = self.config
+        with self._lock:
+            self.request_count += 1
+            if config.rate_limit:
+                now = time.monotonic()
+                while self._window and now - self._window[0] > 60:
+                    self._window.popleft()
+                if len(self._window) >= config.rate_limit:
+                    self.rate_limited_count += 1
+                    return 429, json.dumps({"code": "429", "msg": "Too Many Requests"}).encode()
+                self._window.append(now)
+            roll = self._rng.random()
+        if roll < config.error_rate:
+            self.error_count += 1
+            return 500, json.dumps({"code": "500", "msg": "Internal Server Error"}).encode()
+        if roll < config.error_rate + config.api_error_rate:
+            self.error_count += 1
+            return 200, json.dumps({"code": "50001", "msg": "Injected API error", "data": None}).encode()
+        return 200, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                path = parts.path[4:] if parts.path.startswith("/api") else parts.path
+                params = dict(parse_qsl(parts.query))
+
+                config = server.config
+                delay = config.latency + (server._rng.random() * config.jitter if config.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+
+                status, body = server._admit()
+                if body is None:
+                    body = server.factory.payload(path, params)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local CoinGlass v4 stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--coins", type=int, default=800)
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                        error_rate=args.error_rate, coins=args.coins)
+    server = StubServer(config, port=args.port)
+    print(f"Serving CoinGlass stub on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
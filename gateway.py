@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Local caching gateway exposing the CoinGlass v4 API and the manager aggregations over HTTP.
+
+Internal services point their `CoinglassAPIBase.BASE_URL` (or any HTTP client) at the
+gateway instead of the real API, so a single upstream key and quota serves the whole fleet:
+
+    python gateway.py --port 8080
+    curl 'http://localhost:8080/api/futures/coins-markets'
+    curl 'http://localhost:8080/manager/market-overview?top_n=10'
+
+`/api/<path>` is proxied to the same v4 path upstream. History windows already stored in
+a local `HistoryArchive` are answered from the archive instead. Encoded responses are kept
+in one response cache, and concurrent identical requests are coalesced into one upstream
+call. The manager aggregations are exposed under `/manager/`.
+"""
+
+import argparse
+import json
+import operator
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from managers.liquidation_manager import LiquidationManager
+from managers.market_data_manager import MarketDataManager
+from services.base import CoinglassAPIBase
+from services.cache import ResponseCache
+from services.transport import request_key
+from storage.archive import DATASETS, HistoryArchive
+
+
+# v4 history endpoint -> archive dataset name
+ARCHIVED_ENDPOINTS = {dataset.endpoint: name for name, dataset in DATASETS.items()}
+
+
+class QueryError(ValueError):
+    """Invalid query parameter of a gateway request (answered with status 400)"""
+
+
+class PassthroughService(CoinglassAPIBase):
+    """Service forwarding an arbitrary v4 path, used by the gateway proxy"""
+
+    # The gateway caches encoded responses itself; never add a second layer underneath
+    cache = None
+
+    def fetch_data(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._make_request(path, params or None)
+
+
+def _uncached(manager: Any) -> Any:
+    """Detach every service a manager holds from any response cache, leaving the class-wide default alone"""
+    for value in vars(manager).values():
+        if isinstance(value, CoinglassAPIBase):
+            value.cache = None
+    return manager
+
+
+def _error(result: Any) -> Optional[str]:
+    """Error message of a manager result that reports a failure (`{"error": ...}` or `[{"error": ...}]`)"""
+    if isinstance(result, list) and len(result) == 1:
+        result = result[0]
+    if isinstance(result, dict) and result.get("error"):
+        return str(result["error"])
+    return None
+
+
+def _int(params: Dict[str, str], name: str, default: int) -> int:
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise QueryError(f"Query parameter '{name}' must be an integer")
+
+
+class Gateway:
+    """
+    Request handling independent of the HTTP server, so it can be embedded elsewhere
+
+    The gateway's services run uncached: `cache` is the only layer, holding (status,
+    encoded body, cacheable) per request, so a response is never older than its TTL.
+
+    :param cache: Cache of encoded responses; other services are unaffected.
+    :param manager_ttl: Seconds an aggregation result stays fresh.
+    :param archive: Local history archive answering stored history windows.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, manager_ttl: float = 15.0,
+                 archive: Optional[HistoryArchive] = None):
+        self.cache = cache or ResponseCache()
+        self.manager_ttl = manager_ttl
+        self.archive = archive
+        self.passthrough = PassthroughService()
+        self.market_manager = _uncached(MarketDataManager())
+        self.liquidation_manager = _uncached(LiquidationManager())
+        self.started = time.time()
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self.routes: Dict[str, Callable[[Dict[str, str]], Any]] = {
+            "/manager/market-overview": lambda p: self.market_manager.get_market_overview(top_n=_int(p, "top_n", 10)),
+            "/manager/compare-exchanges": lambda p: self.market_manager.compare_exchanges(p.get("symbol", "BTC")),
+            "/manager/liquidation-trends": lambda p: self.liquidation_manager.analyze_liquidation_trends(
+                p.get("symbol", "BTC"), interval=p.get("interval", "1h"), periods=_int(p, "periods", 24)),
+            "/manager/coin-analysis": lambda p: self.market_manager.get_coin_analysis(p.get("symbol", "BTC")),
+        }
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, bytes, str]:
+        """Resolve a GET request to (status, body, cache status)"""
+        with self._lock:
+            self.requests_served += 1
+
+        if path == "/healthz":
+            return 200, b'{"status":"ok"}', "none"
+        if path == "/stats":
+            return 200, self._encode(self.stats()), "none"
+
+        if path.startswith("/api/"):
+            endpoint = path[4:]
+            ttl = self.cache.ttl_for(endpoint)
+            produce = lambda: self._archived(endpoint, params) or self._proxy(endpoint, params)
+        elif path in self.routes:
+            ttl = self.manager_ttl
+            route = self.routes[path]
+            produce = lambda: self._aggregate(route, params)
+        else:
+            return 404, self._encode({"code": "404", "msg": f"Unknown path {path}"}), "none"
+
+        try:
+            (code, body, _), status = self.cache.get_or_fetch(request_key(path, params), produce, ttl,
+                                                              cacheable=operator.itemgetter(2))
+        except requests.HTTPError as e:
+            upstream = getattr(e.response, "status_code", 502)
+            return upstream, self._encode({"code": str(upstream), "msg": str(e)}), "error"
+        except QueryError as e:
+            return 400, self._encode({"code": "400", "msg": str(e)}), "error"
+        except Exception as e:
+            return 502, self._encode({"code": "502", "msg": f"Upstream request failed: {e}"}), "error"
+        return code, body, status if code == 200 else "error"
+
+    def _archived(self, endpoint: str, params: Dict[str, str]) -> Optional[Tuple[int, bytes, bool]]:
+        """
+        Answer a history request from the archive when the stored series covers its window
+
+        Only windows bounded by `end_time` and ending at or before the last stored bar are
+        served, so requests for the latest bars still go upstream.
+        """
+        dataset = ARCHIVED_ENDPOINTS.get(endpoint)
+        if self.archive is None or dataset is None or "end_time" not in params \
+                or not set(params) <= {"symbol", "interval", "start_time", "end_time", "limit"}:
+            return None
+        symbol, interval = params.get("symbol"), params.get("interval", "1h")
+        if not symbol or not self.archive.exists(dataset, symbol, interval):
+            return None
+        start = _int(params, "start_time", 0) if "start_time" in params else None
+        end = _int(params, "end_time", 0)
+        limit = _int(params, "limit", 0) if "limit" in params else None
+        with self.archive.reader(dataset, symbol, interval) as reader:
+            if not len(reader) or end > reader.last_time or (start is not None and start < reader.first_time):
+                return None
+            batch = reader.range(start, end + 1)
+            if start is None and (limit is None or len(batch) < limit):
+                return None             # the window may reach back before the stored history
+            records = batch.to_records()
+            del batch
+        if limit is not None:
+            records = records[-limit:] if limit > 0 else []
+        for record in records:
+            for name, value in record.items():
+                if value != value:
+                    record[name] = None
+        return 200, self._encode({"code": "0", "msg": "success", "data": records}), True
+
+    def _proxy(self, endpoint: str, params: Dict[str, str]) -> Tuple[int, bytes, bool]:
+        # Upstream errors come back as HTTP 200 with a non-zero body code; they are relayed but not cached
+        payload = self.passthrough.fetch_data(endpoint, params)
+        return 200, self._encode(payload), isinstance(payload, dict) and str(payload.get("code")) == "0"
+
+    def _aggregate(self, route: Callable[[Dict[str, str]], Any], params: Dict[str, str]) -> Tuple[int, bytes, bool]:
+        result = route(params)
+        if _error(result) is not None:
+            return 502, self._encode(result), False
+        return 200, self._encode(result), True
+
+    @staticmethod
+    def _encode(payload: Any) -> bytes:
+        return json.dumps(payload, separators=(",", ":"), default=str).encode()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests_served": self.requests_served,
+            "response_cache": self.cache.stats(),
+        }
+
+    def handler_class(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                status, body, cache_status = gateway.handle(parts.path, dict(parse_qsl(parts.query)))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-Cache", cache_status)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, gateway: Optional[Gateway] = None) -> ThreadingHTTPServer:
+    """Create (but do not start) the gateway HTTP server"""
+    gateway = gateway or Gateway()
+    server = ThreadingHTTPServer((host, port), gateway.handler_class())
+    server.daemon_threads = True
+    server.gateway = gateway
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local CoinGlass caching gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-entries", type=int, default=4096, help="Response cache size")
+    parser.add_argument("--default-ttl", type=float, default=30.0, help="TTL for endpoints without a specific one")
+    parser.add_argument("--manager-ttl", type=float, default=15.0, help="TTL for /manager/ aggregations")
+    parser.add_argument("--archive", help="History archive root answering stored history windows")
+    args = parser.parse_args()
+
+    gateway = Gateway(ResponseCache(args.max_entries, args.default_ttl), manager_ttl=args.manager_ttl,
+                      archive=HistoryArchive(args.archive) if args.archive else None)
+    server = serve(args.host, args.port, gateway)
+    print(f"CoinGlass gateway listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import re
 from typing import Type
 from services.funding_rates import FundingRateBaseService
 from services.general_information import SupportedPairsService
+from services.tracing import traced
 
 
 class TopPairsManager:
@@ -12,6 +13,7 @@ class TopPairsManager:
     def __init__(self, service: SupportedPairsService = SupportedPairsService()):
         self.service = service
 
+    @traced()
     def get_top_pairs(self, platform: str = 'Binance', top_n: int = 10, clear: bool = True):
         """
         Returns the top N trading pairs for the specified platform.
@@ -59,6 +61,7 @@ class FundingRateManager:
         self.platform = platform
         self.interval = interval
 
+    @traced()
     def get_pair_funding_rate_history(self, pair: str, platform: str = 'Binance', interval: str = '1h'):
         """
         Fetches the FundingRate Info for the given trading pair.
@@ -75,6 +78,7 @@ class FundingRateManager:
 
         return funding_rate_data.get("data", [])
 
+    @traced()
     def get_funding_rate(self, top_pairs):
         pairs_funding_rate = []
         for pair_name in top_pairs:
@@ -0,0 +1,430 @@
+import contextvars
+import math
+import operator
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services.etf import (
+    BitcoinETFAUMService,
+    BitcoinETFFlowHistoryService,
+    BitcoinETFListService,
+    BitcoinETFNetAssetsHistoryService,
+    BitcoinETFPremiumDiscountHistoryService,
+    EthereumETFAUMService,
+    EthereumETFFlowHistoryService,
+    EthereumETFListService,
+    EthereumETFNetAssetsHistoryService,
+    EthereumETFPremiumDiscountHistoryService,
+    GrayscaleHoldingsListService,
+    GrayscalePremiumHistoryService,
+    HKBitcoinETFFlowHistoryService,
+    HKEthereumETFFlowHistoryService,
+)
+from services.tracing import traced
+from storage.columnar import ColumnBatch
+
+
+DAY_MS = 86400000
+
+DayRows = Dict[int, Dict[str, float]]
+
+
+def _day(value: Any) -> Optional[int]:
+    """UTC midnight in ms of a timestamp given in s or ms"""
+    if value is None or value == "":
+        return None
+    ts = int(float(value))
+    if ts < 10 ** 11:
+        ts *= 1000
+    return ts // DAY_MS * DAY_MS
+
+
+def _num(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _timestamp(record: Dict[str, Any]) -> Optional[int]:
+    return _day(record.get("timestamp", record.get("time", record.get("date"))))
+
+
+def parse_flows(records: List[Dict[str, Any]]) -> DayRows:
+    """Daily total flow, underlying price and per-issuer flows (`issuer.<TICKER>`)"""
+    rows: DayRows = {}
+    for record in records:
+        day = _timestamp(record)
+        if day is None:
+            continue
+        row = {"total": _num(record.get("flow_usd")), "price": _num(record.get("price_usd"))}
+        for flow in record.get("etf_flows") or ():
+            ticker = flow.get("etf_ticker") or flow.get("ticker")
+            if ticker:
+                row[f"issuer.{ticker}"] = _num(flow.get("flow_usd"))
+        rows[day] = row
+    return rows
+
+
+def parse_net_assets(records: List[Dict[str, Any]]) -> DayRows:
+    return {day: {"net_assets": _num(r.get("net_assets_usd")), "change": _num(r.get("change_usd")),
+                  "price": _num(r.get("price_usd"))}
+            for r in records if (day := _timestamp(r)) is not None}
+
+
+def parse_premium(records: List[Dict[str, Any]]) -> DayRows:
+    """Premium/discount (%) per issuer (`issuer.<TICKER>`)"""
+    rows: DayRows = {}
+    for record in records:
+        day = _timestamp(record)
+        if day is None:
+            continue
+        rows[day] = {f"issuer.{item.get('ticker')}": _num(item.get("premium_discount_percent"))
+                     for item in record.get("list") or () if item.get("ticker")}
+    return rows
+
+
+def parse_grayscale_premium(records: List[Dict[str, Any]]) -> DayRows:
+    return {day: {"premium_rate": _num(r.get("premium_rate")), "price": _num(r.get("secondary_market_price"))}
+            for r in records if (day := _timestamp(r)) is not None}
+
+
+class ETFSeries:
+    """A daily history endpoint and how its records become panel columns"""
+
+    def __init__(self, Service: type, parse: Callable[[List[Dict[str, Any]]], DayRows],
+                 params: Optional[Dict[str, Any]] = None):
+        self.Service = Service
+        self.parse = parse
+        self.params = params or {}
+
+
+ETF_SERIES: Dict[str, ETFSeries] = {
+    "btc_flows": ETFSeries(BitcoinETFFlowHistoryService, parse_flows),
+    "eth_flows": ETFSeries(EthereumETFFlowHistoryService, parse_flows),
+    "hk_btc_flows": ETFSeries(HKBitcoinETFFlowHistoryService, parse_flows),
+    "hk_eth_flows": ETFSeries(HKEthereumETFFlowHistoryService, parse_flows),
+    "btc_net_assets": ETFSeries(BitcoinETFNetAssetsHistoryService, parse_net_assets),
+    "eth_net_assets": ETFSeries(EthereumETFNetAssetsHistoryService, parse_net_assets),
+    "btc_premium": ETFSeries(BitcoinETFPremiumDiscountHistoryService, parse_premium),
+    "eth_premium": ETFSeries(EthereumETFPremiumDiscountHistoryService, parse_premium),
+    "grayscale_btc_premium": ETFSeries(GrayscalePremiumHistoryService, parse_grayscale_premium, {"symbol": "BTC"}),
+    "grayscale_eth_premium": ETFSeries(GrayscalePremiumHistoryService, parse_grayscale_premium, {"symbol": "ETH"}),
+}
+
+ETF_SNAPSHOTS: Dict[str, type] = {
+    "btc_list": BitcoinETFListService,
+    "eth_list": EthereumETFListService,
+    "btc_aum": BitcoinETFAUMService,
+    "eth_aum": EthereumETFAUMService,
+    "grayscale_holdings": GrayscaleHoldingsListService,
+}
+
+
+def rolling_mean(values: Sequence[float], window: int) -> array:
+    """Trailing mean over `window` days ignoring NaN; NaN until the window holds a value"""
+    present = array("d", map(operator.eq, values, values))          # 1.0 unless NaN
+    sums = array("d", accumulate(map(lambda v, p: v if p else 0.0, values, present), initial=0.0))
+    counts = array("d", accumulate(present, initial=0.0))
+
+    def lagged(cum: array):
+        return (cum[max(0, i - window)] for i in range(1, len(cum)))
+
+    total = map(operator.sub, sums[1:], lagged(sums))
+    count = map(operator.sub, counts[1:], lagged(counts))
+    return array("d", map(lambda s, c: s / c if c else math.nan, total, count))
+
+
+def cumulative(values: Sequence[float]) -> array:
+    """Running sum treating NaN (no data that day) as zero"""
+    return array("d", accumulate(map(lambda v: v if v == v else 0.0, values)))
+
+
+class ETFPanel:
+    """
+    Daily date index shared by every ETF series, with one float64 column per metric.
+
+    Columns are named `<series>.<metric>` (e.g. `btc_flows.total`, `btc_flows.issuer.IBIT`)
+    and padded with NaN on days a series has no value, so any two columns line up
+    element by element.
+    """
+
+    def __init__(self, dates: Optional[array] = None, columns: Optional[Dict[str, array]] = None):
+        self.dates = dates if dates is not None else array("q")
+        self.columns: Dict[str, array] = columns or {}
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def series_columns(self, series: str) -> List[str]:
+        prefix = f"{series}."
+        return [name for name in self.columns if name.startswith(prefix)]
+
+    def last_day(self, series: str) -> Optional[int]:
+        """Last date holding any value of a series"""
+        names = self.series_columns(series)
+        for i in range(len(self.dates) - 1, -1, -1):
+            for name in names:
+                if self.columns[name][i] == self.columns[name][i]:
+                    return self.dates[i]
+        return None
+
+    def _align(self, days: Sequence[int]) -> None:
+        new_days = sorted(set(days).difference(self.dates))
+        if not new_days:
+            return
+        if not self.dates or new_days[0] > self.dates[-1]:
+            # Daily updates only ever append
+            self.dates.extend(new_days)
+            padding = array("d", [math.nan]) * len(new_days)
+            for column in self.columns.values():
+                column.extend(padding)
+            return
+        dates = array("q", sorted(set(self.dates).union(new_days)))
+        position = {day: i for i, day in enumerate(dates)}
+        for name, column in self.columns.items():
+            aligned = array("d", [math.nan]) * len(dates)
+            for day, value in zip(self.dates, column):
+                aligned[position[day]] = value
+            self.columns[name] = aligned
+        self.dates = dates
+
+    def merge(self, series: str, rows: DayRows, since: Optional[int] = None) -> int:
+        """
+        Write a series' days into the panel
+
+        :param since: Only days from this one on are written; the last stored day is
+            rewritten since its figures can still be revised.
+        :return: Number of days that were not stored before.
+        """
+        rows = {day: row for day, row in rows.items() if since is None or day >= since}
+        if not rows:
+            return 0
+        self._align(rows)
+        start = self.dates.index(min(rows))
+        position = {day: start + i for i, day in enumerate(self.dates[start:])}
+        for day, row in rows.items():
+            i = position[day]
+            for metric, value in row.items():
+                name = f"{series}.{metric}"
+                column = self.columns.get(name)
+                if column is None:
+                    column = self.columns[name] = array("d", [math.nan]) * len(self.dates)
+                column[i] = value
+        return sum(1 for day in rows if since is None or day > since)
+
+    def to_batch(self) -> ColumnBatch:
+        return ColumnBatch({"date": self.dates, **self.columns})
+
+    @classmethod
+    def from_batch(cls, batch: ColumnBatch) -> "ETFPanel":
+        columns = {name: array("d", batch[name]) for name in batch.names if name != "date"}
+        return cls(array("q", batch["date"]) if "date" in batch else array("q"), columns)
+
+
+class ETFManager:
+    """
+    Manager for US, HK and Grayscale ETF data on one daily panel
+
+    `update()` fetches every due history endpoint and snapshot concurrently. A series that is
+    already stored is requested with `start_time` at its last stored day, so only that day
+    (its figures can still be revised) and newer ones are downloaded, and only those are
+    merged. A series whose last stored day is today is not requested again, and one still
+    waiting for today's figures is polled at most every `refresh_interval` seconds. With `path` set the panel is persisted between runs, so a
+    restart does not download history again either.
+
+    :param path: File the panel is loaded from and saved to after each update.
+    :param max_workers: Concurrent requests.
+    :param refresh_interval: Minimum seconds between requests for the same endpoint.
+    :param series: Names from `ETF_SERIES` to track; all by default.
+    :param snapshots: Names from `ETF_SNAPSHOTS` to track; all by default.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_workers: int = 8, refresh_interval: float = 3600.0,
+                 series: Optional[Sequence[str]] = None, snapshots: Optional[Sequence[str]] = None):
+        self.path = path
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.series = {name: ETF_SERIES[name] for name in (series or ETF_SERIES)}
+        self.services = {name: spec.Service() for name, spec in self.series.items()}
+        self.snapshot_services = {name: ETF_SNAPSHOTS[name]() for name in (snapshots or ETF_SNAPSHOTS)}
+        self.snapshots: Dict[str, Any] = {}
+        self._fetched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.panel = ETFPanel()
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.panel = ETFPanel.from_batch(ColumnBatch.from_bytes(f.read()))
+
+    def _due(self, name: str, last_day: Optional[int], today: int, force: bool) -> bool:
+        if force or last_day is None:
+            return True
+        if last_day >= today:
+            return False
+        return time.time() - self._fetched.get(name, 0.0) >= self.refresh_interval
+
+    @staticmethod
+    def _fetch(service, params: Dict[str, Any]) -> Any:
+        data = service.fetch_data(**params)
+
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching ETF data: {data.get('msg')}")
+
+        return data.get("data") or []
+
+    @traced()
+    def update(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Bring the panel and snapshots up to date
+
+        :param force: Request every endpoint regardless of what is stored.
+        :return: New days per series, refreshed snapshots and errors per endpoint.
+        """
+        today = int(time.time() * 1000) // DAY_MS * DAY_MS
+        with self._lock:
+            last_days = {name: self.panel.last_day(name) for name in self.series}
+        jobs: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+        for name, spec in self.series.items():
+            if self._due(name, last_days[name], today, force):
+                since = {} if force or last_days[name] is None else {"start_time": last_days[name]}
+                jobs[name] = (self.services[name], {**spec.params, **since})
+        for name, service in self.snapshot_services.items():
+            if force or time.time() - self._fetched.get(name, 0.0) >= self.refresh_interval:
+                jobs[name] = (service, {})
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        if jobs:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+                futures = {name: executor.submit(contextvars.copy_context().run, self._fetch, service, params)
+                           for name, (service, params) in jobs.items()}
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        errors[name] = str(e)
+
+        report: Dict[str, Any] = {"new_days": {}, "snapshots": [], "errors": errors}
+        now = time.time()
+        with self._lock:
+            for name, records in results.items():
+                self._fetched[name] = now
+                if name in self.series:
+                    rows = self.series[name].parse(records)
+                    report["new_days"][name] = self.panel.merge(name, rows, last_days[name])
+                else:
+                    self.snapshots[name] = records
+                    report["snapshots"].append(name)
+            if self.path and any(report["new_days"].values()):
+                self.save()
+        return report
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the panel atomically (a `ColumnBatch` buffer)"""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save the ETF panel to")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.panel.to_batch().to_bytes())
+        os.replace(tmp, path)
+
+    def _column(self, name: str) -> array:
+        if not self.panel.dates:
+            self.update()
+        column = self.panel.columns.get(name)
+        if column is None:
+            raise ValueError(f"Unknown ETF column '{name}'")
+        return column
+
+    def _records(self, values: Sequence[float], days: Optional[int]) -> List[Dict[str, Any]]:
+        start = max(0, len(self.panel.dates) - days) if days else 0
+        return [{"date": day, "value": value}
+                for day, value in zip(self.panel.dates[start:], values[start:]) if value == value]
+
+    @traced()
+    def get_cumulative_flows(self, series: str = "btc_flows", days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Cumulative net flows since the start of the history
+
+        :param series: Flow series, e.g. 'btc_flows', 'eth_flows', 'hk_btc_flows'
+        :param days: Only return the last N days (the sum still starts at the first day)
+        :return: List of {'date', 'value'} records
+        """
+        return self._records(cumulative(self._column(f"{series}.total")), days)
+
+    @traced()
+    def get_rolling_flows(self, series: str = "btc_flows", window: int = 7,
+                          days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Trailing average of daily net flows
+
+        :param series: Flow series, e.g. 'btc_flows', 'eth_flows', 'hk_btc_flows'
+        :param window: Averaging window in days
+        :param days: Only return the last N days
+        :return: List of {'date', 'value'} records
+        """
+        return self._records(rolling_mean(self._column(f"{series}.total"), window), days)
+
+    @traced()
+    def get_issuer_rankings(self, series: str = "btc_flows", days: int = 30) -> List[Dict[str, Any]]:
+        """
+        Issuers ranked by net flows over the last N days
+
+        :param series: Flow series, e.g. 'btc_flows', 'eth_flows'
+        :param days: Ranking window in days
+        :return: Per issuer the window total, the latest day's flow and the all-time cumulative flow
+        """
+        if not self.panel.dates:
+            self.update()
+        prefix = f"{series}.issuer."
+        start = max(0, len(self.panel.dates) - days)
+        rows = []
+        for name in self.panel.series_columns(series):
+            if not name.startswith(prefix):
+                continue
+            column = self.panel.columns[name]
+            window = [v for v in column[start:] if v == v]
+            rows.append({
+                "issuer": name[len(prefix):],
+                "window_flow_usd": math.fsum(window),
+                "latest_flow_usd": column[-1] if column[-1] == column[-1] else None,
+                "cumulative_flow_usd": math.fsum(v for v in column if v == v),
+                "inflow_days": sum(1 for v in window if v > 0),
+            })
+        rows.sort(key=lambda row: row["window_flow_usd"], reverse=True)
+        for rank, row in enumerate(rows, 1):
+            row["rank"] = rank
+        return rows
+
+    @traced()
+    def get_daily_report(self, rolling_window: int = 7, ranking_days: int = 30) -> Dict[str, Any]:
+        """
+        Latest day across every tracked series after an incremental update
+
+        :return: Per flow series the latest, rolling average and cumulative flows plus issuer
+            rankings; latest net assets and premiums; and the raw snapshots
+        """
+        self.update()
+        report: Dict[str, Any] = {"date": self.panel.dates[-1] if self.panel.dates else None, "flows": {},
+                                  "net_assets": {}, "premiums": {}, "snapshots": self.snapshots}
+        for name, spec in self.series.items():
+            if spec.parse is parse_flows and f"{name}.total" in self.panel.columns:
+                total = self.panel.columns[f"{name}.total"]
+                report["flows"][name] = {
+                    "latest_usd": total[-1] if total[-1] == total[-1] else None,
+                    f"avg_{rolling_window}d_usd": rolling_mean(total, rolling_window)[-1],
+                    "cumulative_usd": cumulative(total)[-1],
+                    "top_issuers": self.get_issuer_rankings(name, ranking_days)[:5],
+                }
+            elif spec.parse is parse_net_assets and f"{name}.net_assets" in self.panel.columns:
+                report["net_assets"][name] = self.panel.columns[f"{name}.net_assets"][-1]
+            elif spec.parse in (parse_premium, parse_grayscale_premium):
+                report["premiums"][name] = {column[len(name) + 1:]: self.panel.columns[column][-1]
+                                            for column in self.panel.series_columns(name)}
+        return report
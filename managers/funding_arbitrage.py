@@ -0,0 +1,229 @@
+"""Cross-exchange funding rate arbitrage scanner over the exchange-list snapshot of the whole universe"""
+
+import heapq
+import math
+import operator
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.funding_rates import CumulativeExchangeListService, ExchangeListService, FundingRateBaseService
+from services.tracing import traced
+
+
+MARGIN_LISTS = {"stablecoin": ("stablecoin_margin_list",), "token": ("token_margin_list",),
+                "all": ("stablecoin_margin_list", "token_margin_list")}
+
+
+class FundingMatrix:
+    """
+    Symbol × venue funding snapshot in compressed-row form.
+
+    Row `i` (one symbol) owns the slice `offsets[i]:offsets[i + 1]` of the flat `rates`,
+    `venue_ids`, `interval_hours` and `next_funding` arrays, so per-symbol max/min/index
+    run over contiguous typed buffers instead of dicts. `rates` holds the rate normalised
+    to `basis_hours` (e.g. an hourly 0.01% payer is 0.08% per 8h); `raw_rates` the quoted one.
+    """
+
+    def __init__(self, symbols: List[str], venues: List[str], offsets: array, venue_ids: array,
+                 raw_rates: array, interval_hours: array, next_funding: array, basis_hours: Optional[float]):
+        self.symbols = symbols
+        self.venues = venues
+        self.offsets = offsets
+        self.venue_ids = venue_ids
+        self.raw_rates = raw_rates
+        self.interval_hours = interval_hours
+        self.next_funding = next_funding
+        self.basis_hours = basis_hours
+        if basis_hours is None:
+            self.rates = array("d", raw_rates)
+        else:
+            factors = map(basis_hours.__truediv__, interval_hours)
+            self.rates = array("d", map(operator.mul, raw_rates, factors))
+        self._rows = {symbol: i for i, symbol in enumerate(symbols)}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def entries(self) -> int:
+        return len(self.rates)
+
+    def row(self, symbol: str) -> Dict[str, float]:
+        """Normalised rate per venue of one symbol"""
+        i = self._rows[symbol]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return {self.venues[v]: rate for v, rate in zip(self.venue_ids[start:stop], self.rates[start:stop])}
+
+    def rate(self, symbol: str, venue: str) -> Optional[float]:
+        return self.row(symbol).get(venue)
+
+    def dense(self) -> array:
+        """Row-major len(symbols) × len(venues) matrix of normalised rates, NaN where a venue has no market"""
+        width = len(self.venues)
+        matrix = array("d", [math.nan]) * (len(self.symbols) * width)
+        for i in range(len(self.symbols)):
+            base = i * width
+            for j in range(self.offsets[i], self.offsets[i + 1]):
+                matrix[base + self.venue_ids[j]] = self.rates[j]
+        return matrix
+
+
+class FundingSpread:
+    """Best long/short venue pair for one symbol; rates are normalised to the scan's basis"""
+
+    __slots__ = ("symbol", "long_venue", "short_venue", "long_rate", "short_rate", "spread",
+                 "annualized", "venues", "next_funding_time")
+
+    def __init__(self, symbol: str, long_venue: str, short_venue: str, long_rate: float, short_rate: float,
+                 annualized: float, venues: int, next_funding_time: Optional[int]):
+        self.symbol = symbol
+        self.long_venue = long_venue
+        self.short_venue = short_venue
+        self.long_rate = long_rate
+        self.short_rate = short_rate
+        self.spread = short_rate - long_rate
+        self.annualized = annualized
+        self.venues = venues
+        self.next_funding_time = next_funding_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return (f"FundingSpread({self.symbol}: long {self.long_venue} {self.long_rate:.4f} / "
+                f"short {self.short_venue} {self.short_rate:.4f}, spread={self.spread:.4f})")
+
+
+class FundingArbitrageScanner:
+    """
+    Ranks funding rate spreads across exchanges for every coin from one snapshot request.
+
+    The exchange-list endpoint is fetched once without a symbol, which returns the whole
+    universe. Rates are normalised to a common funding interval before comparing venues,
+    since an exchange settling hourly and one settling every 8h quote very different
+    numbers for the same carry. The best pair per symbol is long the lowest rate (receives
+    funding) and short the highest.
+
+    :param Service: Service class for the snapshot; `CumulativeExchangeListService` ranks
+        accumulated funding, which is already comparable and is not normalised.
+    :param margin: 'stablecoin', 'token' or 'all'. With 'all', coin-margined venues appear
+        as '<exchange> (coin-m)' next to the USDT-margined ones.
+    :param basis_hours: Funding interval rates are normalised to.
+    """
+
+    def __init__(self, Service: type = ExchangeListService, margin: str = "stablecoin", basis_hours: float = 8.0):
+        if margin not in MARGIN_LISTS:
+            raise ValueError(f"Unknown margin type '{margin}', expected one of {sorted(MARGIN_LISTS)}")
+        self.service: FundingRateBaseService = Service()
+        self.margin = margin
+        self.basis_hours = None if issubclass(Service, CumulativeExchangeListService) else float(basis_hours)
+        self.matrix: Optional[FundingMatrix] = None
+
+    @traced()
+    def fetch_snapshot(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Raw exchange-list records, for every coin unless `symbol` is given"""
+        data = self.service.fetch_data(symbol=symbol)
+
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching funding rate exchange list: {data.get('msg')}")
+
+        return data.get("data") or []
+
+    def build_matrix(self, records: Iterable[Dict[str, Any]],
+                     exclude_exchanges: Sequence[str] = ()) -> FundingMatrix:
+        """Pack exchange-list records into a `FundingMatrix`"""
+        excluded = set(exclude_exchanges)
+        suffixed = self.margin == "all"
+        venue_index: Dict[str, int] = {}
+        symbols: List[str] = []
+        offsets = array("q", [0])
+        venue_ids, raw_rates, interval_hours, next_funding = array("i"), array("d"), array("d"), array("q")
+
+        for record in records:
+            symbol = record.get("symbol")
+            if not symbol:
+                continue
+            for list_name in MARGIN_LISTS[self.margin]:
+                for entry in record.get(list_name) or ():
+                    exchange, rate = entry.get("exchange"), entry.get("funding_rate")
+                    if exchange is None or rate is None or exchange in excluded:
+                        continue
+                    venue = f"{exchange} (coin-m)" if suffixed and list_name == "token_margin_list" else exchange
+                    vid = venue_index.get(venue)
+                    if vid is None:
+                        vid = venue_index[venue] = len(venue_index)
+                    venue_ids.append(vid)
+                    raw_rates.append(float(rate))
+                    interval_hours.append(float(entry.get("funding_rate_interval") or 8))
+                    next_funding.append(int(entry.get("next_funding_time") or 0))
+            if len(raw_rates) > offsets[-1]:
+                symbols.append(symbol)
+                offsets.append(len(raw_rates))
+
+        return FundingMatrix(symbols, list(venue_index), offsets, venue_ids, raw_rates, interval_hours,
+                             next_funding, self.basis_hours)
+
+    @traced()
+    def scan(self, exclude_exchanges: Sequence[str] = ()) -> FundingMatrix:
+        """Fetch the universe snapshot and rebuild the matrix"""
+        self.matrix = self.build_matrix(self.fetch_snapshot(), exclude_exchanges)
+        return self.matrix
+
+    @staticmethod
+    def spreads(matrix: FundingMatrix, min_venues: int = 2) -> Tuple[array, array, array]:
+        """
+        Per-symbol spread and the flat indexes of its long (min) and short (max) entries
+
+        Symbols quoted on fewer than `min_venues` venues get a spread of -inf.
+        """
+        rates, offsets = matrix.rates, matrix.offsets
+        n = len(matrix.symbols)
+        spread = array("d", [-math.inf]) * n
+        low, high = array("q", [0]) * n, array("q", [0]) * n
+        for i in range(n):
+            start, stop = offsets[i], offsets[i + 1]
+            if stop - start < max(min_venues, 1):
+                continue
+            row = rates[start:stop]
+            lo, hi = min(row), max(row)
+            spread[i] = hi - lo
+            low[i] = start + row.index(lo)
+            high[i] = start + row.index(hi)
+        return spread, low, high
+
+    def top_spreads(self, top_n: int = 20, min_venues: int = 2, min_spread: float = 0.0,
+                    matrix: Optional[FundingMatrix] = None) -> List[FundingSpread]:
+        """
+        Largest funding spreads in the universe
+
+        :param top_n: Number of symbols to return.
+        :param min_venues: Skip symbols listed on fewer venues.
+        :param min_spread: Skip spreads (in normalised rate units) below this.
+        :param matrix: Matrix to rank; defaults to the last scan, scanning first if there is none.
+        """
+        # An empty matrix is falsy (`__len__`) but still a valid result; only a missing one triggers a scan
+        if matrix is None:
+            matrix = self.matrix if self.matrix is not None else self.scan()
+        spread, low, high = self.spreads(matrix, min_venues)
+        best = heapq.nlargest(top_n, range(len(spread)), key=spread.__getitem__)
+        periods_per_year = 365 * 24 / (self.basis_hours or 8.0)
+        results = []
+        for i in best:
+            if spread[i] == -math.inf or spread[i] < min_spread:
+                break
+            lo, hi = low[i], high[i]
+            next_times = [t for t in (matrix.next_funding[lo], matrix.next_funding[hi]) if t]
+            results.append(FundingSpread(
+                matrix.symbols[i], matrix.venues[matrix.venue_ids[lo]], matrix.venues[matrix.venue_ids[hi]],
+                matrix.rates[lo], matrix.rates[hi],
+                spread[i] * periods_per_year if self.basis_hours else spread[i],
+                matrix.offsets[i + 1] - matrix.offsets[i], min(next_times) if next_times else None,
+            ))
+        return results
+
+    @traced()
+    def scan_top(self, top_n: int = 20, min_venues: int = 2, min_spread: float = 0.0,
+                 exclude_exchanges: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Fresh scan and ranking in one call, as plain dicts"""
+        matrix = self.scan(exclude_exchanges)
+        return [spread.to_dict() for spread in self.top_spreads(top_n, min_venues, min_spread, matrix)]
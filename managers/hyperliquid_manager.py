@@ -0,0 +1,395 @@
+import contextvars
+import math
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from services.hyperliquid import (
+    HyperliquidFundingRatesService,
+    HyperliquidLiquidationsService,
+    HyperliquidMarketDataService,
+    HyperliquidOpenInterestService,
+    HyperliquidOrderbookService,
+    HyperliquidTradesService,
+    HyperliquidVolumeService,
+)
+from services.tracing import traced
+from managers.polling import SnapshotDiff, SnapshotTracker
+from managers.pubsub import EventBus
+
+
+def _num(record: Dict[str, Any], *names: str) -> Optional[float]:
+    for name in names:
+        value = record.get(name)
+        if value is not None and value != "":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def _first(*values: Optional[float]) -> Optional[float]:
+    """First value that is present; 0.0 counts as present"""
+    return next((value for value in values if value is not None), None)
+
+
+# Trailing trade-flow stats of a snapshot; they move with the wall clock, so they are not diffed
+FLOW_FIELDS = ("buy_usd_1m", "sell_usd_1m", "vwap_1m")
+
+
+def _levels(raw: Iterable[Any]) -> List[Tuple[float, float]]:
+    """Orderbook levels given as [price, size] pairs or {'price'/'px', 'size'/'sz'} dicts"""
+    levels = []
+    for level in raw or ():
+        if isinstance(level, dict):
+            price, size = _num(level, "price", "px"), _num(level, "size", "sz", "quantity")
+        else:
+            price, size = float(level[0]), float(level[1])
+        if price is not None and size is not None:
+            levels.append((price, size))
+    return levels
+
+
+def _by_symbol(payload: Any) -> Dict[str, Dict[str, Any]]:
+    records = payload if isinstance(payload, list) else [payload] if isinstance(payload, dict) else []
+    return {r["symbol"]: r for r in records if isinstance(r, dict) and r.get("symbol")}
+
+
+class LocalOrderbook:
+    """
+    Top-of-book levels of one symbol in typed arrays, bounded to `depth` levels per side.
+
+    `apply` replaces the book with a new snapshot and reports how many levels changed,
+    appeared or disappeared, so callers can tell a quiet tick from a book that moved.
+    """
+
+    def __init__(self, depth: int = 20):
+        self.depth = depth
+        self.bid_prices, self.bid_sizes = array("d"), array("d")
+        self.ask_prices, self.ask_sizes = array("d"), array("d")
+        self.time = 0
+        self.updates = 0
+
+    def apply(self, bids: Sequence[Tuple[float, float]], asks: Sequence[Tuple[float, float]],
+              time_ms: int = 0) -> int:
+        bids = sorted(bids, key=lambda level: -level[0])[:self.depth]
+        asks = sorted(asks, key=lambda level: level[0])[:self.depth]
+        changed = 0
+        for prices, sizes, levels in ((self.bid_prices, self.bid_sizes, bids), (self.ask_prices, self.ask_sizes, asks)):
+            old = dict(zip(prices, sizes))
+            new = dict(levels)
+            changed += sum(1 for price, size in new.items() if old.get(price) != size)
+            changed += sum(1 for price in old if price not in new)
+        self.bid_prices, self.bid_sizes = array("d", (p for p, _ in bids)), array("d", (s for _, s in bids))
+        self.ask_prices, self.ask_sizes = array("d", (p for p, _ in asks)), array("d", (s for _, s in asks))
+        self.time = time_ms or int(time.time() * 1000)
+        self.updates += 1
+        return changed
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bid_prices[0] if self.bid_prices else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.ask_prices[0] if self.ask_prices else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return (self.bid_prices[0] + self.ask_prices[0]) / 2
+
+    @property
+    def spread_bps(self) -> Optional[float]:
+        mid = self.mid
+        return (self.ask_prices[0] - self.bid_prices[0]) / mid * 1e4 if mid else None
+
+    def depth_usd(self, side: str) -> float:
+        prices, sizes = (self.bid_prices, self.bid_sizes) if side == "bid" else (self.ask_prices, self.ask_sizes)
+        return math.fsum(map(float.__mul__, prices, sizes))
+
+    @property
+    def imbalance(self) -> Optional[float]:
+        """(bid depth - ask depth) / total depth in USD, in [-1, 1]"""
+        bid, ask = self.depth_usd("bid"), self.depth_usd("ask")
+        return (bid - ask) / (bid + ask) if bid + ask else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"time": self.time, "bids": list(zip(self.bid_prices, self.bid_sizes)),
+                "asks": list(zip(self.ask_prices, self.ask_sizes))}
+
+
+class TradeRing:
+    """
+    Fixed-capacity ring of recent trades in typed arrays.
+
+    Polling overlapping windows returns the same trades again; only trades after the
+    newest one stored (by time, then by id or content for equal times) are appended.
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = capacity
+        self.times = array("q", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.sizes = array("d", bytes(8 * capacity))
+        self.sides = array("b", bytes(capacity))          # +1 buy, -1 sell
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.last_time = -1
+        self._last_ids: Set[Hashable] = set()
+
+    @staticmethod
+    def _id(trade: Dict[str, Any]) -> Hashable:
+        tid = trade.get("tid", trade.get("id", trade.get("trade_id")))
+        return tid if tid is not None else (trade.get("time"), trade.get("price"), trade.get("size"), trade.get("side"))
+
+    def extend(self, trades: Iterable[Dict[str, Any]]) -> int:
+        """Append the trades not stored yet; returns how many were new"""
+        added = 0
+        for trade in sorted(trades, key=lambda t: int(t.get("time") or 0)):
+            time_ms = int(trade.get("time") or 0)
+            trade_id = self._id(trade)
+            if time_ms < self.last_time or (time_ms == self.last_time and trade_id in self._last_ids):
+                continue
+            if time_ms > self.last_time:
+                self.last_time = time_ms
+                self._last_ids = set()
+            self._last_ids.add(trade_id)
+            i = self.head
+            self.times[i] = time_ms
+            self.prices[i] = float(trade.get("price") or 0)
+            self.sizes[i] = float(trade.get("size") or trade.get("quantity") or 0)
+            self.sides[i] = 1 if str(trade.get("side", "buy")).lower() in ("buy", "b", "1") else -1
+            self.head = (i + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.total += 1
+            added += 1
+        return added
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _order(self) -> List[int]:
+        start = (self.head - self.count) % self.capacity
+        return [(start + k) % self.capacity for k in range(self.count)]
+
+    def recent(self, n: int = 50) -> List[Dict[str, Any]]:
+        """Newest trades first"""
+        return [{"time": self.times[i], "price": self.prices[i], "size": self.sizes[i],
+                 "side": "buy" if self.sides[i] > 0 else "sell"} for i in reversed(self._order()[-n:])]
+
+    def flow(self, window_ms: int, now_ms: Optional[int] = None) -> Dict[str, float]:
+        """Buy/sell notional, VWAP and trade count over the trailing window"""
+        cutoff = (now_ms or int(time.time() * 1000)) - window_ms
+        buy = sell = quantity = 0.0
+        count = 0
+        for i in self._order():
+            if self.times[i] < cutoff:
+                continue
+            notional = self.prices[i] * self.sizes[i]
+            if self.sides[i] > 0:
+                buy += notional
+            else:
+                sell += notional
+            quantity += self.sizes[i]
+            count += 1
+        return {"buy_usd": buy, "sell_usd": sell, "trades": count,
+                "vwap": (buy + sell) / quantity if quantity else None}
+
+
+class HyperliquidUpdate:
+    """Result of one refresh tick"""
+
+    def __init__(self, diff: SnapshotDiff, book_changes: Dict[str, int], new_trades: Dict[str, int],
+                 errors: Dict[str, str], elapsed: float):
+        self.diff = diff
+        self.book_changes = book_changes
+        self.new_trades = new_trades
+        self.errors = errors
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return (f"HyperliquidUpdate(changed={len(self.diff.changed)}, added={len(self.diff.added)}, "
+                f"new_trades={sum(self.new_trades.values())}, errors={len(self.errors)}, elapsed={self.elapsed:.3f}s)")
+
+
+class HyperliquidManager:
+    """
+    Consolidated Hyperliquid market state for many symbols
+
+    Every `refresh()` is one concurrent fan-out: the universe-wide market data, funding,
+    liquidation and volume endpoints are requested once for all symbols, and open
+    interest, orderbook and trades once per symbol, all on a shared thread pool. The
+    results are joined into one flat snapshot per symbol and diffed against the previous
+    tick; the trailing one-minute trade flow (`FLOW_FIELDS`) is left out of the diff, since
+    it changes with the clock alone. Each symbol keeps a `LocalOrderbook` and a bounded `TradeRing`, so memory stays
+    flat however long the monitor runs.
+
+    :param symbols: Symbols to track; by default every symbol in the market data response.
+    :param depth: Orderbook levels per side.
+    :param trades_limit: Trades requested per symbol and tick.
+    :param trade_capacity: Trades kept per symbol.
+    :param max_workers: Concurrent requests per tick.
+    :param bus: Optional event bus; snapshot diffs are published as 'hyperliquid.snapshot'.
+    """
+
+    def __init__(self, symbols: Optional[Sequence[str]] = None, depth: int = 20, trades_limit: int = 100,
+                 trade_capacity: int = 2048, max_workers: int = 32, bus: Optional[EventBus] = None):
+        self.symbols = list(symbols) if symbols else None
+        self.depth = depth
+        self.trades_limit = trades_limit
+        self.trade_capacity = trade_capacity
+        self.max_workers = max_workers
+        self.bus = bus
+        self.market_data_service = HyperliquidMarketDataService()
+        self.funding_service = HyperliquidFundingRatesService()
+        self.liquidations_service = HyperliquidLiquidationsService()
+        self.volume_service = HyperliquidVolumeService()
+        self.open_interest_service = HyperliquidOpenInterestService()
+        self.orderbook_service = HyperliquidOrderbookService()
+        self.trades_service = HyperliquidTradesService()
+        self.books: Dict[str, LocalOrderbook] = {}
+        self.trades: Dict[str, TradeRing] = {}
+        self.snapshots: Dict[str, Dict[str, Any]] = {}
+        self.tracker = SnapshotTracker("hyperliquid.snapshot", "symbol")
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _data(response: Dict[str, Any], what: str) -> Any:
+        if response.get("code") != "0":
+            raise ValueError(f"Error fetching Hyperliquid {what}: {response.get('msg')}")
+        return response.get("data")
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hyperliquid")
+        return self._executor
+
+    def _jobs(self, symbols: Optional[Sequence[str]]) -> Dict[Tuple[str, Optional[str]], Any]:
+        jobs = {
+            ("market", None): lambda: self.market_data_service.fetch_data(),
+            ("funding", None): lambda: self.funding_service.fetch_data(),
+            ("liquidations", None): lambda: self.liquidations_service.fetch_data(),
+            ("volume", None): lambda: self.volume_service.fetch_data(),
+        }
+        for symbol in symbols or ():
+            jobs[("open_interest", symbol)] = lambda s=symbol: self.open_interest_service.fetch_data(symbol=s)
+            jobs[("orderbook", symbol)] = lambda s=symbol: self.orderbook_service.fetch_data(symbol=s, depth=self.depth)
+            jobs[("trades", symbol)] = lambda s=symbol: self.trades_service.fetch_data(symbol=s, limit=self.trades_limit)
+        return jobs
+
+    @traced()
+    def refresh(self) -> HyperliquidUpdate:
+        """
+        Fetch every endpoint for every tracked symbol in one fan-out and update local state
+
+        :return: Snapshot diff against the previous tick, orderbook level changes and new
+            trades per symbol, and errors per request
+        """
+        started = time.monotonic()
+        pool = self._pool()
+        results: Dict[Tuple[str, Optional[str]], Any] = {}
+        errors: Dict[str, str] = {}
+
+        def run(jobs):
+            futures = {key: pool.submit(contextvars.copy_context().run, job) for key, job in jobs.items()}
+            for key, future in futures.items():
+                try:
+                    results[key] = self._data(future.result(), key[0])
+                except Exception as e:
+                    errors[f"{key[0]}:{key[1]}" if key[1] else key[0]] = str(e)
+
+        if self.symbols is None:
+            # The universe comes from the market data response, so per-symbol requests wait for it
+            run(self._jobs(None))
+            symbols = sorted(_by_symbol(results.get(("market", None))))
+            run({key: job for key, job in self._jobs(symbols).items() if key[1] is not None})
+        else:
+            symbols = self.symbols
+            run(self._jobs(symbols))
+
+        market = _by_symbol(results.get(("market", None)))
+        funding = _by_symbol(results.get(("funding", None)))
+        liquidations = _by_symbol(results.get(("liquidations", None)))
+        volume = _by_symbol(results.get(("volume", None)))
+
+        book_changes: Dict[str, int] = {}
+        new_trades: Dict[str, int] = {}
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            for symbol in symbols:
+                book = self.books.setdefault(symbol, LocalOrderbook(self.depth))
+                raw_book = results.get(("orderbook", symbol))
+                if isinstance(raw_book, dict):
+                    book_changes[symbol] = book.apply(_levels(raw_book.get("bids")), _levels(raw_book.get("asks")),
+                                                      int(raw_book.get("time") or 0))
+                ring = self.trades.setdefault(symbol, TradeRing(self.trade_capacity))
+                raw_trades = results.get(("trades", symbol))
+                if isinstance(raw_trades, list):
+                    new_trades[symbol] = ring.extend(raw_trades)
+                self.snapshots[symbol] = self._consolidate(
+                    symbol, market.get(symbol, {}), funding.get(symbol, {}), liquidations.get(symbol, {}),
+                    volume.get(symbol, {}), _by_symbol(results.get(("open_interest", symbol))).get(symbol, {}),
+                    book, ring, now_ms)
+            diff = self.tracker.update([
+                {name: value for name, value in self.snapshots[symbol].items() if name not in FLOW_FIELDS}
+                for symbol in symbols])
+
+        if self.bus is not None and diff:
+            self.bus.publish("hyperliquid.snapshot", diff)
+        return HyperliquidUpdate(diff, book_changes, new_trades, errors, time.monotonic() - started)
+
+    @staticmethod
+    def _consolidate(symbol: str, market: Dict[str, Any], funding: Dict[str, Any], liquidations: Dict[str, Any],
+                     volume: Dict[str, Any], open_interest: Dict[str, Any], book: LocalOrderbook, ring: TradeRing,
+                     now_ms: int) -> Dict[str, Any]:
+        flow = ring.flow(60000, now_ms)
+        last = ring.recent(1)
+        return {
+            "symbol": symbol,
+            "mark_price": _num(market, "mark_price", "price"),
+            "index_price": _num(market, "index_price"),
+            "price_change_percent_24h": _num(market, "price_change_percent_24h", "change_24h"),
+            "volume_usd_24h": _first(_num(volume, "volume_usd"), _num(market, "volume_usd_24h", "volume_usd")),
+            "open_interest_usd": _first(_num(open_interest, "open_interest_usd"), _num(market, "open_interest_usd")),
+            "funding_rate": _first(_num(funding, "funding_rate"), _num(market, "funding_rate")),
+            "long_liquidation_usd": _num(liquidations, "long_liquidation_usd"),
+            "short_liquidation_usd": _num(liquidations, "short_liquidation_usd"),
+            "best_bid": book.best_bid,
+            "best_ask": book.best_ask,
+            "spread_bps": book.spread_bps,
+            "book_imbalance": book.imbalance,
+            "last_trade_price": last[0]["price"] if last else None,
+            "buy_usd_1m": flow["buy_usd"],
+            "sell_usd_1m": flow["sell_usd"],
+            "vwap_1m": flow["vwap"],
+        }
+
+    def get_snapshot(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Consolidated state of one symbol as of the last refresh"""
+        return self.snapshots.get(symbol)
+
+    def get_orderbook(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            return self.books[symbol].to_dict()
+
+    def get_recent_trades(self, symbol: str, n: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.trades[symbol].recent(n)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> "HyperliquidManager":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,341 @@
+"""In-memory indicator catalogue loaded in bulk, with a freshness policy per indicator"""
+
+import contextvars
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from services.base import CoinglassAPIBase
+from services.indicators import (
+    AHR999Service,
+    AltcoinSeasonIndexService,
+    BitcoinActiveAddressesService,
+    BitcoinLongTermHolderRealizedPriceService,
+    BitcoinLongTermHolderSOPRService,
+    BitcoinLongTermHolderSupplyService,
+    BitcoinMacroOscillatorService,
+    BitcoinNetUnrealizedPNLService,
+    BitcoinNewAddressesService,
+    BitcoinProfitableDaysService,
+    BitcoinRainbowChartService,
+    BitcoinReserveRiskService,
+    BitcoinRHODLRatioService,
+    BitcoinShortTermHolderRealizedPriceService,
+    BitcoinShortTermHolderSOPRService,
+    BitcoinShortTermHolderSupplyService,
+    BitcoinVsGlobalM2GrowthService,
+    BitcoinVsUSM2GrowthService,
+    BitfinexMarginLongShortService,
+    BorrowInterestRateHistoryService,
+    BTCCorrelationsService,
+    BullMarketPeakIndicatorService,
+    CoinbasePremiumIndexService,
+    FearGreedIndexService,
+    GoldenRatioMultiplierService,
+    OptionVsFuturesOIRatioService,
+    PiCycleTopIndicatorService,
+    PuellMultipleService,
+    StockToFlowService,
+    TwoHundredWeekMAHeatmapService,
+    TwoYearMAMultiplierService,
+)
+from services.tracing import traced
+
+
+DAY = 86400
+TIME_FIELDS = ("time", "timestamp", "date", "date_string", "t")
+
+
+class MaxAge:
+    """Fresh for a fixed number of seconds after each fetch"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.retry = None
+
+    def expires_at(self, fetched_at: float) -> float:
+        return fetched_at + self.seconds
+
+
+class DailyRollover:
+    """
+    Fresh until the next UTC midnight (plus `delay`) after each fetch
+
+    :param delay: Seconds after midnight before the new day's value is expected.
+    :param retry: Seconds between refetches while the new day's value is not published yet.
+    """
+
+    def __init__(self, delay: float = 0.0, retry: float = 900.0):
+        self.delay = delay
+        self.retry = retry
+
+    def expires_at(self, fetched_at: float) -> float:
+        return (fetched_at - self.delay) // DAY * DAY + DAY + self.delay
+
+
+class IndicatorSpec:
+    """
+    One indicator of the catalogue
+
+    :param value_field: Column holding the headline value; the first column when None.
+    """
+
+    def __init__(self, service: Type[CoinglassAPIBase], policy: Any, value_field: Optional[str] = None):
+        self.service = service
+        self.policy = policy
+        self.value_field = value_field
+
+
+DAILY = DailyRollover(delay=600)
+
+INDICATORS: Dict[str, IndicatorSpec] = {
+    "fear_greed": IndicatorSpec(FearGreedIndexService, DAILY, "value"),
+    "option_vs_futures_oi_ratio": IndicatorSpec(OptionVsFuturesOIRatioService, MaxAge(3600)),
+    "bitcoin_vs_global_m2": IndicatorSpec(BitcoinVsGlobalM2GrowthService, DAILY),
+    "bitcoin_vs_us_m2": IndicatorSpec(BitcoinVsUSM2GrowthService, DAILY),
+    "ahr999": IndicatorSpec(AHR999Service, DAILY, "ahr999_value"),
+    "two_year_ma_multiplier": IndicatorSpec(TwoYearMAMultiplierService, DAILY),
+    "two_hundred_week_ma_heatmap": IndicatorSpec(TwoHundredWeekMAHeatmapService, DAILY),
+    "altcoin_season": IndicatorSpec(AltcoinSeasonIndexService, DAILY, "altcoin_index"),
+    "sth_sopr": IndicatorSpec(BitcoinShortTermHolderSOPRService, DAILY, "short_term_holder_sopr"),
+    "lth_sopr": IndicatorSpec(BitcoinLongTermHolderSOPRService, DAILY, "long_term_holder_sopr"),
+    "sth_realized_price": IndicatorSpec(BitcoinShortTermHolderRealizedPriceService, DAILY),
+    "lth_realized_price": IndicatorSpec(BitcoinLongTermHolderRealizedPriceService, DAILY),
+    "sth_supply": IndicatorSpec(BitcoinShortTermHolderSupplyService, DAILY),
+    "lth_supply": IndicatorSpec(BitcoinLongTermHolderSupplyService, DAILY),
+    "rhodl_ratio": IndicatorSpec(BitcoinRHODLRatioService, DAILY, "rhodl_ratio"),
+    "reserve_risk": IndicatorSpec(BitcoinReserveRiskService, DAILY, "reserve_risk_index"),
+    "active_addresses": IndicatorSpec(BitcoinActiveAddressesService, DAILY),
+    "new_addresses": IndicatorSpec(BitcoinNewAddressesService, DAILY),
+    "nupl": IndicatorSpec(BitcoinNetUnrealizedPNLService, DAILY, "net_unrealized_pnl"),
+    "btc_correlations": IndicatorSpec(BTCCorrelationsService, DAILY),
+    "macro_oscillator": IndicatorSpec(BitcoinMacroOscillatorService, DAILY),
+    "rainbow_chart": IndicatorSpec(BitcoinRainbowChartService, DAILY),
+    "profitable_days": IndicatorSpec(BitcoinProfitableDaysService, DAILY),
+    "puell_multiple": IndicatorSpec(PuellMultipleService, DAILY, "puell_multiple"),
+    "stock_to_flow": IndicatorSpec(StockToFlowService, DAILY),
+    "pi_cycle_top": IndicatorSpec(PiCycleTopIndicatorService, DAILY),
+    "golden_ratio_multiplier": IndicatorSpec(GoldenRatioMultiplierService, DAILY),
+    "bull_market_peak": IndicatorSpec(BullMarketPeakIndicatorService, MaxAge(3600)),
+    "coinbase_premium": IndicatorSpec(CoinbasePremiumIndexService, MaxAge(300), "premium_rate"),
+    "bitfinex_margin_long_short": IndicatorSpec(BitfinexMarginLongShortService, MaxAge(900)),
+    "borrow_interest_rate": IndicatorSpec(BorrowInterestRateHistoryService, MaxAge(3600)),
+}
+
+
+def _to_ms(value: Any) -> Optional[int]:
+    """Epoch seconds, epoch milliseconds or a 'YYYY-MM-DD' / 'YYYY/MM/DD' date as milliseconds"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                day = datetime.strptime(value[:10].replace("/", "-"), "%Y-%m-%d")
+            except ValueError:
+                return None
+            return int(day.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    value = int(value)
+    return value * 1000 if value < 100_000_000_000 else value
+
+
+def _float(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_history(data: Any) -> Tuple[array, Dict[str, array]]:
+    """
+    Normalise an indicator payload into a time column and numeric value columns
+
+    Handles a dict of parallel `time_list` / `*_list` arrays (`data_list` becomes `value`),
+    a list of records with a time field, and rows of values led or trailed by a timestamp. Payloads
+    without a time axis give empty columns.
+    """
+    times = array("q")
+    columns: Dict[str, array] = {}
+    if isinstance(data, dict) and isinstance(data.get("time_list"), list):
+        stamps = [_to_ms(t) for t in data["time_list"]]
+        keep = [i for i, t in enumerate(stamps) if t is not None]
+        times.extend(stamps[i] for i in keep)
+        for name, values in data.items():
+            if name == "time_list" or not name.endswith("_list") or not isinstance(values, list) \
+                    or len(values) != len(stamps):
+                continue
+            column = "value" if name == "data_list" else name[:-5]
+            parsed = [_float(values[i]) for i in keep]
+            if any(v is not None for v in parsed):
+                columns[column] = array("d", (float("nan") if v is None else v for v in parsed))
+        return times, columns
+    if not isinstance(data, list) or not data:
+        return times, columns
+
+    rows: List[Tuple[int, Dict[str, float]]] = []
+    for record in data:
+        if isinstance(record, dict):
+            field = next((name for name in TIME_FIELDS if name in record), None)
+            stamp = _to_ms(record.get(field)) if field else None
+            values = {name: v for name, v in ((n, _float(x)) for n, x in record.items() if n != field)
+                      if v is not None}
+        elif isinstance(record, (list, tuple)) and record:
+            # The timestamp leads or trails the row (e.g. the rainbow chart puts it last)
+            last = (_float(record[-1]) or 0) > 1e9 and not (_float(record[0]) or 0) > 1e9
+            stamp = _to_ms(record[-1] if last else record[0])
+            rest = record[:-1] if last else record[1:]
+            values = {f"v{i}": v for i, v in enumerate(map(_float, rest)) if v is not None}
+        else:
+            continue
+        if stamp is not None:
+            rows.append((stamp, values))
+    rows.sort(key=lambda row: row[0])
+    names = list(dict.fromkeys(name for _, values in rows for name in values))
+    times.extend(stamp for stamp, _ in rows)
+    for name in names:
+        columns[name] = array("d", (values.get(name, float("nan")) for _, values in rows))
+    return times, columns
+
+
+class IndicatorSeries:
+    """One loaded indicator: its raw payload, parsed history and freshness"""
+
+    __slots__ = ("name", "data", "times", "columns", "value_field", "fetched_at", "expires_at")
+
+    def __init__(self, name: str, data: Any, value_field: Optional[str], fetched_at: float, expires_at: float):
+        self.name = name
+        self.data = data
+        self.times, self.columns = parse_history(data)
+        self.value_field = value_field if value_field in self.columns else next(iter(self.columns), None)
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return self.times[-1] if self.times else None
+
+    def latest(self, field: Optional[str] = None) -> Optional[float]:
+        column = self.columns.get(field or self.value_field or "")
+        for i in range(len(column) - 1, -1, -1) if column is not None else ():
+            if column[i] == column[i]:
+                return column[i]
+        return None
+
+    def history(self, field: Optional[str] = None) -> Tuple[array, array]:
+        return self.times, self.columns.get(field or self.value_field or "", array("d"))
+
+
+class IndicatorLoader:
+    """
+    The indicator catalogue held in memory
+
+    The first lookup loads every indicator concurrently. Later lookups are served from memory
+    and only check the indicator's expiry. Once an indicator expires, the next lookup refetches
+    every expired indicator in one fan-out. A daily indicator whose refetch still ends on the
+    previous day is retried every `policy.retry` seconds until the new value shows up.
+
+    :param indicators: Names from `INDICATORS` to load; all of them by default.
+    :param max_workers: Concurrent requests per load.
+    :param clock: Time source in epoch seconds.
+    """
+
+    def __init__(self, indicators: Optional[Sequence[str]] = None, max_workers: int = 16,
+                 clock: Callable[[], float] = time.time):
+        self.names = list(indicators or INDICATORS)
+        unknown = set(self.names).difference(INDICATORS)
+        if unknown:
+            raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+        self.max_workers = max_workers
+        self.clock = clock
+        self.services = {name: INDICATORS[name].service() for name in self.names}
+        self.series: Dict[str, IndicatorSeries] = {}
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def stale(self, now: Optional[float] = None) -> List[str]:
+        now = self.clock() if now is None else now
+        return [name for name in self.names if name not in self.series or self.series[name].expires_at <= now]
+
+    def _fetch(self, name: str) -> Any:
+        data = self.services[name].fetch_data()
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching {name}: {data.get('msg')}")
+        return data.get("data")
+
+    def _expiry(self, name: str, previous: Optional[IndicatorSeries], series: IndicatorSeries, now: float) -> float:
+        policy = INDICATORS[name].policy
+        expires_at = policy.expires_at(now)
+        if (policy.retry and previous is not None and previous.last_time is not None
+                and series.last_time == previous.last_time and previous.expires_at <= now):
+            # Past the rollover but the upstream has not published the new day yet
+            expires_at = min(expires_at, now + policy.retry)
+        return expires_at
+
+    @traced()
+    def load(self, names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Fetch expired (or, with `force`, all) indicators concurrently
+
+        :return: Names fetched and errors per name
+        """
+        with self._lock:
+            now = self.clock()
+            wanted = list(names) if names is not None else self.names
+            due = wanted if force else [name for name in self.stale(now) if name in wanted]
+            if not due:
+                return {"fetched": [], "errors": {}}
+            errors: Dict[str, str] = {}
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(due))) as executor:
+                futures = {name: executor.submit(contextvars.copy_context().run, self._fetch, name) for name in due}
+                for name, future in futures.items():
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        errors[name] = str(e)
+                        previous = self.series.get(name)
+                        if previous is not None:
+                            # Keep serving the last good copy; try again after the retry delay
+                            previous.expires_at = now + (INDICATORS[name].policy.retry or 60.0)
+                        continue
+                    series = IndicatorSeries(name, data, INDICATORS[name].value_field, now, 0.0)
+                    series.expires_at = self._expiry(name, self.series.get(name), series, now)
+                    self.series[name] = series
+            self.errors.update(errors)
+            for name in due:
+                if name not in errors:
+                    self.errors.pop(name, None)
+            return {"fetched": [name for name in due if name not in errors], "errors": errors}
+
+    def get(self, name: str) -> IndicatorSeries:
+        """The indicator, refreshing every expired indicator first if this one has expired"""
+        series = self.series.get(name)
+        if series is None or series.expires_at <= self.clock():
+            self.load()
+            series = self.series.get(name)
+            if series is None:
+                raise ValueError(f"Error fetching {name}: {self.errors.get(name, 'not loaded')}")
+        return series
+
+    def raw(self, name: str) -> Any:
+        """The indicator's `data` payload as returned by the API"""
+        return self.get(name).data
+
+    def latest(self, name: str, field: Optional[str] = None) -> Optional[float]:
+        """Latest non-NaN value of the indicator's headline (or given) column"""
+        return self.get(name).latest(field)
+
+    def history(self, name: str, field: Optional[str] = None) -> Tuple[array, array]:
+        """(times in ms, values) of the indicator's headline (or given) column"""
+        return self.get(name).history(field)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Fetch time, expiry, history length and last error of every indicator"""
+        return {name: {"fetched_at": s.fetched_at if s else None, "expires_at": s.expires_at if s else None,
+                       "points": len(s.times) if s else 0, "error": self.errors.get(name)}
+                for name, s in ((name, self.series.get(name)) for name in self.names)}
@@ -11,12 +11,20 @@ from services.indicators import (
     CoinbasePremiumIndexService,
     BitfinexMarginLongShortService
 )
+from services.base import CoinglassAPIBase
+from services.tracing import traced
+from managers.indicator_loader import IndicatorLoader
 
 
 class IndicatorsManager:
-    """Manager class for handling Bitcoin indicators and market metrics"""
+    """
+    Manager class for handling Bitcoin indicators and market metrics
+
+    :param loader: Serve indicators from an `IndicatorLoader` instead of requesting them on every call.
+    """
     
-    def __init__(self):
+    def __init__(self, loader: Optional[IndicatorLoader] = None):
+        self.loader = loader
         self.fear_greed_service = FearGreedIndexService()
         self.rainbow_chart_service = BitcoinRainbowChartService()
         self.ahr999_service = AHR999Service()
@@ -27,46 +35,59 @@ class IndicatorsManager:
         self.active_addresses_service = BitcoinActiveAddressesService()
         self.coinbase_premium_service = CoinbasePremiumIndexService()
         self.bitfinex_margin_service = BitfinexMarginLongShortService()
+
+    def _fetch(self, name: str, service: CoinglassAPIBase) -> Dict[str, Any]:
+        """Response of an indicator endpoint, from the loader when one is set"""
+        if self.loader is None or name not in self.loader.names:
+            return service.fetch_data()
+        try:
+            return {"code": "0", "msg": "success", "data": self.loader.raw(name)}
+        except ValueError as e:
+            return {"code": "-1", "msg": str(e)}
     
+    @traced()
     def get_fear_greed_index(self) -> Dict[str, Any]:
         """
         Get the current and historical Fear & Greed Index
         
         :return: Fear & Greed Index data
         """
-        data = self.fear_greed_service.fetch_data()
+        data = self._fetch("fear_greed", self.fear_greed_service)
         
         if data.get("code") != "0":
             raise ValueError(f"Error fetching Fear & Greed Index: {data.get('msg')}")
         
         return data.get("data", {})
     
+    @traced()
     def get_bitcoin_rainbow_chart(self) -> Dict[str, Any]:
         """
         Get Bitcoin Rainbow Chart data
         
         :return: Rainbow Chart data points
         """
-        data = self.rainbow_chart_service.fetch_data()
+        data = self._fetch("rainbow_chart", self.rainbow_chart_service)
         
         if data.get("code") != "0":
             raise ValueError(f"Error fetching Rainbow Chart: {data.get('msg')}")
         
         return data.get("data", [])
     
+    @traced()
     def get_ahr999_index(self) -> Dict[str, Any]:
         """
         Get AHR999 Index value
         
         :return: AHR999 Index data
         """
-        data = self.ahr999_service.fetch_data()
+        data = self._fetch("ahr999", self.ahr999_service)
         
         if data.get("code") != "0":
             raise ValueError(f"Error fetching AHR999 Index: {data.get('msg')}")
         
         return data.get("data", {})
     
+    @traced()
     def get_market_sentiment_overview(self) -> Dict[str, Any]:
         """
         Get a comprehensive overview of market sentiment indicators
@@ -99,7 +120,7 @@ class IndicatorsManager:
         
         # Coinbase Premium
         try:
-            premium_data = self.coinbase_premium_service.fetch_data()
+            premium_data = self._fetch("coinbase_premium", self.coinbase_premium_service)
             if premium_data.get("code") == "0" and premium_data.get("data"):
                 latest_premium = premium_data["data"][-1] if premium_data["data"] else {}
                 sentiment_data["coinbase_premium"] = {
@@ -111,6 +132,7 @@ class IndicatorsManager:
         
         return sentiment_data
     
+    @traced()
     def get_on_chain_metrics(self) -> Dict[str, Any]:
         """
         Get comprehensive on-chain metrics
@@ -121,7 +143,7 @@ class IndicatorsManager:
         
         # Bitcoin Profitable Days
         try:
-            profitable_data = self.profitable_days_service.fetch_data()
+            profitable_data = self._fetch("profitable_days", self.profitable_days_service)
             if profitable_data.get("code") == "0":
                 metrics["profitable_days_percent"] = profitable_data.get("data", {}).get("percent_profitable_days")
         except Exception as e:
@@ -129,7 +151,7 @@ class IndicatorsManager:
         
         # NUPL (Net Unrealized Profit/Loss)
         try:
-            nupl_data = self.nupl_service.fetch_data()
+            nupl_data = self._fetch("nupl", self.nupl_service)
             if nupl_data.get("code") == "0" and nupl_data.get("data"):
                 latest_nupl = nupl_data["data"][-1] if isinstance(nupl_data["data"], list) else nupl_data["data"]
                 metrics["nupl"] = {
@@ -141,7 +163,7 @@ class IndicatorsManager:
         
         # Active Addresses
         try:
-            active_addr_data = self.active_addresses_service.fetch_data()
+            active_addr_data = self._fetch("active_addresses", self.active_addresses_service)
             if active_addr_data.get("code") == "0" and active_addr_data.get("data"):
                 metrics["active_addresses"] = active_addr_data["data"]
         except Exception as e:
@@ -149,6 +171,7 @@ class IndicatorsManager:
         
         return metrics
     
+    @traced()
     def get_valuation_metrics(self) -> Dict[str, Any]:
         """
         Get Bitcoin valuation metrics
@@ -159,7 +182,7 @@ class IndicatorsManager:
         
         # Puell Multiple
         try:
-            puell_data = self.puell_multiple_service.fetch_data()
+            puell_data = self._fetch("puell_multiple", self.puell_multiple_service)
             if puell_data.get("code") == "0":
                 valuation["puell_multiple"] = puell_data.get("data", {})
         except Exception as e:
@@ -167,7 +190,7 @@ class IndicatorsManager:
         
         # Stock-to-Flow
         try:
-            s2f_data = self.stock_to_flow_service.fetch_data()
+            s2f_data = self._fetch("stock_to_flow", self.stock_to_flow_service)
             if s2f_data.get("code") == "0":
                 valuation["stock_to_flow"] = s2f_data.get("data", {})
         except Exception as e:
@@ -7,6 +7,8 @@ from services.liquidation import (
     LiquidationCoinListService,
     LiquidationExchangeListService
 )
+from services.tracing import traced
+from managers.streams import LiquidationEventStream
 
 
 class LiquidationManager:
@@ -20,6 +22,7 @@ class LiquidationManager:
         self.coin_list_service = LiquidationCoinListService()
         self.exchange_list_service = LiquidationExchangeListService()
     
+    @traced()
     def get_liquidation_history(self, symbol: str, interval: str = "1h") -> Dict[str, Any]:
         """
         Get liquidation history for a specific symbol
@@ -35,6 +38,7 @@ class LiquidationManager:
         
         return data.get("data", [])
     
+    @traced()
     def get_aggregated_liquidation_history(self, symbol: str, interval: str = "1h") -> Dict[str, Any]:
         """
         Get aggregated liquidation history across all exchanges
@@ -50,6 +54,7 @@ class LiquidationManager:
         
         return data.get("data", [])
     
+    @traced()
     def get_liquidation_heatmap(self, symbol: str) -> Dict[str, Any]:
         """
         Get liquidation heatmap data for visualization
@@ -64,6 +69,7 @@ class LiquidationManager:
         
         return data.get("data", {})
     
+    @traced()
     def get_large_liquidation_orders(self) -> List[Dict[str, Any]]:
         """
         Get recent large liquidation orders
@@ -77,6 +83,30 @@ class LiquidationManager:
         
         return data.get("data", [])
     
+    def stream_liquidation_orders(self, poll_interval: float = 5.0, symbol: Optional[str] = None,
+                                  exchange: Optional[str] = None, min_usd: float = 0.0,
+                                  capacity: int = 65536, max_lateness: float = 0.0,
+                                  on_error=None) -> LiquidationEventStream:
+        """
+        Stream new liquidation orders instead of re-reading the whole snapshot
+        
+        Iterate the result (or `async for` over it) to receive each order exactly once, in
+        timestamp order. Deduplication uses a bounded fingerprint ring, so memory stays
+        constant during liquidation cascades.
+        
+        :param poll_interval: Seconds between polls of /futures/liquidation/order
+        :param symbol: Only orders for this coin (e.g. 'BTC')
+        :param exchange: Only orders from this exchange
+        :param min_usd: Minimum order value in USD
+        :param capacity: Number of fingerprints remembered for deduplication
+        :param max_lateness: Seconds to buffer events so late arrivals stay in order
+        :param on_error: Called with poll exceptions; if omitted they are raised
+        :return: Iterable / async iterable of liquidation orders
+        """
+        return LiquidationEventStream(self.order_service, poll_interval, symbol, exchange, min_usd,
+                                      capacity, max_lateness, on_error)
+    
+    @traced()
     def get_supported_coins(self) -> List[str]:
         """
         Get list of coins with available liquidation data
@@ -90,6 +120,7 @@ class LiquidationManager:
         
         return data.get("data", [])
     
+    @traced()
     def get_supported_exchanges(self) -> List[str]:
         """
         Get list of exchanges with liquidation data
@@ -103,6 +134,7 @@ class LiquidationManager:
         
         return data.get("data", [])
     
+    @traced()
     def analyze_liquidation_trends(self, symbol: str, interval: str = "1h", periods: int = 24) -> Dict[str, Any]:
         """
         Analyze liquidation trends for a given symbol
@@ -0,0 +1,288 @@
+"""Long/short ratio histories for many (symbol, exchange) pairs on one aligned panel backed by the archive"""
+
+import bisect
+import contextvars
+import math
+import operator
+import os
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from services.base import CoinglassAPIBase
+from services.long_short_ratio import (
+    AggregatedTakerBuySellHistoryService,
+    GlobalAccountRatioService,
+    TakerBuySellRatioHistoryService,
+    TopAccountRatioHistoryService,
+    TopPositionRatioHistoryService,
+)
+from services.tracing import traced
+from storage.archive import INTERVAL_MS, ArchiveReader, ArchiveWriter, endpoint_slug
+
+
+SeriesKey = Tuple[str, str, str]          # (dataset, symbol, exchange)
+
+
+class RatioDataset:
+    """
+    A long/short history endpoint with its archive fields
+
+    :param ratio: One field holding the ratio, or a (numerator, denominator) pair it is derived from.
+    """
+
+    def __init__(self, endpoint: str, service: Type[CoinglassAPIBase], fields: Sequence[str], ratio: Sequence[str]):
+        self.endpoint = endpoint
+        self.service = service
+        self.fields = tuple(fields)
+        self.ratio = tuple(ratio)
+
+    def values(self, columns: Dict[str, Sequence[float]]) -> array:
+        if len(self.ratio) == 1:
+            return array("d", columns[self.ratio[0]])
+        return array("d", map(lambda a, b: a / b if b else math.nan,
+                              columns[self.ratio[0]], columns[self.ratio[1]]))
+
+
+RATIO_DATASETS: Dict[str, RatioDataset] = {
+    "global_account": RatioDataset(
+        "/futures/global-long-short-account-ratio/history", GlobalAccountRatioService,
+        ("time", "global_account_long_percent", "global_account_short_percent", "global_account_long_short_ratio"),
+        ("global_account_long_short_ratio",)),
+    "top_account": RatioDataset(
+        "/futures/top-long-short-account-ratio/history", TopAccountRatioHistoryService,
+        ("time", "top_account_long_percent", "top_account_short_percent", "top_account_long_short_ratio"),
+        ("top_account_long_short_ratio",)),
+    "top_position": RatioDataset(
+        "/futures/top-long-short-position-ratio/history", TopPositionRatioHistoryService,
+        ("time", "top_position_long_percent", "top_position_short_percent", "top_position_long_short_ratio"),
+        ("top_position_long_short_ratio",)),
+    "taker": RatioDataset(
+        "/futures/taker-buy-sell-volume/history", TakerBuySellRatioHistoryService,
+        ("time", "taker_buy_volume_usd", "taker_sell_volume_usd"),
+        ("taker_buy_volume_usd", "taker_sell_volume_usd")),
+    "aggregated_taker": RatioDataset(
+        "/futures/aggregated-taker-buy-sell-volume/history", AggregatedTakerBuySellHistoryService,
+        ("time", "aggregated_buy_volume_usd", "aggregated_sell_volume_usd"),
+        ("aggregated_buy_volume_usd", "aggregated_sell_volume_usd")),
+}
+
+
+def percentile_rank(values: Sequence[float], value: float) -> Optional[float]:
+    """Share (0-100) of non-NaN `values` at or below `value`"""
+    ordered = sorted(v for v in values if v == v)
+    if not ordered or value != value:
+        return None
+    return bisect.bisect_right(ordered, value) / len(ordered) * 100
+
+
+class RatioPanel:
+    """
+    Bar times shared by every series, with one float64 column per (dataset, symbol, exchange).
+
+    Columns are NaN where a series has no bar, so columns of different exchanges line
+    up element by element and cross-exchange statistics are plain `map`s over them.
+    """
+
+    def __init__(self):
+        self.times = array("q")
+        self.columns: Dict[SeriesKey, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _align(self, times: Sequence[int]) -> None:
+        stored = self.times[bisect.bisect_left(self.times, times[0]):]
+        new_times = sorted(set(times).difference(stored))
+        if not new_times:
+            return
+        if not self.times or new_times[0] > self.times[-1]:
+            # Refreshes only ever add bars after the newest one
+            self.times.extend(new_times)
+            padding = array("d", [math.nan]) * len(new_times)
+            for column in self.columns.values():
+                column.extend(padding)
+            return
+        merged = array("q", sorted(set(self.times).union(new_times)))
+        position = {t: i for i, t in enumerate(merged)}
+        for key, column in self.columns.items():
+            aligned = array("d", [math.nan]) * len(merged)
+            for t, value in zip(self.times, column):
+                aligned[position[t]] = value
+            self.columns[key] = aligned
+        self.times = merged
+
+    def merge(self, key: SeriesKey, times: Sequence[int], values: Sequence[float]) -> None:
+        """Write (and overwrite) bars of one series"""
+        if not len(times):
+            return
+        self._align(times)
+        column = self.columns.get(key)
+        if column is None:
+            column = self.columns[key] = array("d", [math.nan]) * len(self.times)
+        start = bisect.bisect_left(self.times, times[0])
+        position = {t: i for i, t in enumerate(self.times[start:], start)}
+        for t, value in zip(times, values):
+            column[position[t]] = value
+
+    def last_value(self, key: SeriesKey) -> Tuple[Optional[int], Optional[float]]:
+        column = self.columns.get(key)
+        for i in range(len(self.times) - 1, -1, -1) if column is not None else ():
+            if column[i] == column[i]:
+                return self.times[i], column[i]
+        return None, None
+
+
+class LongShortRatioManager:
+    """
+    Long/short ratio and taker histories for many (symbol, exchange) pairs
+
+    Every series is kept in an archive file under
+    `<root>/<endpoint slug>/<SYMBOL>/<exchange>/<interval>.cga`. A refresh requests each
+    series concurrently from its last stored bar on (the full history on the first run),
+    appends what is new, and merges only those bars into the in-memory `RatioPanel`.
+
+    :param root: Archive directory.
+    :param pairs: (symbol, exchange) pairs to track; symbols are passed to the API as given.
+    :param interval: Bar interval.
+    :param datasets: Names from `RATIO_DATASETS`; defaults to the per-exchange ratio histories.
+    :param max_workers: Concurrent requests per refresh.
+    :param max_bars: Limit of the first (full-history) request of a series.
+    """
+
+    def __init__(self, root: str, pairs: Sequence[Tuple[str, str]], interval: str = "1h",
+                 datasets: Optional[Sequence[str]] = None, max_workers: int = 16, max_bars: Optional[int] = None):
+        self.root = root
+        self.pairs = [(symbol, exchange) for symbol, exchange in pairs]
+        self.interval = interval
+        self.datasets = list(datasets or ("global_account", "top_account", "top_position", "taker"))
+        unknown = set(self.datasets).difference(RATIO_DATASETS)
+        if unknown:
+            raise ValueError(f"Unknown long/short datasets: {sorted(unknown)}")
+        self.max_workers = max_workers
+        self.max_bars = max_bars
+        self.services = {name: RATIO_DATASETS[name].service() for name in self.datasets}
+        self.panel = RatioPanel()
+        self._merged: Dict[SeriesKey, int] = {}
+
+    def path_for(self, dataset: str, symbol: str, exchange: str) -> str:
+        return os.path.join(self.root, endpoint_slug(RATIO_DATASETS[dataset].endpoint), symbol.upper(),
+                            exchange.replace(",", "+"), f"{self.interval}.cga")
+
+    def _sync(self, key: SeriesKey) -> int:
+        dataset, symbol, exchange = key
+        path = self.path_for(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        spec = RATIO_DATASETS[dataset]
+        with ArchiveWriter(path, spec.fields, INTERVAL_MS.get(self.interval, 0)) as writer:
+            # The last stored bar is requested again since it may still be open
+            start = writer.last_time
+            data = self.services[dataset].fetch_data(symbol=symbol, exchange=exchange, interval=self.interval,
+                                                     start_time=start, limit=None if start else self.max_bars)
+            if data.get("code") != "0":
+                raise ValueError(f"Error fetching {dataset} history: {data.get('msg')}")
+            return writer.append(data.get("data") or [])
+
+    def _load(self, key: SeriesKey) -> int:
+        """Merge bars stored since the last merge of a series into the panel"""
+        path = self.path_for(*key)
+        if not os.path.exists(path):
+            return 0
+        with ArchiveReader(path) as reader:
+            since = self._merged.get(key)
+            batch = reader.range(since)
+            times = array("q", batch["time"])
+            values = RATIO_DATASETS[key[0]].values(batch.columns)
+            del batch
+            if len(times):
+                self._merged[key] = times[-1]
+        self.panel.merge(key, times, values)
+        return len(times)
+
+    @traced()
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Fetch the newest bars of every series and merge them into the panel
+
+        :return: Bars appended per series, errors per series and the panel length
+        """
+        keys = [(dataset, symbol, exchange) for dataset in self.datasets for symbol, exchange in self.pairs]
+        appended: Dict[str, int] = {}
+        errors: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {key: executor.submit(contextvars.copy_context().run, self._sync, key) for key in keys}
+            for key, future in futures.items():
+                name = "/".join(key)
+                try:
+                    appended[name] = future.result()
+                except Exception as e:
+                    errors[name] = str(e)
+        for key in keys:
+            self._load(key)
+        return {"appended": appended, "errors": errors, "bars": len(self.panel)}
+
+    def get_series(self, symbol: str, exchange: str, dataset: str = "global_account") -> Dict[str, List[Any]]:
+        """Ratio history of one series, bars without a value left out"""
+        column = self.panel.columns.get((dataset, symbol, exchange))
+        if column is None:
+            return {"time": [], "value": []}
+        present = [i for i, value in enumerate(column) if value == value]
+        return {"time": [self.panel.times[i] for i in present], "value": [column[i] for i in present]}
+
+    def get_divergence(self, symbol: str, dataset: str = "global_account",
+                       exchanges: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Cross-exchange divergence of one symbol's ratio
+
+        :return: Per bar the mean across exchanges and the spread (max - min); for the
+            latest bar each exchange's deviation from the mean
+        """
+        exchanges = list(exchanges or [e for s, e in self.pairs if s == symbol])
+        keys = [(dataset, symbol, e) for e in exchanges if (dataset, symbol, e) in self.panel.columns]
+        if not keys:
+            return {"time": [], "mean": [], "spread": [], "latest": {}}
+        columns = [self.panel.columns[key] for key in keys]
+
+        def stats(*values):
+            present = [v for v in values if v == v]
+            if len(present) < 2:
+                return math.nan, math.nan
+            return math.fsum(present) / len(present), max(present) - min(present)
+
+        rows = list(map(stats, *columns))
+        mean = array("d", map(operator.itemgetter(0), rows))
+        spread = array("d", map(operator.itemgetter(1), rows))
+        latest = {}
+        for i in range(len(self.panel) - 1, -1, -1):
+            if mean[i] == mean[i]:
+                latest = {key[2]: column[i] - mean[i] for key, column in zip(keys, columns) if column[i] == column[i]}
+                break
+        return {"time": list(self.panel.times), "mean": list(mean), "spread": list(spread), "latest": latest}
+
+    def get_percentile_ranks(self, dataset: str = "global_account", lookback: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Latest ratio of every pair ranked against its own history
+
+        :param lookback: Bars of history to rank against (all when None).
+        :return: {"<symbol>/<exchange>": {"time", "value", "percentile"}}
+        """
+        ranks = {}
+        for symbol, exchange in self.pairs:
+            key = (dataset, symbol, exchange)
+            column = self.panel.columns.get(key)
+            if column is None:
+                continue
+            time_, value = self.panel.last_value(key)
+            window = column[-lookback:] if lookback else column
+            ranks[f"{symbol}/{exchange}"] = {"time": time_, "value": value,
+                                             "percentile": percentile_rank(window, value)}
+        return ranks
+
+    def get_latest(self, dataset: str = "global_account") -> Dict[str, Dict[str, Any]]:
+        """Latest ratio of every pair; with the cross-sectional rank of each among all pairs"""
+        latest = {f"{symbol}/{exchange}": self.panel.last_value((dataset, symbol, exchange))
+                  for symbol, exchange in self.pairs}
+        values = [value for _, value in latest.values() if value is not None]
+        return {name: {"time": t, "value": value,
+                       "cross_percentile": percentile_rank(values, value) if value is not None else None}
+                for name, (t, value) in latest.items()}
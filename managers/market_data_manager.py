@@ -10,6 +10,7 @@ from services.open_interest import (
     AggregatedOpenInterestHistoryService
 )
 from services.price_data import PriceHistoryService
+from services.tracing import traced
 
 
 class MarketDataManager:
@@ -24,6 +25,7 @@ class MarketDataManager:
         self.oi_history_service = AggregatedOpenInterestHistoryService()
         self.price_history_service = PriceHistoryService()
     
+    @traced()
     def get_market_overview(self, top_n: int = 10) -> Dict[str, Any]:
         """
         Get comprehensive market overview for top coins
@@ -60,6 +62,7 @@ class MarketDataManager:
         
         return overview
     
+    @traced()
     def get_coin_analysis(self, symbol: str) -> Dict[str, Any]:
         """
         Get comprehensive analysis for a specific coin
@@ -123,6 +126,7 @@ class MarketDataManager:
         
         return analysis
     
+    @traced()
     def get_pairs_performance(self, exchange: str = "Binance", top_n: int = 20) -> List[Dict[str, Any]]:
         """
         Get performance metrics for top trading pairs on an exchange
@@ -155,6 +159,7 @@ class MarketDataManager:
         except Exception as e:
             return [{"error": str(e)}]
     
+    @traced()
     def compare_exchanges(self, symbol: str = "BTC") -> Dict[str, Any]:
         """
         Compare metrics across exchanges for a given coin
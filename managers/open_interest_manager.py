@@ -0,0 +1,322 @@
+"""Open interest panel across exchanges and margin types for many symbols"""
+
+import bisect
+import contextvars
+import math
+import operator
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services.open_interest import (
+    AggregatedOpenInterestHistoryService,
+    CoinMarginOpenInterestHistoryService,
+    OpenInterestExchangeHistoryChartService,
+    OpenInterestExchangeListService,
+    StablecoinMarginOpenInterestHistoryService,
+)
+from services.price_data import PriceHistoryService
+from services.tracing import traced
+from storage.archive import INTERVAL_MS
+
+
+MARGINS = ("all", "stablecoin", "coin")
+ALL = "All"
+NAN = float("nan")
+
+
+def _close(record: Dict[str, Any]) -> float:
+    value = record.get("close", record.get("open_interest_usd"))
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def _ratio(a: float, b: float) -> float:
+    return a / b if b else NAN
+
+
+class OIPanel:
+    """
+    Open interest of one symbol as a time × exchange × margin-type cube.
+
+    Cells live in one flat float64 array in row-major order, so bar `t` is the slice
+    `cells[t * stride:(t + 1) * stride]` and one (exchange, margin) series is the strided
+    slice `cells[e * M + m::stride]`. Exchange `All` (index 0) holds the aggregated series.
+    Missing cells are NaN. `volume` holds the futures volume of each bar.
+    """
+
+    def __init__(self, interval_ms: int):
+        self.interval_ms = interval_ms
+        self.times = array("q")
+        self.exchanges: List[str] = [ALL]
+        self.cells = array("d")
+        self.volume = array("d")
+        self.version = 0
+
+    @property
+    def stride(self) -> int:
+        return len(self.exchanges) * len(MARGINS)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _exchange_index(self, exchange: str) -> int:
+        try:
+            return self.exchanges.index(exchange)
+        except ValueError:
+            pass
+        old, width = self.stride, len(MARGINS)
+        self.exchanges.append(exchange)
+        padding = array("d", [NAN]) * width
+        cells = array("d")
+        for t in range(len(self.times)):
+            cells.extend(self.cells[t * old:(t + 1) * old])
+            cells.extend(padding)
+        self.cells = cells
+        return len(self.exchanges) - 1
+
+    def _time_index(self, timestamp: int) -> int:
+        timestamp = timestamp // self.interval_ms * self.interval_ms
+        if not self.times or timestamp > self.times[-1]:
+            # New bars are appended; bars skipped in between stay as NaN rows
+            self.times.append(timestamp)
+            self.cells.extend(array("d", [NAN]) * self.stride)
+            self.volume.append(NAN)
+            return len(self.times) - 1
+        i = bisect.bisect_left(self.times, timestamp)
+        if self.times[i] != timestamp:
+            self.times.insert(i, timestamp)
+            stride = self.stride
+            self.cells[i * stride:i * stride] = array("d", [NAN]) * stride
+            self.volume.insert(i, NAN)
+        return i
+
+    def set(self, timestamp: int, exchange: str, margin: str, value: float) -> None:
+        e = self._exchange_index(exchange)
+        t = self._time_index(timestamp)
+        self.cells[t * self.stride + e * len(MARGINS) + MARGINS.index(margin)] = value
+        self.version += 1
+
+    def set_volume(self, timestamp: int, value: float) -> None:
+        self.volume[self._time_index(timestamp)] = value
+        self.version += 1
+
+    def series(self, exchange: str = ALL, margin: str = "all") -> array:
+        if exchange not in self.exchanges:
+            return array("d", [NAN]) * len(self.times)
+        offset = self.exchanges.index(exchange) * len(MARGINS) + MARGINS.index(margin)
+        return self.cells[offset::self.stride]
+
+    def last_time(self, exchange: str = ALL, margin: str = "all") -> Optional[int]:
+        column = self.series(exchange, margin)
+        for i in range(len(column) - 1, -1, -1):
+            if column[i] == column[i]:
+                return self.times[i]
+        return None
+
+
+class OpenInterestManager:
+    """
+    Time × exchange × margin-type open interest for many symbols
+
+    Per symbol a refresh requests the per-exchange history chart, the aggregated,
+    stablecoin-margin and coin-margin histories, the per-exchange snapshot and the price
+    history (for volume). Histories that accept a time window are requested from the last
+    stored bar on, and only bars at or after it are merged. All requests go through one
+    pool of `max_workers` threads.
+
+    :param symbols: Symbols to track.
+    :param interval: Bar interval of the panel.
+    :param max_workers: Concurrent requests across all symbols.
+    :param max_bars: Limit of the first request of a windowed history.
+    """
+
+    def __init__(self, symbols: Sequence[str], interval: str = "4h", max_workers: int = 8,
+                 max_bars: Optional[int] = None):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.max_workers = max_workers
+        self.max_bars = max_bars
+        self.aggregated_service = AggregatedOpenInterestHistoryService()
+        self.stablecoin_service = StablecoinMarginOpenInterestHistoryService()
+        self.coin_service = CoinMarginOpenInterestHistoryService()
+        self.chart_service = OpenInterestExchangeHistoryChartService()
+        self.exchange_list_service = OpenInterestExchangeListService()
+        self.price_service = PriceHistoryService()
+        self.panels: Dict[str, OIPanel] = {s: OIPanel(INTERVAL_MS[interval]) for s in self.symbols}
+        self._metrics: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _data(response: Dict[str, Any], what: str) -> Any:
+        if response.get("code") != "0":
+            raise ValueError(f"Error fetching {what}: {response.get('msg')}")
+        return response.get("data")
+
+    def _window(self, since: Optional[int]) -> Dict[str, Any]:
+        return {"start_time": since} if since is not None else {"limit": self.max_bars}
+
+    def _jobs(self, symbol: str) -> Dict[str, Callable[[], Any]]:
+        # Windows are read here, before any worker runs, since results are merged while others are in flight
+        panel = self.panels[symbol]
+        interval = self.interval
+        aggregated, stablecoin, coin = (self._window(panel.last_time(ALL, margin)) for margin in MARGINS)
+        volume = self._window(self._last_volume_time(panel))
+        return {
+            "aggregated": lambda: self.aggregated_service.fetch_data(symbol, interval, **aggregated),
+            "stablecoin": lambda: self.stablecoin_service.fetch_data(symbol, interval, **stablecoin),
+            "coin": lambda: self.coin_service.fetch_data(symbol, interval, **coin),
+            "volume": lambda: self.price_service.fetch_data(symbol, interval, **volume),
+            "chart": lambda: self.chart_service.fetch_data(symbol, range=interval),
+            "exchange_list": lambda: self.exchange_list_service.fetch_data(symbol),
+        }
+
+    @staticmethod
+    def _last_volume_time(panel: OIPanel) -> Optional[int]:
+        for i in range(len(panel) - 1, -1, -1):
+            if panel.volume[i] == panel.volume[i]:
+                return panel.times[i]
+        return None
+
+    def _merge(self, symbol: str, name: str, data: Any) -> int:
+        panel = self.panels[symbol]
+        merged = 0
+        if name in ("aggregated", "stablecoin", "coin"):
+            margin = "all" if name == "aggregated" else name
+            since = panel.last_time(ALL, margin)
+            for record in data or []:
+                timestamp = int(record.get("time") or 0)
+                if since is None or timestamp >= since:
+                    panel.set(timestamp, ALL, margin, _close(record))
+                    merged += 1
+        elif name == "volume":
+            since = self._last_volume_time(panel)
+            for record in data or []:
+                timestamp = int(record.get("time") or 0)
+                if since is None or timestamp >= since:
+                    panel.set_volume(timestamp, float(record.get("volume_usd") or NAN))
+                    merged += 1
+        elif name == "chart":
+            times = (data or {}).get("time_list") or []
+            for exchange, values in ((data or {}).get("data_map") or {}).items():
+                since = panel.last_time(exchange, "all")
+                start = 0 if since is None else bisect.bisect_left(times, since)
+                for timestamp, value in zip(times[start:], values[start:]):
+                    if value is not None:
+                        panel.set(int(timestamp), exchange, "all", float(value))
+                        merged += 1
+        elif name == "exchange_list":
+            # The snapshot fills the current bar, the only one with a per-exchange margin split;
+            # the aggregated split comes from the margin histories
+            now = int(time.time() * 1000)
+            for record in data or []:
+                exchange, total = record.get("exchange"), record.get("open_interest_usd")
+                if not exchange or exchange == ALL or total is None:
+                    continue
+                stable = float(record.get("open_interest_by_stable_coin_margin") or 0)
+                panel.set(now, exchange, "stablecoin", stable)
+                panel.set(now, exchange, "coin", max(0.0, float(total) - stable))
+                merged += 1
+        return merged
+
+    @traced()
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Fetch what is new for every symbol and merge it into the panels
+
+        :return: Cells merged per symbol, errors per request and elapsed seconds
+        """
+        started = time.monotonic()
+        merged = {symbol: 0 for symbol in self.symbols}
+        errors: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(symbol, name, executor.submit(contextvars.copy_context().run, job))
+                       for symbol in self.symbols for name, job in self._jobs(symbol).items()]
+            for symbol, name, future in futures:
+                try:
+                    merged[symbol] += self._merge(symbol, name, self._data(future.result(), f"{name} open interest"))
+                except Exception as e:
+                    errors[f"{symbol}/{name}"] = str(e)
+        return {"merged": merged, "errors": errors, "elapsed": time.monotonic() - started}
+
+    def get_metrics(self, symbol: str) -> Dict[str, Any]:
+        """
+        Per-bar open interest metrics of one symbol, computed in one pass over the panel
+
+        :return: `time`, `total` (aggregated OI, else the sum over exchanges), `delta`,
+            `delta_pct`, `oi_volume` (OI / bar volume), `stablecoin_share` and `shares`
+            (each exchange's share of the summed per-exchange OI)
+        """
+        panel = self.panels[symbol]
+        cached = self._metrics.get(symbol)
+        if cached is not None and cached[0] == panel.version:
+            return cached[1]
+
+        exchanges = panel.exchanges[1:]
+        columns = [panel.series(exchange, "all") for exchange in exchanges]
+        summed = array("d", map(lambda *values: math.fsum(v for v in values if v == v) if any(
+            v == v for v in values) else NAN, *columns)) if columns else array("d", [NAN]) * len(panel)
+        total = array("d", map(lambda a, s: a if a == a else s, panel.series(ALL, "all"), summed))
+        previous = array("d", [NAN]) + total[:-1]
+        delta = array("d", map(operator.sub, total, previous))
+        metrics = {
+            "time": panel.times,
+            "total": total,
+            "delta": delta,
+            "delta_pct": array("d", map(lambda d, p: d / p * 100 if p else NAN, delta, previous)),
+            "oi_volume": array("d", map(_ratio, total, panel.volume)),
+            "stablecoin_share": array("d", map(lambda s, c: _ratio(s, s + c), panel.series(ALL, "stablecoin"),
+                                               panel.series(ALL, "coin"))),
+            "shares": {exchange: array("d", map(_ratio, column, summed))
+                       for exchange, column in zip(exchanges, columns)},
+        }
+        self._metrics[symbol] = (panel.version, metrics)
+        return metrics
+
+    @staticmethod
+    def _last(values: Sequence[float], before: int = 0) -> Optional[float]:
+        """The last non-NaN value, skipping `before` bars from the end"""
+        for i in range(len(values) - 1 - before, -1, -1):
+            if values[i] == values[i]:
+                return values[i]
+        return None
+
+    def get_exchange_share_changes(self, symbol: str, bars: int = 6) -> List[Dict[str, Any]]:
+        """
+        Each exchange's current share of open interest and its change over `bars` bars
+
+        :return: Records sorted by absolute share change
+        """
+        shares = self.get_metrics(symbol)["shares"]
+        rows = []
+        for exchange, column in shares.items():
+            now, then = self._last(column), self._last(column, bars)
+            if now is None:
+                continue
+            rows.append({"exchange": exchange, "share": now,
+                         "change": now - then if then is not None else None})
+        return sorted(rows, key=lambda r: -abs(r["change"] or 0))
+
+    def get_margin_split(self, symbol: str) -> Dict[str, Dict[str, float]]:
+        """Latest stablecoin vs coin margin open interest per exchange"""
+        panel = self.panels[symbol]
+        split = {}
+        for exchange in panel.exchanges:
+            stable, coin = self._last(panel.series(exchange, "stablecoin")), self._last(panel.series(exchange, "coin"))
+            if stable is not None and coin is not None:
+                split[exchange] = {"stablecoin_usd": stable, "coin_usd": coin,
+                                   "stablecoin_share": _ratio(stable, stable + coin)}
+        return split
+
+    def get_summary(self) -> List[Dict[str, Any]]:
+        """Latest total, delta, OI/volume and stablecoin share of every symbol"""
+        rows = []
+        for symbol in self.symbols:
+            metrics = self.get_metrics(symbol)
+            rows.append({"symbol": symbol, **{name: self._last(metrics[name]) for name in
+                                              ("total", "delta", "delta_pct", "oi_volume", "stablecoin_share")}})
+        return rows
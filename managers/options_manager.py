@@ -0,0 +1,446 @@
+import bisect
+import contextvars
+import math
+import operator
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import accumulate, compress
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.options import (
+    MaxPainService,
+    OptionsImpliedVolatilityService,
+    OptionsOpenInterestByStrikeService,
+    OptionsVolumeByStrikeService,
+)
+from services.tracing import traced
+
+
+EXPIRY_FORMATS = ("%d%b%y", "%Y%m%d", "%Y-%m-%d", "%y%m%d")
+# Deribit-style settlement time of day
+SETTLEMENT_HOUR_UTC = 8
+YEAR_MS = 365 * 24 * 3600 * 1000
+
+
+def expiry_to_ms(expiry: Any) -> int:
+    """Settlement time in ms of an expiry given as '27MAR26', '20260327', '2026-03-27' or a timestamp"""
+    if isinstance(expiry, (int, float)) or str(expiry).isdigit() and len(str(expiry)) > 8:
+        value = int(expiry)
+        return value * 1000 if value < 10 ** 11 else value
+    text = str(expiry).strip().upper()
+    for fmt in EXPIRY_FORMATS:
+        try:
+            day = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return int(day.replace(hour=SETTLEMENT_HOUR_UTC, tzinfo=timezone.utc).timestamp() * 1000)
+    raise ValueError(f"Unrecognised option expiry '{expiry}'")
+
+
+def _iv(value: Any) -> float:
+    """Implied volatility as a fraction; percent quotes (e.g. 55.2) are scaled down"""
+    if value is None:
+        return math.nan
+    iv = float(value)
+    return iv / 100 if iv > 5 else iv
+
+
+def max_pain(strikes: Sequence[float], call_oi: Sequence[float], put_oi: Sequence[float]) -> Tuple[Optional[float], array]:
+    """
+    Max pain strike and the total payout to option holders at each strike
+
+    Uses prefix sums over the sorted strikes, so the payout curve is O(n) instead of the
+    O(n^2) strike-by-strike loop: calls below a settlement S pay S*ΣOI - Σ(OI*K), puts
+    above it pay Σ(OI*K) - S*ΣOI.
+    """
+    n = len(strikes)
+    if n == 0:
+        return None, array("d")
+    call_cum = array("d", accumulate(call_oi, initial=0.0))
+    call_k = array("d", accumulate(map(operator.mul, call_oi, strikes), initial=0.0))
+    put_cum = array("d", accumulate(put_oi, initial=0.0))
+    put_k = array("d", accumulate(map(operator.mul, put_oi, strikes), initial=0.0))
+    put_total, put_k_total = put_cum[n], put_k[n]
+    pain = array("d", (
+        strike * call_cum[j] - call_k[j] + (put_k_total - put_k[j + 1]) - strike * (put_total - put_cum[j + 1])
+        for j, strike in enumerate(strikes)
+    ))
+    return strikes[pain.index(min(pain))], pain
+
+
+def bs_gamma(spot: float, strikes: Sequence[float], ivs: Sequence[float], years: float) -> array:
+    """Black-Scholes gamma per strike (zero where the IV is missing or the option has expired)"""
+    if years <= 0 or spot <= 0:
+        return array("d", bytes(8 * len(strikes)))
+    root_t = math.sqrt(years)
+    inv_sqrt_2pi = 1 / math.sqrt(2 * math.pi)
+    log_spot = math.log(spot)
+
+    def gamma(strike: float, sigma: float) -> float:
+        if not sigma > 0 or strike <= 0:
+            return 0.0
+        vol_t = sigma * root_t
+        d1 = (log_spot - math.log(strike) + 0.5 * sigma * sigma * years) / vol_t
+        return math.exp(-0.5 * d1 * d1) * inv_sqrt_2pi / (spot * vol_t)
+
+    return array("d", map(gamma, strikes, ivs))
+
+
+class ExpirySlice:
+    """One expiry of a strike chain as strike-sorted typed arrays"""
+
+    def __init__(self, expiry: str, strikes: array, call_oi: array, put_oi: array, call_volume: array,
+                 put_volume: array, call_iv: array, put_iv: array, underlying: Optional[float]):
+        self.expiry = expiry
+        self.expiry_ms = expiry_to_ms(expiry)
+        self.strikes = strikes
+        self.call_oi = call_oi
+        self.put_oi = put_oi
+        self.call_volume = call_volume
+        self.put_volume = put_volume
+        self.call_iv = call_iv
+        self.put_iv = put_iv
+        self.underlying = underlying
+        self.fetched_at = time.monotonic()
+
+    @classmethod
+    def from_records(cls, expiry: str, records: Iterable[Dict[str, Any]],
+                     volumes: Iterable[Dict[str, Any]] = ()) -> "ExpirySlice":
+        """Build from oi-by-strike (and optionally volume-by-strike) records; repeated strikes are summed"""
+        rows: Dict[float, List[float]] = {}
+        underlying = None
+        for record in records:
+            strike = record.get("strike")
+            if strike is None:
+                continue
+            row = rows.setdefault(float(strike), [0.0, 0.0, 0.0, 0.0, math.nan, math.nan])
+            row[0] += float(record.get("call_open_interest") or 0)
+            row[1] += float(record.get("put_open_interest") or 0)
+            row[2] += float(record.get("call_volume") or 0)
+            row[3] += float(record.get("put_volume") or 0)
+            row[4] = _iv(record.get("call_iv")) if math.isnan(row[4]) else row[4]
+            row[5] = _iv(record.get("put_iv")) if math.isnan(row[5]) else row[5]
+            underlying = underlying or record.get("underlying_price")
+        for record in volumes:
+            strike = record.get("strike")
+            row = rows.get(float(strike)) if strike is not None else None
+            if row is not None:
+                row[2] = float(record.get("call_volume") or 0)
+                row[3] = float(record.get("put_volume") or 0)
+
+        strikes = array("d", sorted(rows))
+        columns = [array("d", (rows[k][i] for k in strikes)) for i in range(6)]
+        return cls(expiry, strikes, *columns, float(underlying) if underlying else None)
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def years_to_expiry(self, now_ms: Optional[int] = None) -> float:
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        return max(0.0, (self.expiry_ms - now_ms) / YEAR_MS)
+
+    def max_pain(self) -> Optional[float]:
+        return max_pain(self.strikes, self.call_oi, self.put_oi)[0]
+
+    def iv_at(self, strike: float, side: str = "call") -> Optional[float]:
+        """IV interpolated linearly between the nearest quoted strikes"""
+        ivs = self.call_iv if side == "call" else self.put_iv
+        valid = list(map(operator.eq, ivs, ivs))        # False for NaN
+        ks, vs = list(compress(self.strikes, valid)), list(compress(ivs, valid))
+        if not ks:
+            return None
+        i = bisect.bisect_left(ks, strike)
+        if i == 0:
+            return vs[0]
+        if i == len(ks):
+            return vs[-1]
+        k0, k1 = ks[i - 1], ks[i]
+        return vs[i - 1] + (vs[i] - vs[i - 1]) * (strike - k0) / (k1 - k0)
+
+
+class OptionSurface:
+    """
+    Strike × expiry view of a whole chain.
+
+    Each quantity is a row-major `len(expiries) × len(strikes)` array over the union of
+    strikes, zero (OI, volume) or NaN (IV) where an expiry does not list a strike.
+    """
+
+    QUANTITIES = ("call_oi", "put_oi", "call_volume", "put_volume", "call_iv", "put_iv")
+
+    def __init__(self, symbol: str, slices: Sequence[ExpirySlice], spot: Optional[float] = None):
+        self.symbol = symbol
+        self.slices = sorted(slices, key=lambda s: s.expiry_ms)
+        self.expiries = [s.expiry for s in self.slices]
+        self.strikes = array("d", sorted({k for s in self.slices for k in s.strikes}))
+        self.spot = spot or next((s.underlying for s in self.slices if s.underlying), None)
+        width = len(self.strikes)
+        index = {k: i for i, k in enumerate(self.strikes)}
+        self.grids: Dict[str, array] = {}
+        for name in self.QUANTITIES:
+            fill = math.nan if name.endswith("_iv") else 0.0
+            grid = array("d", [fill]) * (len(self.slices) * width)
+            for row, expiry_slice in enumerate(self.slices):
+                base = row * width
+                for strike, value in zip(expiry_slice.strikes, getattr(expiry_slice, name)):
+                    grid[base + index[strike]] = value
+            self.grids[name] = grid
+
+    def __getitem__(self, quantity: str) -> array:
+        return self.grids[quantity]
+
+    def row(self, quantity: str, expiry: str) -> array:
+        width = len(self.strikes)
+        i = self.expiries.index(expiry)
+        return self.grids[quantity][i * width:(i + 1) * width]
+
+    def totals_by_strike(self, quantity: str) -> array:
+        """Quantity summed over expiries for every strike"""
+        width = len(self.strikes)
+        grid = self.grids[quantity]
+        return array("d", (math.fsum(grid[j::width]) for j in range(width)))
+
+    def max_pain(self, expiry: Optional[str] = None) -> Dict[str, Any]:
+        """Max pain of one expiry, or of the whole chain's OI when `expiry` is None"""
+        if expiry is None:
+            call_oi, put_oi = self.totals_by_strike("call_oi"), self.totals_by_strike("put_oi")
+        else:
+            call_oi, put_oi = self.row("call_oi", expiry), self.row("put_oi", expiry)
+        strike, pain = max_pain(self.strikes, call_oi, put_oi)
+        return {"expiry": expiry or "all", "max_pain": strike,
+                "min_payout": min(pain) if len(pain) else None, "spot": self.spot}
+
+    def gamma_exposure(self, spot: Optional[float] = None, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Dealer gamma exposure in USD per 1% move, per strike and in total
+
+        Uses the usual convention that dealers are long calls and short puts: call gamma
+        counts positive, put gamma negative. Where only one side's IV is quoted it is used
+        for both.
+        """
+        spot = spot or self.spot
+        if not spot:
+            raise ValueError(f"No underlying price available for {self.symbol} options")
+        width = len(self.strikes)
+        by_strike = array("d", bytes(8 * width))
+        by_expiry = {}
+        scale = spot * spot * 0.01
+        for row, expiry_slice in enumerate(self.slices):
+            years = expiry_slice.years_to_expiry(now_ms)
+            base = row * width
+            call_iv = self.grids["call_iv"][base:base + width]
+            put_iv = self.grids["put_iv"][base:base + width]
+            call_iv = array("d", map(lambda c, p: p if c != c else c, call_iv, put_iv))
+            put_iv = array("d", map(lambda p, c: c if p != p else p, put_iv, call_iv))
+            call_gex = map(operator.mul, bs_gamma(spot, self.strikes, call_iv, years),
+                           self.grids["call_oi"][base:base + width])
+            put_gex = map(operator.mul, bs_gamma(spot, self.strikes, put_iv, years),
+                          self.grids["put_oi"][base:base + width])
+            net = array("d", map(lambda c, p: (c - p) * scale, call_gex, put_gex))
+            by_expiry[expiry_slice.expiry] = math.fsum(net)
+            by_strike = array("d", map(operator.add, by_strike, net))
+        flip = None
+        running = array("d", accumulate(by_strike))
+        for j in range(1, width):
+            if (running[j - 1] < 0) != (running[j] < 0):
+                flip = self.strikes[j]
+                break
+        return {"spot": spot, "total": math.fsum(by_strike), "by_expiry": by_expiry,
+                "by_strike": dict(zip(self.strikes, by_strike)), "gamma_flip": flip}
+
+    def skew(self, moneyness: float = 0.1) -> List[Dict[str, Any]]:
+        """
+        Put/call skew per expiry
+
+        `skew` is the IV of the put struck `moneyness` below spot minus the IV of the call
+        struck the same distance above; positive means downside protection is bid.
+        """
+        if not self.spot:
+            raise ValueError(f"No underlying price available for {self.symbol} options")
+        results = []
+        for expiry_slice in self.slices:
+            put_iv = expiry_slice.iv_at(self.spot * (1 - moneyness), "put")
+            call_iv = expiry_slice.iv_at(self.spot * (1 + moneyness), "call")
+            atm = expiry_slice.iv_at(self.spot, "call")
+            call_oi, put_oi = math.fsum(expiry_slice.call_oi), math.fsum(expiry_slice.put_oi)
+            call_vol, put_vol = math.fsum(expiry_slice.call_volume), math.fsum(expiry_slice.put_volume)
+            results.append({
+                "expiry": expiry_slice.expiry,
+                "atm_iv": atm,
+                "put_iv": put_iv,
+                "call_iv": call_iv,
+                "skew": put_iv - call_iv if put_iv is not None and call_iv is not None else None,
+                "put_call_oi_ratio": put_oi / call_oi if call_oi else None,
+                "put_call_volume_ratio": put_vol / call_vol if call_vol else None,
+            })
+        return results
+
+
+class OptionsManager:
+    """
+    Manager for options strike chains and the analytics derived from them
+
+    A chain is kept as one `ExpirySlice` per expiry. Expiries are fetched concurrently, and
+    once cached only slices older than `ttl` are refetched, so a refresh touches just the
+    expiries that went stale (or were newly listed). Settled expiries drop out on refresh.
+
+    :param ttl: Seconds a fetched expiry (and the expiry list) stays fresh.
+    :param max_workers: Concurrent per-expiry requests.
+    :param include_volume: Also fetch volume-by-strike for each expiry.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_workers: int = 8, include_volume: bool = True):
+        self.max_pain_service = MaxPainService()
+        self.oi_by_strike_service = OptionsOpenInterestByStrikeService()
+        self.volume_by_strike_service = OptionsVolumeByStrikeService()
+        self.implied_volatility_service = OptionsImpliedVolatilityService()
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.include_volume = include_volume
+        self._slices: Dict[str, Dict[str, ExpirySlice]] = {}
+        self._expiries: Dict[str, Tuple[float, List[str]]] = {}
+        self._surfaces: Dict[str, OptionSurface] = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, service, symbol: str, expiry: str) -> List[Dict[str, Any]]:
+        data = service.fetch_data(symbol=symbol, expiry=expiry)
+
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching options data by strike: {data.get('msg')}")
+
+        return data.get("data") or []
+
+    @traced()
+    def get_expiries(self, symbol: str = "BTC", refresh: bool = False) -> List[str]:
+        """Listed, unexpired expiries of a symbol, nearest first (one max-pain row per expiry)"""
+        cached = self._expiries.get(symbol)
+        if cached is not None and not refresh and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        data = self.max_pain_service.fetch_data(symbol=symbol)
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching option expiries: {data.get('msg')}")
+        now_ms = int(time.time() * 1000)
+        listed = {record.get("date") for record in data.get("data") or []}
+        expiries = sorted((e for e in listed if e is not None and expiry_to_ms(e) > now_ms), key=expiry_to_ms)
+        self._expiries[symbol] = (time.monotonic(), expiries)
+        return expiries
+
+    def _fetch_slice(self, symbol: str, expiry: str) -> ExpirySlice:
+        records = self._fetch(self.oi_by_strike_service, symbol, expiry)
+        volumes = self._fetch(self.volume_by_strike_service, symbol, expiry) if self.include_volume else ()
+        return ExpirySlice.from_records(expiry, records, volumes)
+
+    @traced()
+    def refresh(self, symbol: str = "BTC", expiries: Optional[Sequence[str]] = None,
+                force: bool = False) -> List[str]:
+        """
+        Refetch stale (or all, with `force`) expiries of a chain concurrently
+
+        :param expiries: Expiries to track; defaults to every listed expiry.
+        :return: Expiries that were refetched.
+        """
+        wanted = list(expiries) if expiries is not None else self.get_expiries(symbol, refresh=force)
+        with self._lock:
+            cached = dict(self._slices.get(symbol, {}))
+        stale = [e for e in wanted if force or e not in cached or cached[e].age >= self.ttl]
+
+        fetched: Dict[str, ExpirySlice] = {}
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(stale))) as executor:
+                futures = {expiry: executor.submit(contextvars.copy_context().run, self._fetch_slice, symbol, expiry)
+                           for expiry in stale}
+                fetched = {expiry: future.result() for expiry, future in futures.items()}
+
+        wanted_set = set(wanted)
+        with self._lock:
+            chain = {e: s for e, s in self._slices.get(symbol, {}).items() if e in wanted_set}
+            changed = len(chain) != len(self._slices.get(symbol, {})) or bool(fetched)
+            chain.update(fetched)
+            self._slices[symbol] = chain
+            if changed:
+                self._surfaces.pop(symbol, None)
+        return stale
+
+    @traced()
+    def get_surface(self, symbol: str = "BTC", expiries: Optional[Sequence[str]] = None,
+                    force: bool = False) -> OptionSurface:
+        """
+        Strike × expiry surface of a chain, refreshing only stale expiries
+
+        The surface is rebuilt only when some expiry was refetched or dropped.
+        """
+        self.refresh(symbol, expiries, force)
+        with self._lock:
+            surface = self._surfaces.get(symbol)
+            if surface is None:
+                surface = self._surfaces[symbol] = OptionSurface(symbol, list(self._slices[symbol].values()))
+        return surface
+
+    @traced()
+    def get_max_pain(self, symbol: str = "BTC", expiry: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Max pain strike of one expiry, or of all expiries combined
+
+        :param symbol: Underlying (e.g. 'BTC', 'ETH')
+        :param expiry: Expiry such as '27MAR26'; None for the whole chain
+        :return: Max pain strike, the payout there and the spot price
+        """
+        return self.get_surface(symbol).max_pain(expiry)
+
+    @traced()
+    def get_gamma_exposure(self, symbol: str = "BTC", spot: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Aggregate dealer gamma exposure computed from the chain's OI and IV
+
+        :param symbol: Underlying (e.g. 'BTC', 'ETH')
+        :param spot: Underlying price; taken from the chain data when omitted
+        :return: Total, per-expiry and per-strike gamma exposure and the gamma flip strike
+        """
+        return self.get_surface(symbol).gamma_exposure(spot or self._spot_fallback(symbol))
+
+    @traced()
+    def get_skew(self, symbol: str = "BTC", moneyness: float = 0.1) -> List[Dict[str, Any]]:
+        """
+        Put/call IV skew and put/call OI and volume ratios per expiry
+
+        :param symbol: Underlying (e.g. 'BTC', 'ETH')
+        :param moneyness: Distance from spot of the compared put and call strikes (0.1 = 10%)
+        :return: One entry per expiry, nearest first
+        """
+        return self.get_surface(symbol).skew(moneyness)
+
+    @traced()
+    def get_chain_summary(self, symbol: str = "BTC") -> Dict[str, Any]:
+        """Max pain, gamma exposure and skew of a chain from a single surface"""
+        surface = self.get_surface(symbol)
+        gamma = surface.gamma_exposure(surface.spot or self._spot_fallback(symbol))
+        return {
+            "symbol": symbol,
+            "spot": gamma["spot"],
+            "expiries": len(surface.expiries),
+            "strikes": len(surface.strikes),
+            "max_pain": surface.max_pain()["max_pain"],
+            "max_pain_by_expiry": {e: surface.max_pain(e)["max_pain"] for e in surface.expiries},
+            "gamma_exposure": gamma["total"],
+            "gamma_flip": gamma["gamma_flip"],
+            "skew": surface.skew(),
+        }
+
+    def _spot_fallback(self, symbol: str) -> Optional[float]:
+        surface = self._surfaces.get(symbol)
+        if surface is not None and surface.spot:
+            return surface.spot
+        data = self.implied_volatility_service.fetch_data(symbol=symbol)
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching implied volatility: {data.get('msg')}")
+        payload = data.get("data")
+        record = payload[-1] if isinstance(payload, list) and payload else payload
+        value = record.get("underlying_price") if isinstance(record, dict) else None
+        return float(value) if value else None
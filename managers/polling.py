@@ -0,0 +1,290 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from services.base import CoinglassAPIBase
+from services.exchange_data import HyperliquidWhaleAlertService, HyperliquidWhalePositionService
+from services.funding_rates import ExchangeListService
+from services.liquidation import LiquidationOrderService
+from services.market_data import CoinsMarketsService
+from services.orderbook import LargeLimitOrderService
+from managers.pubsub import EventBus
+
+
+KeySpec = Union[str, Sequence[str], Callable[[Dict[str, Any]], Hashable]]
+
+
+def make_key_func(key: KeySpec) -> Callable[[Dict[str, Any]], Hashable]:
+    """Turn a field name, a tuple of field names or a callable into a record key function"""
+    if callable(key):
+        return key
+    if isinstance(key, str):
+        return lambda record: record.get(key)
+    fields = tuple(key)
+    return lambda record: tuple(record.get(field) for field in fields)
+
+
+class SnapshotDiff:
+    """Records added, changed and removed between two consecutive snapshots of an endpoint"""
+
+    __slots__ = ("name", "added", "changed", "removed", "snapshot_size", "timestamp")
+
+    def __init__(self, name: str, added: List[Dict[str, Any]], changed: List[Dict[str, Any]],
+                 removed: List[Dict[str, Any]], snapshot_size: int):
+        self.name = name
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.snapshot_size = snapshot_size
+        self.timestamp = time.time()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def __repr__(self) -> str:
+        return (f"SnapshotDiff({self.name!r}, added={len(self.added)}, changed={len(self.changed)}, "
+                f"removed={len(self.removed)}, snapshot_size={self.snapshot_size})")
+
+
+class SnapshotTracker:
+    """Keeps the previous snapshot of one endpoint indexed by a stable key and diffs new ones against it"""
+
+    def __init__(self, name: str, key: KeySpec):
+        self.name = name
+        self.key_func = make_key_func(key)
+        self.index: Dict[Hashable, Dict[str, Any]] = {}
+        self.initialized = False
+
+    def update(self, records: List[Dict[str, Any]]) -> SnapshotDiff:
+        key_func = self.key_func
+        previous = self.index
+        current: Dict[Hashable, Dict[str, Any]] = {}
+        added: List[Dict[str, Any]] = []
+        changed: List[Dict[str, Any]] = []
+
+        for record in records:
+            key = key_func(record)
+            if key in current:
+                continue
+            current[key] = record
+            old = previous.get(key)
+            if old is None:
+                added.append(record)
+            elif old != record:
+                changed.append(record)
+
+        if len(current) - len(added) == len(previous):
+            removed = []
+        else:
+            removed = [record for key, record in previous.items() if key not in current]
+
+        self.index = current
+        self.initialized = True
+        return SnapshotDiff(self.name, added, changed, removed, len(records))
+
+
+def extract_records(response: Dict[str, Any], name: str) -> List[Dict[str, Any]]:
+    """Validate a CoinGlass response and return its `data` as a list of records"""
+    if response.get("code") != "0":
+        raise ValueError(f"Error polling {name}: {response.get('msg')}")
+    data = response.get("data") or []
+    return data if isinstance(data, list) else [data]
+
+
+class PollTarget:
+    """One endpoint polled at a fixed cadence"""
+
+    def __init__(self, name: str, service: CoinglassAPIBase, interval: float, key: KeySpec,
+                 params: Optional[Dict[str, Any]] = None, emit_initial: bool = True):
+        self.name = name
+        self.service = service
+        self.interval = interval
+        self.params = params or {}
+        self.emit_initial = emit_initial
+        self.tracker = SnapshotTracker(name, key)
+        self.subscribers: List[Callable[[SnapshotDiff], None]] = []
+        self.polls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_poll: Optional[float] = None
+
+    def poll(self) -> SnapshotDiff:
+        response = self.service.fetch_data(**self.params)
+        records = extract_records(response, self.name)
+        first = not self.tracker.initialized
+        diff = self.tracker.update(records)
+        self.polls += 1
+        self.last_poll = time.time()
+        if diff and (self.emit_initial or not first):
+            for callback in list(self.subscribers):
+                callback(diff)
+        return diff
+
+
+class PollingEngine:
+    """
+    Polls snapshot endpoints at configured cadences and emits only what changed.
+
+    Each target keeps its previous snapshot indexed by a stable key; subscribers receive a
+    `SnapshotDiff` with the added, changed and removed records, so downstream work scales
+    with change volume instead of snapshot size. Polls run on a small thread pool and a
+    target is never polled again before its previous poll finished.
+
+    :param max_workers: Max targets polled concurrently.
+    :param on_error: Called with (target name, exception) when a poll fails.
+    :param bus: When given, every non-empty diff is also published on the bus under the target's topic.
+    """
+
+    def __init__(self, max_workers: int = 4, on_error: Optional[Callable[[str, BaseException], None]] = None,
+                 bus: Optional[EventBus] = None):
+        self.targets: Dict[str, PollTarget] = {}
+        self.max_workers = max_workers
+        self.on_error = on_error
+        self.bus = bus
+        self._heap: List[Tuple[float, str]] = []
+        self._running: set = set()
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def add_target(self, name: str, service: CoinglassAPIBase, interval: float, key: KeySpec,
+                   params: Optional[Dict[str, Any]] = None, emit_initial: bool = True,
+                   topic: Optional[str] = None) -> PollTarget:
+        """
+        Register an endpoint to poll
+
+        :param name: Unique target name, also used as the diff name.
+        :param service: Service whose `fetch_data` returns the snapshot.
+        :param interval: Seconds between polls.
+        :param key: Field, tuple of fields or callable giving each record a stable identity.
+        :param params: Keyword arguments passed to `fetch_data`.
+        :param emit_initial: Deliver the first snapshot to subscribers as all-added.
+        :param topic: Bus topic for this target's diffs (defaults to `name`).
+        """
+        target = PollTarget(name, service, interval, key, params, emit_initial)
+        if self.bus is not None:
+            bus, bus_topic = self.bus, topic or name
+            target.subscribers.append(lambda diff: bus.publish(bus_topic, diff))
+        with self._condition:
+            self.targets[name] = target
+            heapq.heappush(self._heap, (time.monotonic(), name))
+            self._condition.notify_all()
+        return target
+
+    def remove_target(self, name: str) -> None:
+        with self._condition:
+            self.targets.pop(name, None)
+
+    def subscribe(self, name: str, callback: Callable[[SnapshotDiff], None]) -> None:
+        self.targets[name].subscribers.append(callback)
+
+    def unsubscribe(self, name: str, callback: Callable[[SnapshotDiff], None]) -> None:
+        subscribers = self.targets[name].subscribers
+        if callback in subscribers:
+            subscribers.remove(callback)
+
+    def poll_once(self, name: str) -> SnapshotDiff:
+        """Poll a single target immediately, bypassing the schedule"""
+        return self.targets[name].poll()
+
+    def _run_target(self, target: PollTarget) -> None:
+        try:
+            target.poll()
+        except Exception as e:
+            target.errors += 1
+            target.last_error = str(e)
+            if self.on_error is not None:
+                self.on_error(target.name, e)
+        finally:
+            with self._condition:
+                self._running.discard(target.name)
+                if target.name in self.targets:
+                    heapq.heappush(self._heap, (time.monotonic() + target.interval, target.name))
+                self._condition.notify_all()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            with self._condition:
+                due: List[PollTarget] = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, name = heapq.heappop(self._heap)
+                    target = self.targets.get(name)
+                    if target is not None and name not in self._running:
+                        self._running.add(name)
+                        due.append(target)
+                if not due:
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._condition.wait(timeout)
+                    continue
+            for target in due:
+                self._executor.submit(self._run_target, target)
+
+    def start(self) -> "PollingEngine":
+        """Start polling in a background thread"""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="coinglass-poll")
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="coinglass-polling-engine")
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and wait:
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        self._thread = None
+        self._executor = None
+
+    def __enter__(self) -> "PollingEngine":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"polls": t.polls, "errors": t.errors, "last_error": t.last_error,
+                   "records": len(t.tracker.index), "interval": t.interval}
+            for name, t in self.targets.items()
+        }
+
+    def add_default_targets(self, large_order_symbols: Sequence[str] = ("BTC",),
+                            cadences: Optional[Dict[str, float]] = None,
+                            funding_symbols: Sequence[str] = ()) -> "PollingEngine":
+        """
+        Register the snapshot endpoints we usually watch with their stable keys
+
+        :param large_order_symbols: Symbols polled on /futures/orderbook/large-limit-order.
+        :param cadences: Per-target interval overrides in seconds.
+        :param funding_symbols: Symbols polled on /futures/funding-rate/exchange-list as 'funding.<SYMBOL>'.
+        """
+        cadences = cadences or {}
+        self.add_target("liquidation.orders", LiquidationOrderService(), cadences.get("liquidation.orders", 5),
+                        key=("exchange_name", "symbol", "side", "time", "price"))
+        self.add_target("hyperliquid.whale_alert", HyperliquidWhaleAlertService(),
+                        cadences.get("hyperliquid.whale_alert", 10), key=("user", "symbol", "create_time"))
+        self.add_target("hyperliquid.whale_position", HyperliquidWhalePositionService(),
+                        cadences.get("hyperliquid.whale_position", 30), key=("user", "symbol"))
+        self.add_target("market.coins", CoinsMarketsService(), cadences.get("market.coins", 60), key="symbol")
+        for symbol in large_order_symbols:
+            name = f"orderbook.large_orders.{symbol}"
+            self.add_target(name, LargeLimitOrderService(), cadences.get(name, cadences.get("orderbook.large_orders", 15)),
+                            key=("exchange_name", "symbol", "side", "limit_price", "start_time"),
+                            params={"symbol": symbol})
+        for symbol in funding_symbols:
+            name = f"funding.{symbol}"
+            self.add_target(name, ExchangeListService(), cadences.get(name, cadences.get("funding", 60)),
+                            key="symbol", params={"symbol": symbol})
+        return self
@@ -0,0 +1,215 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+class DropPolicy:
+    """What a full subscriber queue does with a new update"""
+    BLOCK = "block"              # publisher waits for space (backpressure), up to `block_timeout`
+    DROP_OLDEST = "drop_oldest"  # evict the oldest queued update
+    DROP_NEWEST = "drop_newest"  # discard the incoming update
+
+
+class Update:
+    """A published update: topic, payload and publication metadata"""
+
+    __slots__ = ("topic", "payload", "timestamp", "sequence")
+
+    def __init__(self, topic: str, payload: Any, sequence: int):
+        self.topic = topic
+        self.payload = payload
+        self.timestamp = time.time()
+        self.sequence = sequence
+
+    def __repr__(self) -> str:
+        return f"Update({self.topic!r}, seq={self.sequence}, payload={type(self.payload).__name__})"
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Exact match, '*' for everything, or a trailing wildcard such as 'funding.*'"""
+    if pattern == "*" or pattern == topic:
+        return True
+    return pattern.endswith(".*") and topic.startswith(pattern[:-1])
+
+
+class Subscription:
+    """
+    Bounded queue of updates for one consumer.
+
+    Consume with `get()`, by iterating, or with `await aget()` from asyncio code.
+    """
+
+    def __init__(self, bus: "EventBus", pattern: str, maxsize: int, policy: str, block_timeout: Optional[float]):
+        if policy not in (DropPolicy.BLOCK, DropPolicy.DROP_OLDEST, DropPolicy.DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.bus = bus
+        self.pattern = pattern
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.received = 0
+        self.closed = False
+        self._queue: Deque[Update] = deque()
+        self._condition = threading.Condition()
+
+    def _offer(self, update: Update) -> bool:
+        with self._condition:
+            if self.closed:
+                return False
+            if len(self._queue) >= self.maxsize:
+                if self.policy == DropPolicy.DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == DropPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.maxsize and not self.closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._condition.wait(remaining)
+                    if self.closed:
+                        return False
+            self._queue.append(update)
+            self.received += 1
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Update]:
+        """Next update, or None after `timeout` seconds or once the subscription is closed"""
+        with self._condition:
+            if not self._queue and not self.closed:
+                self._condition.wait_for(lambda: self._queue or self.closed, timeout)
+            if not self._queue:
+                return None
+            update = self._queue.popleft()
+            self._condition.notify_all()
+            return update
+
+    def get_nowait(self) -> Optional[Update]:
+        return self.get(timeout=0)
+
+    def drain(self) -> List[Update]:
+        """All queued updates at once"""
+        with self._condition:
+            updates = list(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+            return updates
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Update]:
+        return await asyncio.to_thread(self.get, timeout)
+
+    def __iter__(self) -> Iterator[Update]:
+        while True:
+            update = self.get()
+            if update is None:
+                return
+            yield update
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def _close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class EventBus:
+    """
+    In-process publish/subscribe bus keyed by topic (e.g. 'liquidation.orders', 'market.coins', 'funding.BTC').
+
+    Each subscriber owns a bounded queue with its own drop policy, so one fetch fans out
+    to any number of consumers and a slow consumer only affects itself (or, with
+    `DropPolicy.BLOCK`, applies backpressure to the publisher). The last update of every
+    topic is retained for late subscribers and cache-style reads via `latest()`.
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._routes: Dict[str, List[Subscription]] = {}
+        self._latest: Dict[str, Update] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, pattern: str, maxsize: int = 1000, policy: str = DropPolicy.DROP_OLDEST,
+                  block_timeout: Optional[float] = 5.0, replay_latest: bool = False) -> Subscription:
+        """
+        Subscribe to a topic or topic pattern
+
+        :param pattern: Topic, 'prefix.*' or '*'.
+        :param maxsize: Queue bound for this subscriber.
+        :param policy: One of the `DropPolicy` values.
+        :param block_timeout: Max seconds a publisher waits under `DropPolicy.BLOCK` before dropping.
+        :param replay_latest: Immediately enqueue the retained last update of each matching topic.
+        """
+        subscription = Subscription(self, pattern, maxsize, policy, block_timeout)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._routes.clear()
+            retained = [u for topic, u in self._latest.items() if topic_matches(pattern, topic)] if replay_latest else []
+        for update in sorted(retained, key=lambda u: u.sequence):
+            subscription._offer(update)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+                self._routes.clear()
+        subscription._close()
+
+    def _subscribers_for(self, topic: str) -> List[Subscription]:
+        route = self._routes.get(topic)
+        if route is None:
+            route = [s for s in self._subscriptions if topic_matches(s.pattern, topic)]
+            self._routes[topic] = route
+        return route
+
+    def publish(self, topic: str, payload: Any) -> int:
+        """
+        Publish a payload to every matching subscriber
+
+        :return: Number of subscribers that accepted the update.
+        """
+        update = Update(topic, payload, next(self._sequence))
+        with self._lock:
+            self._latest[topic] = update
+            self.published += 1
+            subscribers = self._subscribers_for(topic)
+        delivered = 0
+        for subscription in subscribers:
+            if subscription._offer(update):
+                delivered += 1
+        return delivered
+
+    def latest(self, topic: str) -> Optional[Update]:
+        return self._latest.get(topic)
+
+    def topics(self) -> List[str]:
+        return list(self._latest)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        return {
+            "published": self.published,
+            "topics": len(self._latest),
+            "subscribers": [
+                {"pattern": s.pattern, "queued": len(s), "received": s.received,
+                 "dropped": s.dropped, "policy": s.policy}
+                for s in subscriptions
+            ],
+        }
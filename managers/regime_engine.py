@@ -0,0 +1,247 @@
+"""Composite market-regime score over daily-aligned indicator histories"""
+
+import bisect
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.tracing import traced
+from managers.indicator_loader import IndicatorLoader
+from managers.indicators_manager import IndicatorsManager
+
+
+DAY_MS = 86_400_000
+NAN = float("nan")
+
+
+class RegimeComponent:
+    """
+    One indicator feeding the composite score
+
+    :param classifier: Name of the `IndicatorsManager` classifier applied to each day's value.
+    :param scores: Score in [-1, 1] of every classifier label, -1 fearful / cheap, +1 euphoric / expensive.
+    """
+
+    def __init__(self, name: str, indicator: str, field: str, classifier: str, scores: Dict[str, float],
+                 weight: float = 1.0):
+        self.name = name
+        self.indicator = indicator
+        self.field = field
+        self.classifier = classifier
+        self.scores = scores
+        self.weight = weight
+
+
+COMPONENTS: List[RegimeComponent] = [
+    RegimeComponent("fear_greed", "fear_greed", "value", "_classify_fear_greed",
+                    {"extreme_fear": -1.0, "fear": -0.5, "neutral": 0.0, "greed": 0.5, "extreme_greed": 1.0}),
+    RegimeComponent("ahr999", "ahr999", "ahr999_value", "_interpret_ahr999",
+                    {"bottom_fishing_zone": -1.0, "regular_investment_zone": 0.0, "wait_zone": 1.0}),
+    RegimeComponent("nupl", "nupl", "net_unrealized_pnl", "_classify_nupl",
+                    {"capitulation": -1.0, "hope_fear": -0.5, "optimism_anxiety": 0.0, "belief_denial": 0.5,
+                     "euphoria_greed": 1.0}),
+    RegimeComponent("coinbase_premium", "coinbase_premium", "premium_rate", "_interpret_coinbase_premium",
+                    {"strong_institutional_selling": -1.0, "institutional_selling": -0.5,
+                     "institutional_buying": 0.5, "strong_institutional_buying": 1.0}),
+]
+
+# Upper bounds of the composite score per regime label
+REGIMES: Sequence[Tuple[float, str]] = ((-0.6, "capitulation"), (-0.2, "accumulation"), (0.2, "neutral"),
+                                        (0.6, "expansion"), (math.inf, "euphoria"))
+
+
+def classify_regime(score: float) -> str:
+    if score != score:
+        return "unknown"
+    for bound, label in REGIMES:
+        if score <= bound:
+            return label
+    return "euphoria"
+
+
+class RegimeEngine:
+    """
+    Daily composite regime score with its historical percentile
+
+    Every component's history is reduced to its last value per UTC day on one contiguous
+    daily index (a missing day takes the previous value for up to `max_stale_days`), run
+    through its `IndicatorsManager` classifier and mapped to a score. The composite is the
+    weighted mean of the available scores, and each day's percentile ranks its composite
+    against every day up to and including it.
+
+    The first `update()` builds every column in one pass. Each component keeps its own
+    cursor (the last day it had a value for), since indicators publish at different times
+    and a lagging daily one can fill in days an intraday one already added. Later updates
+    read every component from its cursor on (that day can still be revised), append any new
+    days and recompute the rows from the earliest day read, so the table always equals a
+    full rebuild.
+
+    :param loader: Indicator source; a loader over the components' indicators by default.
+    :param manager: Provides the classifiers; one over `loader` by default.
+    :param components: Components and weights; `COMPONENTS` by default.
+    :param max_stale_days: How many days a value is carried forward when an indicator lags.
+    """
+
+    def __init__(self, loader: Optional[IndicatorLoader] = None, manager: Optional[IndicatorsManager] = None,
+                 components: Optional[Sequence[RegimeComponent]] = None, max_stale_days: int = 3):
+        self.components = list(components or COMPONENTS)
+        self.loader = loader or (manager.loader if manager is not None else None) or \
+            IndicatorLoader(sorted({c.indicator for c in self.components}))
+        self.manager = manager or IndicatorsManager(loader=self.loader)
+        self.max_stale_days = max_stale_days
+        self._classifiers = {c.name: getattr(self.manager, c.classifier) for c in self.components}
+        self.days = array("q")
+        self.raw: Dict[str, array] = {c.name: array("d") for c in self.components}
+        self.values: Dict[str, array] = {c.name: array("d") for c in self.components}
+        self.scores: Dict[str, array] = {c.name: array("d") for c in self.components}
+        self.composite = array("d")
+        self.percentile = array("d")
+        self.cursors: Dict[str, int] = {}
+        self._sorted: List[float] = []
+
+    def _daily(self, component: RegimeComponent, since: Optional[int] = None) -> Dict[int, float]:
+        """Last value per UTC day of a component, from day `since` on"""
+        times, values = self.loader.history(component.indicator, component.field)
+        start = 0 if since is None else bisect.bisect_left(times, since)
+        daily: Dict[int, float] = {}
+        for t, value in zip(times[start:], values[start:]):
+            if value == value:
+                daily[t // DAY_MS * DAY_MS] = value
+        return daily
+
+    def _score(self, component: RegimeComponent, value: float) -> float:
+        label = self._classifiers[component.name](None if value != value else value)
+        return component.scores.get(label, NAN)
+
+    def _composite(self, scores: Sequence[float]) -> float:
+        total = weights = 0.0
+        for component, score in zip(self.components, scores):
+            if score == score:
+                total += component.weight * score
+                weights += component.weight
+        return total / weights if weights else NAN
+
+    def _filled(self, name: str, i: int) -> float:
+        """Value of row `i`, carried forward from at most `max_stale_days` rows back"""
+        raw = self.raw[name]
+        for j in range(i, max(-1, i - self.max_stale_days - 1), -1):
+            if raw[j] == raw[j]:
+                return raw[j]
+        return NAN
+
+    def _rank(self, value: float) -> float:
+        if value != value:
+            return NAN
+        bisect.insort(self._sorted, value)
+        return bisect.bisect_right(self._sorted, value) / len(self._sorted) * 100
+
+    def _rebuild(self) -> int:
+        daily = {c.name: self._daily(c) for c in self.components}
+        stamps = [day for values in daily.values() for day in values]
+        self.cursors = {name: max(values) for name, values in daily.items() if values}
+        self._sorted = []
+        if not stamps:
+            return 0
+        self.days = array("q", range(min(stamps), max(stamps) + DAY_MS, DAY_MS))
+        for c in self.components:
+            self.raw[c.name] = array("d", (daily[c.name].get(day, NAN) for day in self.days))
+            self.values[c.name] = array("d", map(self._filled, [c.name] * len(self.days), range(len(self.days))))
+            self.scores[c.name] = array("d", map(self._score, [c] * len(self.days), self.values[c.name]))
+        self.composite = array("d", map(lambda *scores: self._composite(scores),
+                                        *(self.scores[c.name] for c in self.components)))
+        self.percentile = array("d", map(self._rank, self.composite))
+        return len(self.days)
+
+    def _set_row(self, i: int) -> None:
+        for c in self.components:
+            self.values[c.name][i] = self._filled(c.name, i)
+            self.scores[c.name][i] = self._score(c, self.values[c.name][i])
+        self.composite[i] = self._composite([self.scores[c.name][i] for c in self.components])
+        self.percentile[i] = self._rank(self.composite[i])
+
+    @traced()
+    def update(self) -> int:
+        """
+        Refresh the indicators and bring the daily table up to date
+
+        :return: Rows appended (the full history on the first call)
+        """
+        self.loader.load(sorted({c.indicator for c in self.components}))
+        if not self.days:
+            return self._rebuild()
+
+        count = len(self.days)
+        daily = {c.name: self._daily(c, since=self.cursors.get(c.name)) for c in self.components}
+        stamps = [day for values in daily.values() for day in values]
+        if not stamps:
+            return 0
+        if min(stamps) < self.days[0]:
+            # A component reaches back before the table (e.g. its first load): start over
+            return self._rebuild() - count
+
+        for day in range(self.days[-1] + DAY_MS, max(stamps) + DAY_MS, DAY_MS):
+            self.days.append(day)
+            for c in self.components:
+                self.raw[c.name].append(NAN)
+                self.values[c.name].append(NAN)
+                self.scores[c.name].append(NAN)
+            self.composite.append(NAN)
+            self.percentile.append(NAN)
+        for c in self.components:
+            for day, value in daily[c.name].items():
+                self.raw[c.name][(day - self.days[0]) // DAY_MS] = value
+            if daily[c.name]:
+                self.cursors[c.name] = max(daily[c.name])
+
+        # Rows from the earliest day read on may have changed: take their composites out of
+        # the ranking, then recompute them in order so each ranks against the days before it
+        first = (min(stamps) - self.days[0]) // DAY_MS
+        for old in self.composite[first:count]:
+            if old == old:
+                del self._sorted[bisect.bisect_left(self._sorted, old)]
+        for i in range(first, len(self.days)):
+            self._set_row(i)
+        return len(self.days) - count
+
+    def get_regime(self, day: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Regime of one day (the latest by default)
+
+        :param day: Any timestamp (ms) within the UTC day.
+        :return: Composite score, its percentile, the regime label and every component's
+            value, classifier label and score
+        """
+        if not self.days:
+            return {}
+        i = len(self.days) - 1
+        if day is not None:
+            day = day // DAY_MS * DAY_MS
+            i = bisect.bisect_left(self.days, day)
+            if i == len(self.days) or self.days[i] != day:
+                raise ValueError(f"No regime row for day {day}")
+        components = {}
+        for c in self.components:
+            value = self.values[c.name][i]
+            components[c.name] = {
+                "value": None if value != value else value,
+                "label": self._classifiers[c.name](None if value != value else value),
+                "score": None if self.scores[c.name][i] != self.scores[c.name][i] else self.scores[c.name][i],
+            }
+        score = self.composite[i]
+        return {"day": self.days[i], "score": None if score != score else score,
+                "percentile": None if self.percentile[i] != self.percentile[i] else self.percentile[i],
+                "regime": classify_regime(score), "components": components}
+
+    def get_history(self) -> Dict[str, List[Any]]:
+        """Every day's composite score, percentile and regime label, for backtests"""
+        return {"day": list(self.days), "score": list(self.composite), "percentile": list(self.percentile),
+                "regime": list(map(classify_regime, self.composite))}
+
+    def regime_changes(self) -> List[Dict[str, Any]]:
+        """Days on which the regime label changed"""
+        changes, previous = [], None
+        for day, label in zip(self.days, map(classify_regime, self.composite)):
+            if label != previous and label != "unknown":
+                changes.append({"day": day, "regime": label, "from": previous})
+                previous = label
+        return changes
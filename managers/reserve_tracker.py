@@ -0,0 +1,335 @@
+import contextvars
+import heapq
+import math
+import operator
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.exchange_data import ExchangeBalanceListService, ExchangeChainTxListService
+from services.tracing import traced
+from managers.streams import FingerprintRing
+
+
+TRANSFER_IN, TRANSFER_OUT, TRANSFER_INTERNAL = 1, 2, 3
+
+
+def _ms(value: Any) -> int:
+    ts = int(float(value or 0))
+    return ts * 1000 if ts < 10 ** 11 else ts
+
+
+class FlowBuckets:
+    """
+    Time-bucketed inflow/outflow per row, in two flat row-major arrays.
+
+    Row `r` owns `inflow[r * buckets:(r + 1) * buckets]`; column `c` is the ring slot of
+    every bucket number `b` with `b % buckets == c`. `epochs[c]` records which bucket a slot
+    currently holds, so reusing a slot zeroes that column for all rows in one strided
+    slice assignment, and window sums add whole columns at a time.
+    """
+
+    def __init__(self, bucket_ms: int, buckets: int):
+        self.bucket_ms = bucket_ms
+        self.buckets = buckets
+        self.rows = 0
+        self.inflow = array("d")
+        self.outflow = array("d")
+        self.epochs = array("q", [-1]) * buckets
+
+    def add_row(self) -> int:
+        zeros = array("d", bytes(8 * self.buckets))
+        self.inflow.extend(zeros)
+        self.outflow.extend(zeros)
+        self.rows += 1
+        return self.rows - 1
+
+    def _slot(self, bucket: int) -> Optional[int]:
+        slot = bucket % self.buckets
+        held = self.epochs[slot]
+        if held == bucket:
+            return slot
+        if held > bucket:
+            return None                 # older than the retained range
+        zeros = array("d", bytes(8 * self.rows))
+        self.inflow[slot::self.buckets] = zeros
+        self.outflow[slot::self.buckets] = zeros
+        self.epochs[slot] = bucket
+        return slot
+
+    def add(self, row: int, time_ms: int, inflow: float, outflow: float) -> bool:
+        """Book a flow; returns False when its bucket has already rotated out"""
+        slot = self._slot(time_ms // self.bucket_ms)
+        if slot is None:
+            return False
+        index = row * self.buckets + slot
+        self.inflow[index] += inflow
+        self.outflow[index] += outflow
+        return True
+
+    def window(self, start_ms: int, end_ms: int) -> Tuple[array, array]:
+        """Per-row inflow and outflow over the buckets overlapping [start_ms, end_ms]"""
+        first, last = start_ms // self.bucket_ms, end_ms // self.bucket_ms
+        inflow = array("d", bytes(8 * self.rows))
+        outflow = array("d", bytes(8 * self.rows))
+        for slot, bucket in enumerate(self.epochs):
+            if first <= bucket <= last:
+                inflow = array("d", map(operator.add, inflow, self.inflow[slot::self.buckets]))
+                outflow = array("d", map(operator.add, outflow, self.outflow[slot::self.buckets]))
+        return inflow, outflow
+
+    @property
+    def retention_ms(self) -> int:
+        return self.bucket_ms * self.buckets
+
+
+class ReserveTracker:
+    """
+    Exchange reserve and on-chain flow tracker with incremental sync
+
+    Each exchange keeps a cursor (the newest transfer time seen), so a sync only asks the
+    chain tx endpoint for transfers from there on, paging until it reaches the cursor.
+    Transfers are deduplicated by (tx hash, asset) in a bounded `FingerprintRing` per
+    exchange, since the inclusive cursor and overlapping pages return some twice.
+
+    When `max_pages` runs out before the cursor is reached, the cursor stays put and the
+    exchange keeps a resume point (its start time and next page); the following syncs
+    continue paging from there until the gap is closed, and only then move the cursor.
+    Pages shift as new transfers arrive, so resuming re-reads some transfers but skips none.
+
+    Per (exchange, asset) the tracker keeps cumulative inflow/outflow, time-bucketed flows
+    for window queries (`bucket_ms` × `retention_buckets`) and, once seeded from the
+    balance list, a running balance adjusted by every later transfer.
+
+    :param exchanges: Exchanges to track.
+    :param symbol: Only transfers of this asset; all assets by default.
+    :param bucket_ms: Flow bucket width; window queries are rounded to it.
+    :param retention_buckets: Buckets kept for window queries.
+    :param lookback_ms: How far back the first sync of an exchange starts.
+    :param page_size: Transfers per page.
+    :param max_pages: Pages fetched per exchange and sync at most.
+    :param dedup_capacity: Transaction fingerprints remembered per exchange.
+    :param max_workers: Exchanges synced concurrently.
+    """
+
+    def __init__(self, exchanges: Sequence[str], symbol: Optional[str] = None, bucket_ms: int = 3600000,
+                 retention_buckets: int = 24 * 30, lookback_ms: int = 86400000, page_size: int = 100,
+                 max_pages: int = 20, dedup_capacity: int = 65536, max_workers: int = 8):
+        self.exchanges = list(exchanges)
+        self.symbol = symbol
+        self.lookback_ms = lookback_ms
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self.tx_service = ExchangeChainTxListService()
+        self.balance_service = ExchangeBalanceListService()
+        self.cursors: Dict[str, int] = {}
+        # exchange -> (start time, next page, newest transfer time fetched) of truncated paging
+        self.resume: Dict[str, Tuple[int, int, int]] = {}
+        self.seen: Dict[str, FingerprintRing] = {e: FingerprintRing(dedup_capacity) for e in self.exchanges}
+        self.flows = FlowBuckets(bucket_ms, retention_buckets)
+        self.keys: Dict[Tuple[str, str], int] = {}
+        self.key_list: List[Tuple[str, str]] = []
+        self.total_inflow_usd = array("d")
+        self.total_outflow_usd = array("d")
+        self.balances = array("d")
+        self.balance_time = array("q")
+        self.stats = {"transfers": 0, "duplicates": 0, "internal": 0, "expired": 0, "requests": 0}
+        self._lock = threading.Lock()
+
+    def _row(self, exchange: str, asset: str) -> int:
+        key = (exchange, asset)
+        row = self.keys.get(key)
+        if row is None:
+            row = self.keys[key] = self.flows.add_row()
+            self.key_list.append(key)
+            self.total_inflow_usd.append(0.0)
+            self.total_outflow_usd.append(0.0)
+            self.balances.append(math.nan)
+            self.balance_time.append(0)
+        return row
+
+    def _fetch_new(self, exchange: str, cursor: int,
+                   first_page: int = 1) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Transfers at or after the cursor, paging newest-first until the cursor is reached
+
+        :return: The transfers and, when `max_pages` ran out first, the next page to request
+        """
+        records: List[Dict[str, Any]] = []
+        for page in range(first_page, first_page + self.max_pages):
+            data = self.tx_service.fetch_data(exchange=exchange, symbol=self.symbol, start_time=cursor,
+                                              page=page, per_page=self.page_size)
+            with self._lock:
+                self.stats["requests"] += 1
+            if data.get("code") != "0":
+                raise ValueError(f"Error fetching chain transfers for {exchange}: {data.get('msg')}")
+            batch = data.get("data") or []
+            fresh = [r for r in batch if _ms(r.get("transaction_time")) >= cursor]
+            records.extend(fresh)
+            if len(batch) < self.page_size or len(fresh) < len(batch):
+                return records, None
+        return records, first_page + self.max_pages
+
+    def _apply(self, exchange: str, records: Iterable[Dict[str, Any]], start: int,
+               next_page: Optional[int]) -> int:
+        seen = self.seen[exchange]
+        newest = self.resume.pop(exchange, (0, 0, 0))[2]
+        added = 0
+        for record in sorted(records, key=lambda r: _ms(r.get("transaction_time"))):
+            asset = record.get("asset_symbol") or record.get("symbol") or "?"
+            if not seen.add((record.get("transaction_hash"), asset)):
+                self.stats["duplicates"] += 1
+                continue
+            time_ms = _ms(record.get("transaction_time"))
+            newest = max(newest, time_ms)
+            transfer_type = int(record.get("transfer_type") or 0)
+            if transfer_type not in (TRANSFER_IN, TRANSFER_OUT):
+                self.stats["internal"] += 1
+                continue
+            usd = float(record.get("amount_usd") or 0)
+            quantity = float(record.get("asset_quantity") or 0)
+            row = self._row(exchange, asset)
+            if transfer_type == TRANSFER_IN:
+                self.total_inflow_usd[row] += usd
+                inflow, outflow = usd, 0.0
+            else:
+                self.total_outflow_usd[row] += usd
+                inflow, outflow, quantity = 0.0, usd, -quantity
+            if not self.flows.add(row, time_ms, inflow, outflow):
+                self.stats["expired"] += 1
+            if time_ms > self.balance_time[row] and self.balances[row] == self.balances[row]:
+                self.balances[row] += quantity
+            self.stats["transfers"] += 1
+            added += 1
+        if next_page is None:
+            self.cursors[exchange] = max(self.cursors.get(exchange, 0), newest)
+        else:
+            self.resume[exchange] = (start, next_page, newest)
+        return added
+
+    @traced()
+    def sync(self) -> Dict[str, Any]:
+        """
+        Fetch and apply new transfers for every exchange concurrently
+
+        :return: New transfers per exchange, errors per exchange and, for exchanges whose
+            paging hit `max_pages`, the start time and page the next sync resumes from
+        """
+        now = int(time.time() * 1000)
+        with self._lock:
+            starts = {e: self.resume[e][:2] if e in self.resume
+                      else (self.cursors.get(e) or now - self.lookback_ms, 1) for e in self.exchanges}
+        results: Dict[str, Any] = {"new": {}, "errors": {}, "truncated": {}}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.exchanges) or 1)) as executor:
+            futures = {e: executor.submit(contextvars.copy_context().run, self._fetch_new, e, *starts[e])
+                       for e in self.exchanges}
+            for exchange, future in futures.items():
+                try:
+                    records, next_page = future.result()
+                except Exception as e:
+                    results["errors"][exchange] = str(e)
+                    continue
+                start = starts[exchange][0]
+                with self._lock:
+                    results["new"][exchange] = self._apply(exchange, records, start, next_page)
+                if next_page is not None:
+                    results["truncated"][exchange] = {"start_time": start, "resume_page": next_page}
+        return results
+
+    @traced()
+    def seed_balances(self, symbols: Sequence[str]) -> int:
+        """
+        Set running balances from the exchange balance list
+
+        Transfers after the seed adjust the balance; call again periodically to reconcile.
+
+        :param symbols: Assets to seed, e.g. ['BTC', 'ETH', 'USDT']
+        :return: Number of (exchange, asset) balances set
+        """
+        tracked = set(self.exchanges)
+
+        def fetch(symbol: str) -> List[Dict[str, Any]]:
+            data = self.balance_service.fetch_data(symbol=symbol)
+            if data.get("code") != "0":
+                raise ValueError(f"Error fetching exchange balances: {data.get('msg')}")
+            return data.get("data") or []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols) or 1)) as executor:
+            futures = {symbol: executor.submit(contextvars.copy_context().run, fetch, symbol) for symbol in symbols}
+            listed = {symbol: future.result() for symbol, future in futures.items()}
+        seeded_at = int(time.time() * 1000)
+        count = 0
+        with self._lock:
+            for symbol, rows in listed.items():
+                for record in rows:
+                    exchange = record.get("exchange_name")
+                    if exchange in tracked and record.get("total_balance") is not None:
+                        row = self._row(exchange, symbol)
+                        self.balances[row] = float(record["total_balance"])
+                        self.balance_time[row] = seeded_at
+                        count += 1
+        return count
+
+    def _window_rows(self, window_ms: int, asset: Optional[str]) -> Tuple[List[int], array, array]:
+        now = int(time.time() * 1000)
+        with self._lock:
+            inflow, outflow = self.flows.window(now - window_ms, now)
+            rows = [row for row, (_, key_asset) in enumerate(self.key_list) if asset is None or key_asset == asset]
+        return rows, inflow, outflow
+
+    @traced()
+    def top_flows(self, window_ms: int = 86400000, top_n: int = 10, direction: str = "net",
+                  asset: Optional[str] = None, by: str = "exchange") -> List[Dict[str, Any]]:
+        """
+        Largest inflows, outflows or net flows in USD over a recent window
+
+        :param window_ms: Window ending now, rounded to whole buckets and capped at the retention
+        :param top_n: Number of entries
+        :param direction: 'inflow', 'outflow', 'net' (largest net inflow) or 'net_outflow'
+        :param asset: Only this asset
+        :param by: 'exchange' to sum over assets, 'pair' for each (exchange, asset)
+        :return: Entries with inflow, outflow and net flow in USD
+        """
+        if direction not in ("inflow", "outflow", "net", "net_outflow"):
+            raise ValueError(f"Unknown flow direction '{direction}'")
+        rows, inflow, outflow = self._window_rows(window_ms, asset)
+        groups: Dict[Any, List[float]] = {}
+        for row in rows:
+            exchange, key_asset = self.key_list[row]
+            key = exchange if by == "exchange" else (exchange, key_asset)
+            totals = groups.setdefault(key, [0.0, 0.0])
+            totals[0] += inflow[row]
+            totals[1] += outflow[row]
+        score = {
+            "inflow": lambda t: t[0], "outflow": lambda t: t[1],
+            "net": lambda t: t[0] - t[1], "net_outflow": lambda t: t[1] - t[0],
+        }[direction]
+        best = heapq.nlargest(top_n, groups.items(), key=lambda item: score(item[1]))
+        return [
+            {**({"exchange": key} if by == "exchange" else {"exchange": key[0], "asset": key[1]}),
+             "inflow_usd": totals[0], "outflow_usd": totals[1], "netflow_usd": totals[0] - totals[1]}
+            for key, totals in best
+        ]
+
+    def netflow(self, exchange: Optional[str] = None, asset: Optional[str] = None,
+                window_ms: int = 86400000) -> Dict[str, float]:
+        """Inflow, outflow and net flow in USD over a recent window, optionally for one exchange/asset"""
+        rows, inflow, outflow = self._window_rows(window_ms, asset)
+        rows = [row for row in rows if exchange is None or self.key_list[row][0] == exchange]
+        total_in = math.fsum(inflow[row] for row in rows)
+        total_out = math.fsum(outflow[row] for row in rows)
+        return {"inflow_usd": total_in, "outflow_usd": total_out, "netflow_usd": total_in - total_out}
+
+    def get_balances(self, asset: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Running balances (asset units) of seeded (exchange, asset) pairs, largest first"""
+        with self._lock:
+            rows = [
+                {"exchange": exchange, "asset": key_asset, "balance": self.balances[row],
+                 "total_inflow_usd": self.total_inflow_usd[row], "total_outflow_usd": self.total_outflow_usd[row]}
+                for row, (exchange, key_asset) in enumerate(self.key_list)
+                if (asset is None or key_asset == asset) and self.balances[row] == self.balances[row]
+            ]
+        return sorted(rows, key=lambda row: row["balance"], reverse=True)
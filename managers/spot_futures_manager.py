@@ -0,0 +1,284 @@
+"""Spot vs futures analytics: basis, volume ratios and taker imbalance divergence across the universe"""
+
+import contextvars
+import heapq
+import math
+import operator
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from services.market_data import CoinsMarketsService, PairsMarketsService
+from services.spot_market import SpotCoinsMarketsService
+from services.tracing import traced
+from managers.polling import SnapshotDiff, SnapshotTracker, extract_records
+
+
+NAN = float("nan")
+
+# Input columns of the joined frame and the record fields they are read from
+SPOT_FIELDS = {
+    "spot_price": ("current_price", "price"),
+    "spot_volume": ("volume_usd_24h", "volume_usd"),
+    "spot_buy": ("buy_volume_usd_24h", "buy_volume_usd"),
+    "spot_sell": ("sell_volume_usd_24h", "sell_volume_usd"),
+}
+FUTURES_FIELDS = {
+    "futures_price": ("current_price", "price"),
+    "futures_volume": ("volume_usd_24h", "volume_usd"),
+    "open_interest": ("open_interest_usd",),
+}
+FLOW_FIELDS = {
+    "futures_buy": ("long_volume_usd",),
+    "futures_sell": ("short_volume_usd",),
+}
+DERIVED = ("basis_pct", "volume_ratio", "spot_imbalance", "futures_imbalance", "divergence")
+
+
+def _num(record: Dict[str, Any], names: Sequence[str]) -> float:
+    for name in names:
+        value = record.get(name)
+        if value is not None and value != "":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+    return NAN
+
+
+def _ratio(a: float, b: float) -> float:
+    return a / b if b else NAN
+
+
+def _imbalance(buy: float, sell: float) -> float:
+    total = buy + sell
+    return (buy - sell) / total if total else NAN
+
+
+def aggregate_pair_flows(pairs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Sum futures taker buy/sell volume of all pairs of a coin into one record per coin
+
+    :param pairs: `pairs-markets` records; the coin is `base_asset` or the part of `symbol` before '/'.
+    :return: Records with `symbol`, `long_volume_usd`, `short_volume_usd` and `pairs`.
+    """
+    totals: Dict[str, List[float]] = {}
+    for pair in pairs:
+        coin = pair.get("base_asset") or str(pair.get("symbol", "")).split("/")[0]
+        if not coin:
+            continue
+        entry = totals.setdefault(coin, [0.0, 0.0, 0])
+        entry[0] += float(pair.get("long_volume_usd") or 0)
+        entry[1] += float(pair.get("short_volume_usd") or 0)
+        entry[2] += 1
+    return [{"symbol": coin, "long_volume_usd": buy, "short_volume_usd": sell, "pairs": n}
+            for coin, (buy, sell, n) in totals.items()]
+
+
+class SpotFuturesFrame:
+    """
+    Spot and futures metrics joined by symbol, one typed column per metric.
+
+    Rows are located through the `rows` hash index; symbols only listed on one side
+    keep NaN in the other side's columns. Derived columns are recomputed column-wise
+    with `map` over the input arrays, either for the whole frame or for a set of rows.
+    """
+
+    COLUMNS = tuple(SPOT_FIELDS) + tuple(FUTURES_FIELDS) + tuple(FLOW_FIELDS)
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.columns: Dict[str, array] = {name: array("d") for name in self.COLUMNS + DERIVED}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.rows
+
+    def row_of(self, symbol: str) -> int:
+        """Row of a symbol, appending an all-NaN row for new symbols"""
+        i = self.rows.get(symbol)
+        if i is None:
+            i = self.rows[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            for column in self.columns.values():
+                column.append(NAN)
+        return i
+
+    def set(self, i: int, fields: Dict[str, Sequence[str]], record: Optional[Dict[str, Any]]) -> None:
+        for name, aliases in fields.items():
+            self.columns[name][i] = _num(record, aliases) if record else NAN
+
+    def drop(self, symbols: Iterable[str]) -> None:
+        drop = {self.rows[symbol] for symbol in symbols if symbol in self.rows}
+        if not drop:
+            return
+        keep = [i for i in range(len(self.symbols)) if i not in drop]
+        self.symbols = [self.symbols[i] for i in keep]
+        self.rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+        for name, column in self.columns.items():
+            self.columns[name] = array("d", (column[i] for i in keep))
+
+    def compute(self, rows: Optional[Iterable[int]] = None) -> None:
+        """Recompute the derived columns, for all rows or only the given ones"""
+        c = self.columns
+        if rows is None:
+            c["basis_pct"] = array("d", map(lambda f, s: (f - s) / s * 100 if s else NAN,
+                                            c["futures_price"], c["spot_price"]))
+            c["volume_ratio"] = array("d", map(_ratio, c["futures_volume"], c["spot_volume"]))
+            c["spot_imbalance"] = array("d", map(_imbalance, c["spot_buy"], c["spot_sell"]))
+            c["futures_imbalance"] = array("d", map(_imbalance, c["futures_buy"], c["futures_sell"]))
+            c["divergence"] = array("d", map(operator.sub, c["futures_imbalance"], c["spot_imbalance"]))
+            return
+        for i in rows:
+            spot, futures = c["spot_price"][i], c["futures_price"][i]
+            c["basis_pct"][i] = (futures - spot) / spot * 100 if spot else NAN
+            c["volume_ratio"][i] = _ratio(c["futures_volume"][i], c["spot_volume"][i])
+            c["spot_imbalance"][i] = _imbalance(c["spot_buy"][i], c["spot_sell"][i])
+            c["futures_imbalance"][i] = _imbalance(c["futures_buy"][i], c["futures_sell"][i])
+            c["divergence"][i] = c["futures_imbalance"][i] - c["spot_imbalance"][i]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"symbol": self.symbols[i]}
+        for name, column in self.columns.items():
+            value = column[i]
+            record[name] = None if math.isnan(value) else value
+        return record
+
+    def top(self, column: str, n: int = 10, ascending: bool = False, by_abs: bool = False) -> List[Dict[str, Any]]:
+        """Rows with the largest (or smallest) non-NaN values of a column"""
+        values = self.columns[column]
+        candidates = [i for i, value in enumerate(values) if not math.isnan(value)]
+        key = (lambda i: abs(values[i])) if by_abs else values.__getitem__
+        pick = heapq.nsmallest if ascending and not by_abs else heapq.nlargest
+        return [self.record(i) for i in pick(n, candidates, key=key)]
+
+
+class SpotFuturesManager:
+    """
+    Joins the spot and futures sides of the universe and keeps basis and flow analytics current
+
+    Each refresh fetches spot coins-markets, futures coins-markets and futures pairs-markets
+    concurrently. Every side is diffed against its previous snapshot, and only symbols
+    whose inputs changed are rewritten and recomputed in the frame.
+
+    :param include_pairs: Fetch futures pairs-markets for the futures taker imbalance.
+    :param max_workers: Concurrent requests per refresh.
+    """
+
+    def __init__(self, include_pairs: bool = True, max_workers: int = 3):
+        self.include_pairs = include_pairs
+        self.max_workers = max_workers
+        self.spot_service = SpotCoinsMarketsService()
+        self.futures_service = CoinsMarketsService()
+        self.pairs_service = PairsMarketsService()
+        self.trackers = {
+            "spot": SnapshotTracker("spot.coins-markets", "symbol"),
+            "futures": SnapshotTracker("futures.coins-markets", "symbol"),
+            "flows": SnapshotTracker("futures.pair-flows", "symbol"),
+        }
+        self.frame = SpotFuturesFrame()
+
+    def _fetch(self) -> Dict[str, List[Dict[str, Any]]]:
+        jobs = {
+            "spot": lambda: extract_records(self.spot_service.fetch_data(), "spot coins markets"),
+            "futures": lambda: extract_records(self.futures_service.fetch_data(), "futures coins markets"),
+        }
+        if self.include_pairs:
+            jobs["flows"] = lambda: aggregate_pair_flows(
+                extract_records(self.pairs_service.fetch_data(), "futures pairs markets"))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {side: executor.submit(contextvars.copy_context().run, job) for side, job in jobs.items()}
+            return {side: future.result() for side, future in futures.items()}
+
+    @traced()
+    def refresh(self) -> SnapshotDiff:
+        """
+        Fetch both sides and update the rows whose inputs changed
+
+        :return: Diff of the joined analytics records (added, changed and removed symbols)
+        """
+        snapshots = self._fetch()
+        fields = {"spot": SPOT_FIELDS, "futures": FUTURES_FIELDS, "flows": FLOW_FIELDS}
+        diffs = {side: self.trackers[side].update(records) for side, records in snapshots.items()}
+
+        frame = self.frame
+        gone = {r["symbol"] for d in diffs.values() for r in d.removed}
+        gone = {s for s in gone if not any(s in self.trackers[side].index for side in snapshots)}
+        removed = [frame.record(frame.rows[s]) for s in gone if s in frame]
+        frame.drop(gone)
+
+        # Records of existing symbols as they were before any side writes its new inputs
+        touched: Dict[str, bool] = {}
+        before: Dict[str, Dict[str, Any]] = {}
+        for side, diff in diffs.items():
+            index = self.trackers[side].index
+            for record in diff.added + diff.changed + diff.removed:
+                symbol = record["symbol"]
+                if symbol in gone:
+                    continue
+                if symbol not in touched:
+                    touched[symbol] = symbol not in frame
+                    if not touched[symbol]:
+                        before[symbol] = frame.record(frame.rows[symbol])
+                frame.set(frame.row_of(symbol), fields[side], index.get(symbol))
+
+        rows = [frame.rows[s] for s in touched]
+        if len(rows) > len(frame) // 2:
+            frame.compute()
+        else:
+            frame.compute(rows)
+
+        added, changed = [], []
+        for symbol, new in touched.items():
+            record = frame.record(frame.rows[symbol])
+            if new:
+                added.append(record)
+            elif record != before[symbol]:
+                changed.append(record)
+        return SnapshotDiff("spot_futures", added, changed, removed, len(frame))
+
+    def get_symbol(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Joined spot/futures record of one symbol"""
+        i = self.frame.rows.get(symbol)
+        return None if i is None else self.frame.record(i)
+
+    def get_top_basis(self, n: int = 10, ascending: bool = False) -> List[Dict[str, Any]]:
+        """Richest (or cheapest, with `ascending`) futures relative to spot"""
+        return self.frame.top("basis_pct", n, ascending)
+
+    def get_volume_leaders(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Coins whose futures volume is the largest multiple of spot volume"""
+        return self.frame.top("volume_ratio", n)
+
+    def get_divergences(self, n: int = 10, min_volume_usd: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Coins where futures and spot takers lean the furthest apart
+
+        :param n: Number of coins.
+        :param min_volume_usd: Ignore coins with less spot 24h volume than this.
+        :return: Records ordered by |futures imbalance - spot imbalance|
+        """
+        top = self.frame.top("divergence", len(self.frame), by_abs=True)
+        return [r for r in top if (r["spot_volume"] or 0) >= min_volume_usd][:n]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Universe-wide counts and volume-weighted basis"""
+        c = self.frame.columns
+        joined = [i for i, (s, f) in enumerate(zip(c["spot_price"], c["futures_price"]))
+                  if not (math.isnan(s) or math.isnan(f))]
+        weights = [c["futures_volume"][i] for i in joined if not math.isnan(c["futures_volume"][i])]
+        weighted = math.fsum(c["basis_pct"][i] * c["futures_volume"][i] for i in joined
+                             if not math.isnan(c["futures_volume"][i]))
+        total = math.fsum(weights)
+        return {
+            "symbols": len(self.frame),
+            "joined": len(joined),
+            "spot_only": sum(1 for f in c["futures_price"] if math.isnan(f)),
+            "futures_only": sum(1 for s in c["spot_price"] if math.isnan(s)),
+            "volume_weighted_basis_pct": weighted / total if total else None,
+            "futures_spot_volume_ratio": _ratio(math.fsum(v for v in c["futures_volume"] if not math.isnan(v)),
+                                                math.fsum(v for v in c["spot_volume"] if not math.isnan(v))),
+        }
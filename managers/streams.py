@@ -0,0 +1,166 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from services.liquidation import LiquidationOrderService
+
+
+class FingerprintRing:
+    """
+    Bounded set of recently seen fingerprints.
+
+    Holds at most `capacity` hashes; once full, the oldest fingerprint is forgotten for
+    each new one, so memory stays flat no matter how many events flow through.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self._order: Deque[Hashable] = deque()
+        self._seen: Set[Hashable] = set()
+
+    def add(self, fingerprint: Hashable) -> bool:
+        """Remember a fingerprint; returns False if it was already present"""
+        if fingerprint in self._seen:
+            return False
+        if len(self._order) >= self.capacity:
+            self._seen.discard(self._order.popleft())
+        self._order.append(fingerprint)
+        self._seen.add(fingerprint)
+        return True
+
+    def __contains__(self, fingerprint: Hashable) -> bool:
+        return fingerprint in self._seen
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def clear(self) -> None:
+        self._order.clear()
+        self._seen.clear()
+
+
+# Quote assets stripped from pair symbols to recover their base asset, longest first
+QUOTE_SUFFIXES = ("FDUSD", "USDT", "USDC", "BUSD", "USD")
+
+
+def base_asset(symbol: str) -> str:
+    """Base asset of a pair symbol: 'BTCUSDT', 'BTC-USDT-SWAP' and 'BTCUSD_PERP' all give 'BTC'"""
+    symbol = symbol.upper()
+    for separator in ("-", "_", "/"):
+        symbol = symbol.split(separator, 1)[0]
+    for quote in QUOTE_SUFFIXES:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)]
+    return symbol
+
+
+def liquidation_fingerprint(order: Dict[str, Any]) -> int:
+    """Compact identity of a liquidation order (the endpoint has no order id)"""
+    return hash((order.get("exchange_name"), order.get("symbol"), order.get("side"),
+                 order.get("time"), order.get("price"), order.get("usd_value")))
+
+
+class LiquidationEventStream:
+    """
+    Iterator (and async iterator) over new liquidation orders.
+
+    Polls `/futures/liquidation/order`, drops orders already delivered using a bounded
+    `FingerprintRing`, applies the symbol/exchange/min USD filters and yields events in
+    timestamp order. With `max_lateness` > 0, events are held in a small reorder buffer
+    for that many seconds so stragglers from a later poll are still delivered in order.
+
+    :param service: Service used to poll liquidation orders.
+    :param poll_interval: Seconds between polls.
+    :param symbol: Only orders for this coin: the exact symbol, or a pair whose base asset it is
+        ('BTC' matches 'BTCUSDT' but not 'BTCDOM').
+    :param exchange: Only orders from this exchange (case-insensitive).
+    :param min_usd: Only orders worth at least this much.
+    :param capacity: Number of fingerprints remembered for deduplication.
+    :param max_lateness: Seconds events are buffered for reordering.
+    :param on_error: Called with the exception when a poll fails; the stream keeps going.
+    """
+
+    def __init__(self, service: Optional[LiquidationOrderService] = None, poll_interval: float = 5.0,
+                 symbol: Optional[str] = None, exchange: Optional[str] = None, min_usd: float = 0.0,
+                 capacity: int = 65536, max_lateness: float = 0.0,
+                 on_error: Optional[Callable[[BaseException], None]] = None):
+        self.service = service or LiquidationOrderService()
+        self.poll_interval = poll_interval
+        self.symbol = symbol.upper() if symbol else None
+        self.exchange = exchange.lower() if exchange else None
+        self.min_usd = min_usd
+        self.max_lateness = max_lateness
+        self.on_error = on_error
+        self.seen = FingerprintRing(capacity)
+        self._buffer: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = itertools.count()
+        self.polls = 0
+        self.errors = 0
+        self.delivered = 0
+        self.duplicates = 0
+
+    def _matches(self, order: Dict[str, Any]) -> bool:
+        if self.min_usd and float(order.get("usd_value") or 0) < self.min_usd:
+            return False
+        if self.exchange and (order.get("exchange_name") or "").lower() != self.exchange:
+            return False
+        if self.symbol:
+            symbol = (order.get("symbol") or "").upper()
+            base = (order.get("base_asset") or "").upper()
+            if self.symbol not in (symbol, base) and base_asset(symbol) != self.symbol:
+                return False
+        return True
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Fetch once and return the new, filtered orders that are ready, oldest first"""
+        data = self.service.fetch_data()
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching liquidation orders: {data.get('msg')}")
+        self.polls += 1
+
+        for order in data.get("data") or []:
+            if not self._matches(order):
+                continue
+            if not self.seen.add(liquidation_fingerprint(order)):
+                self.duplicates += 1
+                continue
+            heapq.heappush(self._buffer, (order.get("time") or 0, next(self._sequence), order))
+        return self._drain()
+
+    def _drain(self, flush: bool = False) -> List[Dict[str, Any]]:
+        ready = []
+        cutoff = (time.time() - self.max_lateness) * 1000
+        while self._buffer and (flush or not self.max_lateness or self._buffer[0][0] <= cutoff):
+            ready.append(heapq.heappop(self._buffer)[2])
+        self.delivered += len(ready)
+        return ready
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Release every buffered event regardless of lateness"""
+        return self._drain(flush=True)
+
+    def _safe_poll(self) -> List[Dict[str, Any]]:
+        try:
+            return self.poll()
+        except Exception as e:
+            self.errors += 1
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+            return self._drain()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            started = time.monotonic()
+            yield from self._safe_poll()
+            time.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            started = time.monotonic()
+            for event in await asyncio.to_thread(self._safe_poll):
+                yield event
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
@@ -0,0 +1,502 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from managers.base import FundingRateManager
+from managers.liquidation_manager import LiquidationManager
+from managers.market_data_manager import MarketDataManager
+from services.base import BASE_API_KEY, CoinglassAPIBase
+from services.funding_rates import OHLCHistoryService
+from services.key_pool import APIKeyPool, NoAvailableKeyError, PooledKey
+from services.market_data import CoinsMarketsService
+from storage.columnar import ColumnBatch
+from storage.shared import SharedBatch, SharedBatchRegistry
+
+
+TaskKey = Tuple[str, str, str]  # (kind, symbol, interval)
+
+
+class KeyLease:
+    """API key handed to a worker process for exactly one request"""
+
+    __slots__ = ("key", "request_id")
+
+    def __init__(self, key: str, request_id: int):
+        self.key = key
+        self.request_id = request_id
+
+
+class KeyLeaseClient:
+    """
+    Worker-side stand-in for `APIKeyPool`.
+
+    Installed as `CoinglassAPIBase.key_pool` inside sweep workers: every request asks the
+    coordinator in the parent process for a key and reports the outcome back, so all
+    workers draw from one rate budget. Safe to use from several threads of one worker.
+    """
+
+    def __init__(self, worker_id: int, requests: multiprocessing.Queue, grants: multiprocessing.Queue):
+        self.worker_id = worker_id
+        self.requests = requests
+        self.grants = grants
+        self._ids = itertools.count()
+        self._waiting: Dict[int, List[Any]] = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_grants, daemon=True, name="coinglass-lease-reader")
+        self._reader.start()
+
+    def _read_grants(self) -> None:
+        while True:
+            request_id, key, error = self.grants.get()
+            with self._lock:
+                slot = self._waiting.pop(request_id, None)
+            if slot is not None:
+                slot[1], slot[2] = key, error
+                slot[0].set()
+
+    def acquire(self, timeout: Optional[float] = None) -> KeyLease:
+        request_id = next(self._ids)
+        slot = [threading.Event(), None, None]
+        with self._lock:
+            self._waiting[request_id] = slot
+        self.requests.put(("acquire", self.worker_id, request_id, timeout))
+        slot[0].wait()
+        if slot[2] is not None:
+            raise NoAvailableKeyError(slot[2])
+        return KeyLease(slot[1], request_id)
+
+    def release(self, pooled: KeyLease, status_code: Optional[int] = None, error: Optional[BaseException] = None,
+                retry_after: Optional[float] = None, api_code: Optional[str] = None) -> None:
+        self.requests.put(("release", pooled.key, status_code, error is not None, retry_after, api_code))
+
+
+class KeyLeaseCoordinator:
+    """
+    Parent-side owner of the rate budget.
+
+    Serves lease requests from every worker out of a single `APIKeyPool`, so per-key token
+    buckets, least-loaded dispatch and quarantine behave exactly as in one process.
+    """
+
+    def __init__(self, pool: APIKeyPool, requests: multiprocessing.Queue, grants: Sequence[multiprocessing.Queue]):
+        self.pool = pool
+        self.requests = requests
+        self.grants = grants
+        self.leases = 0
+        self._by_key: Dict[str, PooledKey] = {pooled.key: pooled for pooled in pool.keys}
+        self._executor = ThreadPoolExecutor(max_workers=max(4, len(grants) * 2), thread_name_prefix="coinglass-lease")
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="coinglass-lease-coordinator")
+
+    def start(self) -> "KeyLeaseCoordinator":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.requests.put(("stop",))
+        self._thread.join()
+        self._executor.shutdown(wait=False)
+
+    def _grant(self, worker_id: int, request_id: int, timeout: Optional[float]) -> None:
+        try:
+            pooled = self.pool.acquire(timeout)
+        except NoAvailableKeyError as e:
+            self.grants[worker_id].put((request_id, None, str(e)))
+            return
+        self.leases += 1
+        self.grants[worker_id].put((request_id, pooled.key, None))
+
+    def _loop(self) -> None:
+        while True:
+            message = self.requests.get()
+            if message[0] == "stop":
+                return
+            if message[0] == "acquire":
+                _, worker_id, request_id, timeout = message
+                self._executor.submit(self._grant, worker_id, request_id, timeout)
+            elif message[0] == "release":
+                _, key, status_code, failed, retry_after, api_code = message
+                pooled = self._by_key.get(key)
+                if pooled is not None:
+                    self.pool.release(pooled, status_code, RuntimeError("request failed") if failed else None,
+                                      retry_after, api_code)
+
+
+def _history_batch(records: List[Dict[str, Any]], fields: Sequence[str]) -> ColumnBatch:
+    present = [f for f in fields if records and f in records[0]]
+    return ColumnBatch.from_records(records, present)
+
+
+def sweep_price(symbol: str, interval: str) -> Tuple[ColumnBatch, Dict[str, Any]]:
+    """Price history as columns plus return and volatility"""
+    manager = _worker_managers()["market"]
+    data = manager.price_history_service.fetch_data(symbol=symbol, interval=interval)
+    if data.get("code") != "0":
+        raise ValueError(f"Error fetching price history: {data.get('msg')}")
+    batch = _history_batch(data.get("data") or [], ("time", "open", "high", "low", "close", "volume_usd"))
+    closes = list(batch["close"]) if "close" in batch else []
+    summary: Dict[str, Any] = {"rows": len(batch)}
+    if closes:
+        summary["last_close"] = closes[-1]
+        summary["change_percent"] = (closes[-1] / closes[0] - 1) * 100 if closes[0] else 0
+        summary["volatility"] = manager._calculate_volatility(closes[-24:])
+    return batch, summary
+
+
+def sweep_liquidation(symbol: str, interval: str) -> Tuple[ColumnBatch, Dict[str, Any]]:
+    """Aggregated liquidation history as columns plus long/short totals"""
+    history = _worker_managers()["liquidation"].get_aggregated_liquidation_history(symbol, interval)
+    batch = _history_batch(history or [], ("time", "long_liquidation_usd", "short_liquidation_usd"))
+    longs = sum(batch["long_liquidation_usd"]) if "long_liquidation_usd" in batch else 0.0
+    shorts = sum(batch["short_liquidation_usd"]) if "short_liquidation_usd" in batch else 0.0
+    return batch, {
+        "rows": len(batch),
+        "total_long_liquidations_usd": longs,
+        "total_short_liquidations_usd": shorts,
+        "long_short_ratio": longs / shorts if shorts > 0 else 0,
+    }
+
+
+def sweep_funding(symbol: str, interval: str) -> Tuple[ColumnBatch, Dict[str, Any]]:
+    """Funding rate OHLC history as columns plus the latest and mean rate"""
+    history = _worker_managers()["funding"].get_pair_funding_rate_history(symbol, interval=interval)
+    batch = _history_batch(history or [], ("time", "open", "high", "low", "close"))
+    closes = list(batch["close"]) if "close" in batch else []
+    return batch, {
+        "rows": len(batch),
+        "last_rate": closes[-1] if closes else None,
+        "mean_rate": sum(closes) / len(closes) if closes else None,
+    }
+
+
+SWEEP_KINDS: Dict[str, Callable[[str, str], Tuple[ColumnBatch, Dict[str, Any]]]] = {
+    "price": sweep_price,
+    "liquidation": sweep_liquidation,
+    "funding": sweep_funding,
+}
+
+_managers: Dict[str, Any] = {}
+
+
+def _worker_managers() -> Dict[str, Any]:
+    if not _managers:
+        _managers["market"] = MarketDataManager()
+        _managers["liquidation"] = LiquidationManager()
+        _managers["funding"] = FundingRateManager(OHLCHistoryService)
+    return _managers
+
+
+def _run_shard(tasks: List[TaskKey], threads: int, shared: bool, announce: Optional[Callable[[str], None]] = None
+               ) -> Tuple[List[Tuple[TaskKey, Any, Dict[str, Any]]], Dict[TaskKey, str]]:
+    def run(task: TaskKey):
+        kind, symbol, interval = task
+        batch, summary = SWEEP_KINDS[kind](symbol, interval)
+        if shared:
+            # The parent adopts the segment by name and becomes responsible for unlinking it. The
+            # name is announced before the segment exists, so the parent can still unlink it if
+            # this worker dies (or the sweep times out) before the shard's results arrive.
+            name = f"cg_{uuid.uuid4().hex[:16]}"
+            if announce is not None:
+                announce(name)
+            return SharedBatch.create(batch, name, track=False).handoff(), summary
+        return batch.to_bytes(), summary
+
+    results, failures = [], {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = {task: executor.submit(run, task) for task in tasks}
+        for task, future in futures.items():
+            try:
+                payload, summary = future.result()
+                results.append((task, payload, summary))
+            except Exception as e:
+                failures[task] = f"{type(e).__name__}: {e}"
+    return results, failures
+
+
+def _worker_main(worker_id: int, base_url: str, threads: int, shared: bool, shards: multiprocessing.Queue,
+                 results: multiprocessing.Queue, requests: multiprocessing.Queue,
+                 grants: multiprocessing.Queue) -> None:
+    CoinglassAPIBase.BASE_URL = base_url
+    CoinglassAPIBase.key_pool = KeyLeaseClient(worker_id, requests, grants)
+    CoinglassAPIBase.scheduler = None
+    CoinglassAPIBase.cache = None
+    while True:
+        message = shards.get()
+        if message is None:
+            return
+        shard_id, attempt, tasks = message
+        results.put(("started", worker_id, shard_id, attempt))
+        try:
+            done, failures = _run_shard(tasks, threads, shared,
+                                        lambda name: results.put(("handoff", worker_id, name)))
+        except Exception as e:
+            done, failures = [], {task: f"{type(e).__name__}: {e}" for task in tasks}
+        results.put(("done", worker_id, shard_id, attempt, done, failures))
+
+
+def _unlink_segment(name: str) -> None:
+    """Adopt and immediately release a handed-off segment nobody is going to read"""
+    try:
+        SharedBatch.adopt(name).close()
+    except FileNotFoundError:
+        pass
+
+
+class SweepResult:
+    """Columns and summary statistics of one (kind, symbol, interval) task"""
+
+    __slots__ = ("kind", "symbol", "interval", "columns", "summary")
+
+    def __init__(self, kind: str, symbol: str, interval: str, columns: ColumnBatch, summary: Dict[str, Any]):
+        self.kind = kind
+        self.symbol = symbol
+        self.interval = interval
+        self.columns = columns
+        self.summary = summary
+
+    def __repr__(self) -> str:
+        return f"SweepResult({self.kind!r}, {self.symbol!r}, {self.interval!r}, rows={len(self.columns)})"
+
+
+class SweepReport:
+    """Outcome of a sweep: results per task, tasks that failed after all retries, and run statistics"""
+
+    def __init__(self, shared: Optional[SharedBatchRegistry] = None):
+        self.shared = shared
+        self.results: Dict[TaskKey, SweepResult] = {}
+        self.failures: Dict[TaskKey, str] = {}
+        self.shards = 0
+        self.retries = 0
+        self.worker_restarts = 0
+        self.requests = 0
+        self.elapsed = 0.0
+
+    def get(self, kind: str, symbol: str, interval: str) -> Optional[SweepResult]:
+        return self.results.get((kind, symbol, interval))
+
+    def summaries(self, kind: str, interval: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Summary per symbol for one kind (and interval)"""
+        return {r.symbol: r.summary for (k, _, i), r in self.results.items()
+                if k == kind and (interval is None or i == interval)}
+
+    def close(self) -> None:
+        """Release the shared memory behind the results of a `shared_memory=True` sweep"""
+        if self.shared is not None:
+            self.results.clear()
+            self.shared.close()
+
+    def __enter__(self) -> "SweepReport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tasks": len(self.results) + len(self.failures), "succeeded": len(self.results),
+                "failed": len(self.failures), "shards": self.shards, "retries": self.retries,
+                "worker_restarts": self.worker_restarts, "requests": self.requests,
+                "elapsed_s": round(self.elapsed, 3),
+                "bytes": sum(r.columns.nbytes for r in self.results.values())}
+
+
+class UniverseSweeper:
+    """
+    Sweeps the whole symbol universe across a pool of worker processes.
+
+    The universe is cut into shards of `shard_size` symbols; each worker process runs a
+    shard's (kind, symbol, interval) tasks on a few threads and sends results back as
+    compact column buffers instead of lists of dicts. The parent process is the
+    coordinator: it owns the API key pool, hands a key to workers for each request, and
+    re-queues a shard's failed tasks (or the whole shard if its worker died) up to
+    `max_retries` times. Parsing and analytics therefore scale with cores while the
+    request rate stays within one quota.
+
+    Workers are started with the platform's default multiprocessing start method, so
+    scripts using the sweeper should guard their entry point with `if __name__ == "__main__":`.
+
+    :param processes: Number of worker processes (defaults to the CPU count).
+    :param key_pool: Rate budget shared by all workers; defaults to `CoinglassAPIBase.key_pool`
+        or a single-key pool built from BASE_API_KEY.
+    :param requests_per_minute: Quota of that single-key pool.
+    :param threads_per_worker: Concurrent requests per worker process.
+    :param shard_size: Symbols per shard.
+    :param max_retries: Times a failed task is retried in a new shard.
+    :param shared_memory: Hand results over in shared memory segments instead of through the
+        result queue; the report's columns are then zero-copy views, valid until `report.close()`.
+    """
+
+    def __init__(self, processes: Optional[int] = None, key_pool: Optional[APIKeyPool] = None,
+                 requests_per_minute: float = 30, threads_per_worker: int = 4, shard_size: int = 8,
+                 max_retries: int = 2, shared_memory: bool = False):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.key_pool = key_pool or CoinglassAPIBase.key_pool or APIKeyPool([BASE_API_KEY], requests_per_minute)
+        self.threads_per_worker = threads_per_worker
+        self.shard_size = shard_size
+        self.max_retries = max_retries
+        self.shared_memory = shared_memory
+
+    @staticmethod
+    def universe(top_n: Optional[int] = None) -> List[str]:
+        """Symbols from /futures/coins-markets, largest market cap first"""
+        data = CoinsMarketsService().fetch_data()
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching coins markets: {data.get('msg')}")
+        coins = sorted(data.get("data") or [], key=lambda c: c.get("market_cap_usd") or 0, reverse=True)
+        symbols = [c["symbol"] for c in coins if c.get("symbol")]
+        return symbols[:top_n] if top_n else symbols
+
+    def _shards(self, symbols: Sequence[str], kinds: Sequence[str], intervals: Sequence[str]) -> List[List[TaskKey]]:
+        shards = []
+        for start in range(0, len(symbols), self.shard_size):
+            shards.append([(kind, symbol, interval) for symbol in symbols[start:start + self.shard_size]
+                           for kind in kinds for interval in intervals])
+        return shards
+
+    def sweep(self, symbols: Optional[Sequence[str]] = None, kinds: Sequence[str] = ("price", "liquidation", "funding"),
+              intervals: Sequence[str] = ("1h",), timeout: Optional[float] = None) -> SweepReport:
+        """
+        Run every (kind, symbol, interval) task across the worker processes
+
+        :param symbols: Universe to sweep; defaults to every symbol in `universe()`.
+        :param kinds: Keys of `SWEEP_KINDS` to run for each symbol.
+        :param intervals: History intervals to sweep.
+        :param timeout: Max seconds for the whole sweep; unfinished tasks are reported as failures.
+        :return: The sweep report.
+        """
+        unknown = [k for k in kinds if k not in SWEEP_KINDS]
+        if unknown:
+            raise ValueError(f"Unknown sweep kinds: {unknown}")
+        symbols = list(symbols) if symbols is not None else self.universe()
+        report = SweepReport(SharedBatchRegistry() if self.shared_memory else None)
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        context = multiprocessing.get_context()
+        shard_queue, result_queue, request_queue = context.Queue(), context.Queue(), context.Queue()
+        processes = min(self.processes, max(1, -(-len(symbols) // self.shard_size)))
+        grant_queues = [context.Queue() for _ in range(processes)]
+
+        def spawn(worker_id: int) -> multiprocessing.Process:
+            process = context.Process(
+                target=_worker_main, daemon=True, name=f"coinglass-sweep-{worker_id}",
+                args=(worker_id, CoinglassAPIBase.BASE_URL, self.threads_per_worker, self.shared_memory, shard_queue,
+                      result_queue, request_queue, grant_queues[worker_id]))
+            process.start()
+            return process
+
+        # Workers are forked before any coordinator thread exists
+        workers = [spawn(i) for i in range(processes)]
+        coordinator = KeyLeaseCoordinator(self.key_pool, request_queue, grant_queues).start()
+
+        shard_ids = itertools.count()
+        pending: Dict[int, Tuple[int, List[TaskKey]]] = {}
+        running: Dict[int, int] = {}  # worker id -> shard id
+        handed_off: Set[str] = set()  # segments announced by workers whose results have not arrived
+
+        def discard(message: Tuple[Any, ...]) -> None:
+            """Release the segments referenced by a message whose results are not used"""
+            if message[0] == "handoff":
+                handed_off.add(message[2])
+            elif message[0] == "done":
+                for _, payload, _ in message[4]:
+                    if isinstance(payload, str):
+                        handed_off.discard(payload)
+                        _unlink_segment(payload)
+
+        def submit(tasks: List[TaskKey], attempt: int) -> None:
+            shard_id = next(shard_ids)
+            pending[shard_id] = (attempt, tasks)
+            shard_queue.put((shard_id, attempt, tasks))
+            report.shards += 1
+
+        def retry_or_fail(tasks: List[TaskKey], attempt: int, failures: Dict[TaskKey, str]) -> None:
+            if attempt < self.max_retries:
+                report.retries += 1
+                submit(tasks, attempt + 1)
+            else:
+                report.failures.update(failures)
+
+        for tasks in self._shards(symbols, kinds, intervals):
+            submit(tasks, 0)
+
+        try:
+            while pending:
+                if deadline is not None and time.monotonic() >= deadline:
+                    for _, tasks in pending.values():
+                        report.failures.update({task: "sweep timed out" for task in tasks})
+                    break
+                try:
+                    message = result_queue.get(timeout=0.2)
+                except queue.Empty:
+                    for worker_id, process in enumerate(workers):
+                        if process.is_alive():
+                            continue
+                        report.worker_restarts += 1
+                        shard_id = running.pop(worker_id, None)
+                        if shard_id in pending:
+                            attempt, tasks = pending.pop(shard_id)
+                            retry_or_fail(tasks, attempt, {t: f"worker exited with code {process.exitcode}"
+                                                           for t in tasks})
+                        # A fresh grant queue so the new worker never sees leases meant for the dead one
+                        grant_queues[worker_id] = context.Queue()
+                        workers[worker_id] = spawn(worker_id)
+                    continue
+
+                if message[0] == "started":
+                    _, worker_id, shard_id, _ = message
+                    running[worker_id] = shard_id
+                    continue
+                if message[0] == "handoff":
+                    handed_off.add(message[2])
+                    continue
+
+                _, worker_id, shard_id, attempt, done, failures = message
+                running.pop(worker_id, None)
+                if pending.pop(shard_id, None) is None:
+                    discard(message)
+                    continue
+                for (kind, symbol, interval), payload, summary in done:
+                    if isinstance(payload, str):
+                        handed_off.discard(payload)
+                        columns = report.shared.adopt(payload).batch
+                    else:
+                        columns = ColumnBatch.from_bytes(payload)
+                    report.results[(kind, symbol, interval)] = SweepResult(kind, symbol, interval, columns, summary)
+                    report.failures.pop((kind, symbol, interval), None)
+                if failures:
+                    retry_or_fail(list(failures), attempt, failures)
+        finally:
+            try:
+                while True:
+                    shard_queue.get_nowait()
+            except queue.Empty:
+                pass
+            for _ in workers:
+                shard_queue.put(None)
+            # Keep draining results while workers wind down: they cannot exit with unflushed
+            # messages, and late results may reference segments that must still be unlinked
+            stop_by = time.monotonic() + 5
+            while any(process.is_alive() for process in workers) and time.monotonic() < stop_by:
+                try:
+                    discard(result_queue.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+            for process in workers:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            try:
+                while True:
+                    discard(result_queue.get(timeout=0.1))
+            except queue.Empty:
+                pass
+            for name in handed_off:
+                _unlink_segment(name)
+            coordinator.stop()
+            report.requests = coordinator.leases
+            report.elapsed = time.monotonic() - started
+        return report
@@ -0,0 +1,334 @@
+import contextvars
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence
+
+from services.exchange_data import HyperliquidWhaleAlertService, HyperliquidWhalePositionService
+from services.onchain import OnchainWhaleTransactionsService
+from services.tracing import traced
+from managers.polling import SnapshotTracker, extract_records
+from managers.pubsub import EventBus
+from managers.streams import FingerprintRing
+
+
+def _ms(value: Any) -> int:
+    ts = int(float(value or 0))
+    return ts * 1000 if ts < 10 ** 11 else ts
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class WhaleEvent:
+    """
+    One whale action in the common schema of every source.
+
+    `kind` is 'transfer' for on-chain moves, 'open'/'close' for Hyperliquid alerts and
+    'position_opened'/'position_changed'/'position_closed' for position snapshot diffs.
+    `net_usd` is the directional exposure added: positive for adding long (or receiving
+    on-chain), negative for adding short (or sending).
+    """
+
+    __slots__ = ("id", "source", "kind", "time", "address", "counterparty", "symbol", "side",
+                 "size", "value_usd", "net_usd", "price", "raw")
+
+    def __init__(self, id: Hashable, source: str, kind: str, time: int, address: str, symbol: str,
+                 value_usd: float, net_usd: float, side: Optional[str] = None, size: float = 0.0,
+                 price: Optional[float] = None, counterparty: Optional[str] = None,
+                 raw: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.source = source
+        self.kind = kind
+        self.time = time
+        self.address = address
+        self.counterparty = counterparty
+        self.symbol = symbol
+        self.side = side
+        self.size = size
+        self.value_usd = value_usd
+        self.net_usd = net_usd
+        self.price = price
+        self.raw = raw
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ("id", "raw")}
+
+    def __lt__(self, other: "WhaleEvent") -> bool:
+        return self.time < other.time
+
+    def __repr__(self) -> str:
+        return (f"WhaleEvent({self.source}:{self.kind} {self.symbol} {self.address[:10]} "
+                f"${self.value_usd:,.0f} at {self.time})")
+
+
+def normalize_onchain_transfer(record: Dict[str, Any]) -> WhaleEvent:
+    sender = record.get("from_address") or record.get("from") or ""
+    receiver = record.get("to_address") or record.get("to") or ""
+    value = _float(record.get("amount_usd") or record.get("value_usd"))
+    return WhaleEvent(
+        ("onchain", record.get("transaction_hash") or record.get("hash")), "onchain", "transfer",
+        _ms(record.get("time") or record.get("timestamp") or record.get("block_time")), receiver,
+        record.get("symbol") or record.get("chain") or "", value, value, size=_float(record.get("amount")),
+        counterparty=sender, raw=record,
+    )
+
+
+def normalize_whale_alert(record: Dict[str, Any]) -> WhaleEvent:
+    size = _float(record.get("position_size"))
+    value = _float(record.get("position_value_usd"))
+    opening = int(record.get("position_action") or 1) == 1
+    side = "long" if size >= 0 else "short"
+    # Opening a long or closing a short adds long exposure
+    net = value if (side == "long") == opening else -value
+    time_ms = _ms(record.get("create_time"))
+    return WhaleEvent(
+        ("alert", record.get("user"), record.get("symbol"), time_ms, record.get("position_action"), size),
+        "hyperliquid_alert", "open" if opening else "close", time_ms, record.get("user") or "",
+        record.get("symbol") or "", value, net, side=side, size=size, price=_float(record.get("entry_price")),
+        raw=record,
+    )
+
+
+def position_events(previous: Dict[Hashable, Dict[str, Any]], added: Sequence[Dict[str, Any]],
+                    changed: Sequence[Dict[str, Any]], removed: Sequence[Dict[str, Any]]) -> List[WhaleEvent]:
+    """Turn a whale-position snapshot diff into events carrying the size change"""
+    events = []
+    for kind, records in (("position_opened", added), ("position_changed", changed), ("position_closed", removed)):
+        for record in records:
+            user, symbol = record.get("user") or "", record.get("symbol") or ""
+            size = _float(record.get("position_size"))
+            mark = _float(record.get("mark_price") or record.get("entry_price"))
+            if kind == "position_closed":
+                delta = -size
+                time_ms = int(time.time() * 1000)
+            else:
+                old = previous.get((user, symbol))
+                delta = size - (_float(old.get("position_size")) if old and kind == "position_changed" else 0.0)
+                time_ms = _ms(record.get("update_time") or record.get("create_time"))
+            if kind == "position_changed" and not delta:
+                continue
+            events.append(WhaleEvent(
+                ("position", user, symbol, time_ms, size if kind != "position_closed" else None), "hyperliquid_position",
+                kind, time_ms, user, symbol, abs(delta) * mark, delta * mark,
+                side="long" if size >= 0 else "short", size=delta, price=mark, raw=record,
+            ))
+    return events
+
+
+class RollingExposure:
+    """
+    Per-key gross and net USD over a trailing window, in bounded memory.
+
+    Each key holds at most `window_ms / bucket_ms` buckets of [bucket, gross, net, count];
+    at most `max_keys` keys are kept, least recently active evicted first.
+    """
+
+    def __init__(self, window_ms: int, bucket_ms: int, max_keys: int):
+        self.window_ms = window_ms
+        self.bucket_ms = bucket_ms
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, Deque[List[float]]]" = OrderedDict()
+        self.evicted = 0
+
+    def add(self, key: Hashable, time_ms: int, gross: float, net: float) -> None:
+        bucket = time_ms // self.bucket_ms
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            buckets = self._buckets[key] = deque(maxlen=max(1, self.window_ms // self.bucket_ms + 1))
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._buckets.move_to_end(key)
+        if buckets and buckets[-1][0] == bucket:
+            entry = buckets[-1]
+        elif buckets and buckets[-1][0] > bucket:
+            entry = next((b for b in buckets if b[0] == bucket), None)
+            if entry is None:
+                return          # late event whose bucket this key never had; dropped
+        else:
+            entry = [bucket, 0.0, 0.0, 0]
+            buckets.append(entry)
+        entry[1] += gross
+        entry[2] += net
+        entry[3] += 1
+
+    def get(self, key: Hashable, now_ms: Optional[int] = None) -> Dict[str, float]:
+        first = ((now_ms or int(time.time() * 1000)) - self.window_ms) // self.bucket_ms
+        gross = net = count = 0
+        for bucket, g, n, c in self._buckets.get(key, ()):
+            if bucket >= first:
+                gross += g
+                net += n
+                count += c
+        return {"gross_usd": gross, "net_usd": net, "events": count}
+
+    def top(self, n: int = 10, by: str = "gross_usd", now_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        now_ms = now_ms or int(time.time() * 1000)
+        stats = ({"key": key, **self.get(key, now_ms)} for key in list(self._buckets))
+        score = (lambda s: abs(s["net_usd"])) if by == "abs_net_usd" else (lambda s: s[by])
+        return [s for s in heapq.nlargest(n, stats, key=score) if s["events"]]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class WhaleAggregator:
+    """
+    Merges on-chain whale transfers, Hyperliquid whale alerts and Hyperliquid whale
+    position changes into one time-ordered stream of `WhaleEvent`s.
+
+    Each refresh polls the sources concurrently. Event feeds are cut at a per-source
+    watermark (newest time processed minus `lateness_ms`) before anything is normalised,
+    and the remaining events are deduplicated through a bounded `FingerprintRing`. The
+    position feed is a snapshot, so it is diffed with a `SnapshotTracker` and only opened,
+    resized and closed positions become events. New events from all sources are merged in
+    time order, kept in a bounded recent buffer, folded into rolling per-address and
+    per-symbol exposure and, with a `bus`, published as 'whale.<source>'.
+
+    :param chains: Chains polled for on-chain whale transfers.
+    :param min_value: Minimum on-chain transfer value in USD.
+    :param window_ms: Trailing window of the exposure stats.
+    :param bucket_ms: Granularity of the exposure stats.
+    :param max_addresses: Addresses tracked in the exposure stats at most.
+    :param recent_capacity: Events kept for `recent()`.
+    :param dedup_capacity: Event fingerprints remembered.
+    :param lateness_ms: How far behind its newest event a source may still deliver new ones.
+    :param bus: Optional event bus new events are published to.
+    """
+
+    def __init__(self, chains: Sequence[str] = ("BTC", "ETH"), min_value: float = 1000000,
+                 window_ms: int = 86400000, bucket_ms: int = 3600000, max_addresses: int = 50000,
+                 recent_capacity: int = 10000, dedup_capacity: int = 262144, lateness_ms: int = 60000,
+                 bus: Optional[EventBus] = None):
+        self.chains = list(chains)
+        self.min_value = min_value
+        self.lateness_ms = lateness_ms
+        self.bus = bus
+        self.onchain_service = OnchainWhaleTransactionsService()
+        self.alert_service = HyperliquidWhaleAlertService()
+        self.position_service = HyperliquidWhalePositionService()
+        self.positions = SnapshotTracker("hyperliquid.whale_position", ("user", "symbol"))
+        self.seen = FingerprintRing(dedup_capacity)
+        self.watermarks: Dict[str, int] = {}
+        self.recent: Deque[WhaleEvent] = deque(maxlen=recent_capacity)
+        self.by_address = RollingExposure(window_ms, bucket_ms, max_addresses)
+        self.by_symbol = RollingExposure(window_ms, bucket_ms, max_addresses)
+        self.subscribers: List[Callable[[WhaleEvent], None]] = []
+        self.stats = {"refreshes": 0, "events": 0, "duplicates": 0, "skipped": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _poll_feed(self, name: str, fetch: Callable[[], Dict[str, Any]], time_field: str,
+                   normalize: Callable[[Dict[str, Any]], WhaleEvent]) -> List[WhaleEvent]:
+        records = extract_records(fetch(), name)
+        cutoff = self.watermarks.get(name, 0) - self.lateness_ms
+        fresh = [r for r in records if _ms(r.get(time_field)) >= cutoff]
+        self.stats["skipped"] += len(records) - len(fresh)
+        return [normalize(r) for r in fresh]
+
+    def _poll_positions(self) -> List[WhaleEvent]:
+        records = extract_records(self.position_service.fetch_data(), "hyperliquid.whale_position")
+        previous = self.positions.index
+        diff = self.positions.update(records)
+        return position_events(previous, diff.added, diff.changed, diff.removed)
+
+    def _jobs(self) -> Dict[str, Callable[[], List[WhaleEvent]]]:
+        jobs: Dict[str, Callable[[], List[WhaleEvent]]] = {
+            "hyperliquid_alert": lambda: self._poll_feed(
+                "hyperliquid_alert", self.alert_service.fetch_data, "create_time", normalize_whale_alert),
+            "hyperliquid_position": self._poll_positions,
+        }
+        for chain in self.chains:
+            jobs[f"onchain.{chain}"] = lambda chain=chain: self._poll_feed(
+                f"onchain.{chain}", lambda: self.onchain_service.fetch_data(chain=chain, min_value=self.min_value),
+                "time", normalize_onchain_transfer)
+        return jobs
+
+    @traced()
+    def refresh(self) -> List[WhaleEvent]:
+        """
+        Poll every source once and process only events not seen before
+
+        :return: The new events in time order
+        """
+        jobs = self._jobs()
+        batches: Dict[str, List[WhaleEvent]] = {}
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = {name: executor.submit(contextvars.copy_context().run, job) for name, job in jobs.items()}
+            for name, future in futures.items():
+                try:
+                    batches[name] = future.result()
+                except Exception:
+                    self.stats["errors"] += 1
+
+        with self._lock:
+            fresh: List[List[WhaleEvent]] = []
+            for name, events in batches.items():
+                new = []
+                for event in events:
+                    if self.seen.add(event.id):
+                        new.append(event)
+                    else:
+                        self.stats["duplicates"] += 1
+                if events:
+                    self.watermarks[name] = max(self.watermarks.get(name, 0), max(e.time for e in events))
+                new.sort()
+                fresh.append(new)
+            merged = list(heapq.merge(*fresh))
+            for event in merged:
+                self.recent.append(event)
+                self.by_address.add(event.address, event.time, event.value_usd, event.net_usd)
+                if event.counterparty:
+                    self.by_address.add(event.counterparty, event.time, event.value_usd, -event.net_usd)
+                # An on-chain transfer moves coins between holders without changing net exposure
+                self.by_symbol.add(event.symbol, event.time, event.value_usd,
+                                   0.0 if event.kind == "transfer" else event.net_usd)
+            self.stats["refreshes"] += 1
+            self.stats["events"] += len(merged)
+
+        for event in merged:
+            if self.bus is not None:
+                self.bus.publish(f"whale.{event.source}", event)
+            for callback in list(self.subscribers):
+                callback(event)
+        return merged
+
+    def subscribe(self, callback: Callable[[WhaleEvent], None]) -> None:
+        self.subscribers.append(callback)
+
+    def get_recent(self, limit: int = 100, symbol: Optional[str] = None, source: Optional[str] = None,
+                   min_usd: float = 0.0) -> List[Dict[str, Any]]:
+        """Newest events first, optionally filtered"""
+        with self._lock:
+            events = list(self.recent)
+        matched = (e for e in reversed(events)
+                   if (symbol is None or e.symbol == symbol) and (source is None or e.source == source)
+                   and e.value_usd >= min_usd)
+        return [e.to_dict() for _, e in zip(range(limit), matched)]
+
+    def get_address_exposure(self, address: str) -> Dict[str, float]:
+        """Rolling gross and net USD moved by one address"""
+        with self._lock:
+            return self.by_address.get(address)
+
+    def get_symbol_exposure(self, symbol: str) -> Dict[str, float]:
+        """Rolling gross and net (long-biased) USD of whale activity in one symbol"""
+        with self._lock:
+            return self.by_symbol.get(symbol)
+
+    def top_addresses(self, n: int = 10, by: str = "gross_usd") -> List[Dict[str, Any]]:
+        """Most active addresses in the window; `by` is 'gross_usd', 'net_usd', 'abs_net_usd' or 'events'"""
+        with self._lock:
+            return self.by_address.top(n, by)
+
+    def top_symbols(self, n: int = 10, by: str = "gross_usd") -> List[Dict[str, Any]]:
+        """Symbols with the most whale activity in the window"""
+        with self._lock:
+            return self.by_symbol.top(n, by)
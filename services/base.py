@@ -1,10 +1,17 @@
+import json
+import operator
 import os
-import requests
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 from dotenv import load_dotenv
 
+from services.cache import ResponseCache
+from services.key_pool import APIKeyPool
+from services.scheduler import Priority, RequestScheduler, current_request_context
+from services.tracing import tracer, traced_fetch
+from services.transport import HTTPTransport, TransportResponse, request_key
+
 load_dotenv()
 BASE_API_KEY = os.getenv('BASE_API_KEY', '')
 
@@ -15,23 +22,138 @@ class CoinglassAPIBase(ABC):
     """
 
     BASE_URL = "https://open-api-v4.coinglass.com/api"
+    # Shared by every service unless replaced here (e.g. with a ReplayTransport) or per instance
+    transport = HTTPTransport()
+    # Set from BASE_API_KEYS when several keys are configured; takes precedence over api_key
+    key_pool: Optional[APIKeyPool] = APIKeyPool.from_env()
+    # When set, requests are queued by priority/workload instead of being sent inline
+    scheduler: Optional[RequestScheduler] = None
+    # Shared response cache with request coalescing; disabled unless set
+    cache: Optional[ResponseCache] = None
+    # Scheduling class of this service's requests; *HistoryService defaults to LOW
+    priority: Priority = Priority.NORMAL
 
-    def __init__(self, api_key: str = BASE_API_KEY):
+    def __init__(self, api_key: Union[str, APIKeyPool] = BASE_API_KEY, transport: Optional[Any] = None,
+                 cache: Optional[ResponseCache] = None):
+        if isinstance(api_key, APIKeyPool):
+            self.key_pool = api_key
+            api_key = ""
         self.api_key = api_key
+        if transport is not None:
+            self.transport = transport
+        if cache is not None:
+            self.cache = cache
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "priority" not in cls.__dict__ and cls.__name__.endswith("HistoryService"):
+            cls.priority = Priority.LOW
+        # Every concrete fetch_data opens a service span when tracing is enabled
+        fetch_data = cls.__dict__.get("fetch_data")
+        if fetch_data is not None and not getattr(fetch_data, "__isabstractmethod__", False):
+            cls.fetch_data = traced_fetch(fetch_data)
 
-    def _get_headers(self) -> Dict[str, str]:
+    def _get_headers(self, api_key: Optional[str] = None) -> Dict[str, str]:
         return {
             "accept": "application/json",
-            "CG-API-KEY": self.api_key,
+            "CG-API-KEY": api_key if api_key is not None else self.api_key,
         }
 
-    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        url = f"{self.BASE_URL}{endpoint}"
-        response = requests.get(url, headers=self._get_headers(), params=params)
+    @staticmethod
+    def _window_params(start_time: Optional[int] = None, end_time: Optional[int] = None,
+                       limit: Optional[int] = None) -> Dict[str, int]:
+        """Optional time window of history endpoints (timestamps in ms); unset bounds are left out"""
+        window = {"start_time": start_time, "end_time": end_time, "limit": limit}
+        return {name: value for name, value in window.items() if value is not None}
 
+    @staticmethod
+    def _body_code(response: TransportResponse) -> Optional[str]:
+        """`code` of a JSON response body, None for other bodies"""
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        code = body.get("code") if isinstance(body, dict) else None
+        return None if code is None else str(code)
+
+    def _send(self, url: str, params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        pool = self.key_pool
+        if pool is None:
+            response = self.transport.send(url, self._get_headers(), params)
+        else:
+            pooled = pool.acquire()
+            try:
+                response = self.transport.send(url, self._get_headers(pooled.key), params)
+            except Exception as e:
+                pool.release(pooled, error=e)
+                raise
+            retry_after = response.headers.get("Retry-After") or response.headers.get("retry-after")
+            pool.release(pooled, response.status_code,
+                         retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+                         api_code=self._body_code(response))
         if response.status_code != 200:
             response.raise_for_status()
-        return response.json()
+        return response
+
+    def _dispatch(self, url: str, params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        scheduler = self.scheduler
+        if scheduler is None:
+            return self._send(url, params)
+        context = current_request_context()
+        return scheduler.run(
+            lambda: self._send(url, params),
+            priority=context.get("priority", self.priority),
+            workload=context.get("workload", type(self).__name__),
+            deadline=context.get("deadline"),
+        )
+
+    def _make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        url = f"{self.BASE_URL}{endpoint}"
+        cache = self.cache
+        if cache is None:
+            return self._fetch(url, endpoint, params)[0]
+
+        # The cache keeps the raw body, so every caller decodes (and owns) its own copy
+        fetched = []
+
+        def fetch():
+            result, content = self._fetch(url, endpoint, params)
+            fetched.append(result)
+            return content, isinstance(result, dict) and result.get("code") == "0"
+
+        (content, _), status = cache.get_or_fetch(
+            request_key(endpoint, params), fetch, cache.ttl_for(endpoint), cacheable=operator.itemgetter(1),
+        )
+        if status != "miss" and tracer.enabled:
+            service_span = tracer.current_service_span()
+            service_span.set_attribute("endpoint", endpoint)
+            service_span.set_attribute("cache", status)
+        return fetched[0] if fetched else json.loads(content)
+
+    def _fetch(self, url: str, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Any, bytes]:
+        """Send a request and return its decoded body together with the raw body"""
+        if not tracer.enabled:
+            response = self._dispatch(url, params)
+            return response.json(), response.content
+
+        service_span = tracer.current_service_span()
+        service_span.set_attribute("endpoint", endpoint)
+        span = tracer.start_span("HTTP GET", endpoint=endpoint)
+        try:
+            response = self._dispatch(url, params)
+            result = response.json()
+        except BaseException as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            if status_code is not None:
+                span.set_attribute("http.status_code", status_code)
+            tracer.finish_span(span, e)
+            raise
+        span.set_attribute("http.status_code", response.status_code)
+        span.set_attribute("payload_bytes", len(response.content))
+        service_span.set_attribute("cache", "replay" if response.source == "replay" else "miss")
+        service_span.set_attribute("payload_bytes", len(response.content))
+        tracer.finish_span(span)
+        return result, response.content
 
     @abstractmethod
     def fetch_data(self, **kwargs) -> Any:
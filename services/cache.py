@@ -0,0 +1,135 @@
+"""Shared TTL response cache with request coalescing"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+# Freshness per endpoint prefix, in seconds; the longest matching prefix wins
+DEFAULT_TTLS: Dict[str, float] = {
+    "/futures/liquidation/order": 2,
+    "/hyperliquid/whale-alert": 2,
+    "/hyperliquid/whale-position": 10,
+    "/futures/orderbook/large-limit-order": 5,
+    "/futures/coins-markets": 15,
+    "/futures/pairs-markets": 15,
+    "/futures/coins-price-change": 15,
+    "/futures/funding-rate/exchange-list": 30,
+    "/futures/supported-coins": 3600,
+    "/futures/supported-exchange-pairs": 3600,
+    "/futures/liquidation/coin-list": 60,
+    "/futures/liquidation/exchange-list": 60,
+    "/index/": 900,
+    "/etf/": 900,
+    "/hk-etf/": 900,
+    "/grayscale/": 900,
+}
+
+
+class ResponseCache:
+    """
+    LRU cache of parsed responses with per-endpoint TTLs.
+
+    `get_or_fetch` coalesces concurrent misses for the same key: the first caller
+    fetches, everyone else waiting on the same key receives its result, so N identical
+    simultaneous requests cost a single upstream call.
+
+    :param max_entries: LRU bound on cached responses.
+    :param default_ttl: Freshness for endpoints without a matching prefix in `ttls`.
+    :param ttls: Endpoint prefix -> TTL overrides (merged over `DEFAULT_TTLS`).
+    """
+
+    def __init__(self, max_entries: int = 4096, default_ttl: float = 30.0, ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self._prefixes = sorted(self.ttls, key=len, reverse=True)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def ttl_for(self, endpoint: str) -> float:
+        for prefix in self._prefixes:
+            if endpoint.startswith(prefix):
+                return self.ttls[prefix]
+        return self.default_ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: float,
+                     cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, str]:
+        """
+        Return a fresh cached value or fetch it once for all concurrent callers
+
+        :param fetch: Produces the value on a miss.
+        :param ttl: Seconds the fetched value stays fresh.
+        :param cacheable: Predicate deciding whether a fetched value may be stored.
+        :return: (value, status) where status is 'hit', 'miss' or 'coalesced'.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], "hit"
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = self._in_flight[key] = Future()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            return pending.result(), "coalesced"
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            pending.set_exception(e)
+            raise
+        if ttl > 0 and (cacheable is None or cacheable(value)):
+            self.set(key, value, ttl)
+        with self._lock:
+            del self._in_flight[key]
+        pending.set_result(value)
+        return value, "miss"
+
+    def invalidate(self, prefix: Optional[str] = None) -> int:
+        """Drop every entry (or those whose key starts with `prefix`); returns the number dropped"""
+        with self._lock:
+            if prefix is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            keys = [k for k in self._entries if isinstance(k, str) and k.startswith(prefix)]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
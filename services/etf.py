@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
 
 
@@ -22,25 +22,31 @@ class BitcoinETFListService(ETFBaseService):
 class BitcoinETFNetAssetsHistoryService(ETFBaseService):
     """Service for fetching historical net assets for Bitcoin ETFs"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/bitcoin/net-assets/history"
-        return self._make_request_with_prefix(endpoint_suffix)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request_with_prefix(endpoint_suffix, params or None)
 
 
 class BitcoinETFFlowHistoryService(ETFBaseService):
     """Service for fetching historical flows for Bitcoin ETFs"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/bitcoin/flow-history"
-        return self._make_request_with_prefix(endpoint_suffix)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request_with_prefix(endpoint_suffix, params or None)
 
 
 class BitcoinETFPremiumDiscountHistoryService(ETFBaseService):
     """Service for fetching premium/discount history for Bitcoin ETFs"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/bitcoin/premium-discount/history"
-        return self._make_request_with_prefix(endpoint_suffix)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request_with_prefix(endpoint_suffix, params or None)
 
 
 class BitcoinETFHistoryService(ETFBaseService):
@@ -86,25 +92,31 @@ class EthereumETFListService(ETFBaseService):
 class EthereumETFNetAssetsHistoryService(ETFBaseService):
     """Service for fetching historical net assets for Ethereum ETFs"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/ethereum/net-assets/history"
-        return self._make_request_with_prefix(endpoint_suffix)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request_with_prefix(endpoint_suffix, params or None)
 
 
 class EthereumETFFlowHistoryService(ETFBaseService):
     """Service for fetching historical flows for Ethereum ETFs"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/ethereum/flow-history"
-        return self._make_request_with_prefix(endpoint_suffix)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request_with_prefix(endpoint_suffix, params or None)
 
 
 class HKBitcoinETFFlowHistoryService(CoinglassAPIBase):
     """Service for fetching Hong Kong Bitcoin ETF flow history"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/hk-etf/bitcoin/flow-history"
-        return self._make_request(endpoint)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request(endpoint, params or None)
 
 
 class GrayscaleHoldingsListService(CoinglassAPIBase):
@@ -118,18 +130,21 @@ class GrayscaleHoldingsListService(CoinglassAPIBase):
 class GrayscalePremiumHistoryService(CoinglassAPIBase):
     """Service for fetching Grayscale premium/discount history"""
     
-    def fetch_data(self, symbol: str = None) -> Dict[str, Any]:
+    def fetch_data(self, symbol: str = None, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/grayscale/premium/history"
-        params = {"symbol": symbol} if symbol else None
-        return self._make_request(endpoint, params)
+        params = {**({"symbol": symbol} if symbol else {}), **self._window_params(start_time, end_time, limit)}
+        return self._make_request(endpoint, params or None)
 
 
 class EthereumETFPremiumDiscountHistoryService(ETFBaseService):
     """Service for fetching premium/discount history for Ethereum ETFs"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/ethereum/premium-discount/history"
-        return self._make_request_with_prefix(endpoint_suffix)
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request_with_prefix(endpoint_suffix, params or None)
 
 
 class EthereumETFHistoryService(ETFBaseService):
@@ -167,6 +182,8 @@ class EthereumETFAUMService(ETFBaseService):
 class HKEthereumETFFlowHistoryService(CoinglassAPIBase):
     """Service for fetching Hong Kong Ethereum ETF flow history"""
     
-    def fetch_data(self) -> Dict[str, Any]:
+    def fetch_data(self, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/hk-etf/ethereum/flow-history"
-        return self._make_request(endpoint)
\ No newline at end of file
+        params = self._window_params(start_time, end_time, limit)
+        return self._make_request(endpoint, params or None)
\ No newline at end of file
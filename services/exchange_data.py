@@ -1,5 +1,6 @@
 from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
+from services.scheduler import Priority
 
 
 class ExchangeDataBaseService(CoinglassAPIBase):
@@ -41,11 +42,18 @@ class ExchangeBalanceChartService(ExchangeDataBaseService):
 class ExchangeChainTxListService(ExchangeDataBaseService):
     """Service for fetching on-chain transfer records for an exchange"""
     
-    def fetch_data(self, exchange: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+    def fetch_data(self, exchange: str, symbol: Optional[str] = None, start_time: Optional[int] = None,
+                   page: Optional[int] = None, per_page: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/chain/tx/list"
         params = {"exchange": exchange}
         if symbol:
             params["symbol"] = symbol
+        if start_time is not None:
+            params["start_time"] = start_time
+        if page is not None:
+            params["page"] = page
+        if per_page is not None:
+            params["per_page"] = per_page
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
@@ -109,6 +117,7 @@ class CalendarEconomicDataService(CoinglassAPIBase):
 
 class HyperliquidWhaleAlertService(CoinglassAPIBase):
     """Service for fetching Hyperliquid whale alerts"""
+    priority = Priority.HIGH
     
     def fetch_data(self) -> Dict[str, Any]:
         endpoint = "/hyperliquid/whale-alert"
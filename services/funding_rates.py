@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
 
 
@@ -11,9 +11,10 @@ class FundingRateBaseService(CoinglassAPIBase):
 
 
 class OHLCHistoryService(FundingRateBaseService):
-    def fetch_data(self, symbol: str, interval: str = "1d", exchange: str = "Binance") -> dict:
+    def fetch_data(self, symbol: str, interval: str = "1d", exchange: str = "Binance", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> dict:
         endpoint_suffix = "/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
@@ -32,14 +33,16 @@ class VolWeightOHLCHistoryService(FundingRateBaseService):
 
 
 class ExchangeListService(FundingRateBaseService):
-    def fetch_data(self, symbol: str, interval: str = "1d", exchange: str = "Binance") -> dict:
+    def fetch_data(self, symbol: Optional[str] = None, interval: str = "1d", exchange: str = "Binance") -> dict:
         endpoint_suffix = "/exchange-list"
-        params = {"symbol": symbol}
+        # Without a symbol the endpoint returns every coin in one response
+        params = {"symbol": symbol} if symbol else {}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
 class CumulativeExchangeListService(FundingRateBaseService):
-    def fetch_data(self, symbol: str, interval: str = "1d", exchange: str = "Binance") -> dict:
+    def fetch_data(self, symbol: Optional[str] = None, interval: str = "1d", exchange: str = "Binance") -> dict:
         endpoint_suffix = "/accumulated-exchange-list"
-        params = {"symbol": symbol}
+        # Without a symbol the endpoint returns every coin in one response
+        params = {"symbol": symbol} if symbol else {}
         return self._make_request_with_prefix(endpoint_suffix, params)
@@ -5,7 +5,16 @@ from typing import Dict, Any, Optional
 from .base import CoinglassAPIBase
 
 
-class HyperliquidMarketDataService(CoinglassAPIBase):
+class HyperliquidBaseService(CoinglassAPIBase):
+    """Base service for Hyperliquid endpoints"""
+    _endpoint_prefix = "/hyperliquid"
+
+    def _make_request_with_prefix(self, endpoint_suffix: str, params: Optional[Dict] = None) -> Dict:
+        endpoint = f"{self._endpoint_prefix}{endpoint_suffix}"
+        return self._make_request(endpoint, params)
+
+
+class HyperliquidMarketDataService(HyperliquidBaseService):
     """Service for Hyperliquid market data"""
     
     def fetch_data(self, symbol: Optional[str] = None) -> Dict[str, Any]:
@@ -14,14 +23,14 @@ class HyperliquidMarketDataService(CoinglassAPIBase):
         Args:
             symbol: Cryptocurrency symbol (optional)
         """
-        endpoint_suffix = "/hyperliquid/market-data"
+        endpoint_suffix = "/market-data"
         params = {}
         if symbol:
             params["symbol"] = symbol
         return self._make_request_with_prefix(endpoint_suffix, params if params else None)
 
 
-class HyperliquidOpenInterestService(CoinglassAPIBase):
+class HyperliquidOpenInterestService(HyperliquidBaseService):
     """Service for Hyperliquid open interest data"""
     
     def fetch_data(self, symbol: str = "BTC") -> Dict[str, Any]:
@@ -30,12 +39,12 @@ class HyperliquidOpenInterestService(CoinglassAPIBase):
         Args:
             symbol: Cryptocurrency symbol (default: BTC)
         """
-        endpoint_suffix = "/hyperliquid/open-interest"
+        endpoint_suffix = "/open-interest"
         params = {"symbol": symbol}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
-class HyperliquidFundingRatesService(CoinglassAPIBase):
+class HyperliquidFundingRatesService(HyperliquidBaseService):
     """Service for Hyperliquid funding rates"""
     
     def fetch_data(self, symbol: Optional[str] = None) -> Dict[str, Any]:
@@ -44,14 +53,14 @@ class HyperliquidFundingRatesService(CoinglassAPIBase):
         Args:
             symbol: Cryptocurrency symbol (optional)
         """
-        endpoint_suffix = "/hyperliquid/funding-rates"
+        endpoint_suffix = "/funding-rates"
         params = {}
         if symbol:
             params["symbol"] = symbol
         return self._make_request_with_prefix(endpoint_suffix, params if params else None)
 
 
-class HyperliquidLiquidationsService(CoinglassAPIBase):
+class HyperliquidLiquidationsService(HyperliquidBaseService):
     """Service for Hyperliquid liquidations data"""
     
     def fetch_data(self, symbol: Optional[str] = None, timeframe: str = "24h") -> Dict[str, Any]:
@@ -61,14 +70,14 @@ class HyperliquidLiquidationsService(CoinglassAPIBase):
             symbol: Cryptocurrency symbol (optional)
             timeframe: Time frame (default: 24h)
         """
-        endpoint_suffix = "/hyperliquid/liquidations"
+        endpoint_suffix = "/liquidations"
         params = {"timeframe": timeframe}
         if symbol:
             params["symbol"] = symbol
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
-class HyperliquidVolumeService(CoinglassAPIBase):
+class HyperliquidVolumeService(HyperliquidBaseService):
     """Service for Hyperliquid volume data"""
     
     def fetch_data(self, symbol: Optional[str] = None, timeframe: str = "24h") -> Dict[str, Any]:
@@ -78,14 +87,14 @@ class HyperliquidVolumeService(CoinglassAPIBase):
             symbol: Cryptocurrency symbol (optional)
             timeframe: Time frame (default: 24h)
         """
-        endpoint_suffix = "/hyperliquid/volume"
+        endpoint_suffix = "/volume"
         params = {"timeframe": timeframe}
         if symbol:
             params["symbol"] = symbol
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
-class HyperliquidOrderbookService(CoinglassAPIBase):
+class HyperliquidOrderbookService(HyperliquidBaseService):
     """Service for Hyperliquid orderbook data"""
     
     def fetch_data(self, symbol: str = "BTC", depth: int = 20) -> Dict[str, Any]:
@@ -95,12 +104,12 @@ class HyperliquidOrderbookService(CoinglassAPIBase):
             symbol: Cryptocurrency symbol (default: BTC)
             depth: Orderbook depth (default: 20)
         """
-        endpoint_suffix = "/hyperliquid/orderbook"
+        endpoint_suffix = "/orderbook"
         params = {"symbol": symbol, "depth": depth}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
-class HyperliquidTradesService(CoinglassAPIBase):
+class HyperliquidTradesService(HyperliquidBaseService):
     """Service for Hyperliquid recent trades"""
     
     def fetch_data(self, symbol: str = "BTC", limit: int = 100) -> Dict[str, Any]:
@@ -110,6 +119,6 @@ class HyperliquidTradesService(CoinglassAPIBase):
             symbol: Cryptocurrency symbol (default: BTC)
             limit: Number of trades to fetch (default: 100)
         """
-        endpoint_suffix = "/hyperliquid/trades"
+        endpoint_suffix = "/trades"
         params = {"symbol": symbol, "limit": limit}
         return self._make_request_with_prefix(endpoint_suffix, params)
\ No newline at end of file
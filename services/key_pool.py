@@ -0,0 +1,215 @@
+"""API key pool with per-key rate limiting, least-loaded dispatch and automatic quarantine"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+AUTH_ERROR_STATUSES = (401, 403)
+QUOTA_ERROR_STATUSES = (429,)
+# CoinGlass reports most errors as HTTP 200 with the error in the body `code`
+AUTH_ERROR_CODES = ("401", "403")
+QUOTA_ERROR_CODES = ("429",)
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `requests_per_minute` requests with bursts up to `burst`.
+
+    Not thread-safe on its own; `APIKeyPool` serialises access under its lock.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(requests_per_minute)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._refill(now if now is not None else time.monotonic())
+        return self.tokens
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        if self.available(now) >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Seconds until one token is available"""
+        tokens = self.available(now)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+
+class PooledKey:
+    """A single API key together with its limiter and health state"""
+
+    def __init__(self, key: str, requests_per_minute: float, burst: Optional[int] = None):
+        self.key = key
+        self.limiter = RateLimiter(requests_per_minute, burst)
+        self.in_flight = 0
+        self.total_requests = 0
+        self.consecutive_failures = 0
+        self.disabled_until = 0.0
+        self.disabled_reason: Optional[str] = None
+
+    def is_active(self, now: float) -> bool:
+        return now >= self.disabled_until
+
+    @property
+    def masked(self) -> str:
+        return f"{self.key[:4]}…{self.key[-4:]}" if len(self.key) > 8 else "****"
+
+    def __repr__(self) -> str:
+        return f"PooledKey({self.masked}, in_flight={self.in_flight}, total={self.total_requests})"
+
+
+class NoAvailableKeyError(RuntimeError):
+    """Raised when every key in the pool has been taken out of rotation"""
+
+
+class APIKeyPool:
+    """
+    Dispatches requests across several CoinGlass API keys.
+
+    Each key has its own token bucket, so aggregate throughput grows with the number of
+    keys. `acquire` hands out the active key with the fewest in-flight requests that has a
+    token available, blocking until one does. Keys answering with auth errors (HTTP status
+    or body `code`) are disabled until `restore` is called; keys answering with quota
+    errors sit out a cooldown.
+
+    :param keys: API keys to rotate through.
+    :param requests_per_minute: Per-key quota.
+    :param burst: Per-key burst size (defaults to one minute of quota).
+    :param cooldown: Seconds a key is benched after a quota error.
+    :param max_failures: Consecutive server/transport failures before a key is benched.
+    """
+
+    def __init__(self, keys: Iterable[str], requests_per_minute: float = 30, burst: Optional[int] = None,
+                 cooldown: float = 60.0, max_failures: int = 5):
+        self.keys: List[PooledKey] = [PooledKey(k, requests_per_minute, burst) for k in keys if k]
+        if not self.keys:
+            raise ValueError("APIKeyPool needs at least one API key")
+        self.cooldown = cooldown
+        self.max_failures = max_failures
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls, variable: str = "BASE_API_KEYS", **kwargs) -> Optional["APIKeyPool"]:
+        """
+        Build a pool from a comma-separated environment variable
+
+        :return: The pool, or None if the variable is unset or empty.
+        """
+        raw = os.getenv(variable, "")
+        keys = [k.strip() for k in raw.split(",") if k.strip()]
+        if not keys:
+            return None
+        rate = os.getenv("BASE_API_KEY_RATE_LIMIT")
+        if rate and "requests_per_minute" not in kwargs:
+            kwargs["requests_per_minute"] = float(rate)
+        return cls(keys, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _pick(self, now: float) -> Optional[PooledKey]:
+        best = None
+        for pooled in self.keys:
+            if not pooled.is_active(now) or pooled.limiter.available(now) < 1:
+                continue
+            if best is None or (pooled.in_flight, -pooled.limiter.tokens) < (best.in_flight, -best.limiter.tokens):
+                best = pooled
+        return best
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledKey:
+        """
+        Reserve the least-loaded key with quota left
+
+        :param timeout: Max seconds to wait for quota; None waits indefinitely.
+        :raises NoAvailableKeyError: If every key is disabled or the timeout expires.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                pooled = self._pick(now)
+                if pooled is not None:
+                    pooled.limiter.try_acquire(now)
+                    pooled.in_flight += 1
+                    pooled.total_requests += 1
+                    return pooled
+
+                active = [p for p in self.keys if p.is_active(now)]
+                if active:
+                    wait = min(p.limiter.wait_time(now) for p in active)
+                else:
+                    wait = min(p.disabled_until for p in self.keys) - now
+                    if wait == float("inf"):
+                        raise NoAvailableKeyError("All API keys have been taken out of rotation")
+                if deadline is not None:
+                    if now >= deadline:
+                        raise NoAvailableKeyError("Timed out waiting for API key quota")
+                    wait = min(wait, deadline - now)
+                self._condition.wait(max(wait, 0.001))
+
+    def release(self, pooled: PooledKey, status_code: Optional[int] = None, error: Optional[BaseException] = None,
+                retry_after: Optional[float] = None, api_code: Optional[str] = None) -> None:
+        """
+        Return a key after its request finished and update its health
+
+        :param status_code: HTTP status of the response, None if the request failed outright.
+        :param error: Transport exception, if any.
+        :param retry_after: Server-provided backoff for quota errors, in seconds.
+        :param api_code: `code` of the response body, if it has one.
+        """
+        with self._condition:
+            pooled.in_flight = max(0, pooled.in_flight - 1)
+            now = time.monotonic()
+            if status_code in AUTH_ERROR_STATUSES or api_code in AUTH_ERROR_CODES:
+                pooled.disabled_until = float("inf")
+                pooled.disabled_reason = f"auth error ({api_code if api_code in AUTH_ERROR_CODES else status_code})"
+            elif status_code in QUOTA_ERROR_STATUSES or api_code in QUOTA_ERROR_CODES:
+                pooled.disabled_until = now + (retry_after if retry_after else self.cooldown)
+                pooled.disabled_reason = "quota exceeded"
+                pooled.limiter.tokens = 0
+            elif error is not None or (status_code is not None and status_code >= 500):
+                pooled.consecutive_failures += 1
+                if pooled.consecutive_failures >= self.max_failures:
+                    pooled.disabled_until = now + self.cooldown
+                    pooled.disabled_reason = f"{pooled.consecutive_failures} consecutive failures"
+                    pooled.consecutive_failures = 0
+            else:
+                pooled.consecutive_failures = 0
+                pooled.disabled_reason = None
+            self._condition.notify_all()
+
+    def restore(self, key: Optional[str] = None) -> None:
+        """Put a disabled key (or every key) back into rotation"""
+        with self._condition:
+            for pooled in self.keys:
+                if key is None or pooled.key == key:
+                    pooled.disabled_until = 0.0
+                    pooled.disabled_reason = None
+                    pooled.consecutive_failures = 0
+            self._condition.notify_all()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._condition:
+            return [
+                {
+                    "key": p.masked,
+                    "active": p.is_active(now),
+                    "disabled_reason": p.disabled_reason,
+                    "in_flight": p.in_flight,
+                    "total_requests": p.total_requests,
+                    "tokens": round(p.limiter.available(now), 2),
+                }
+                for p in self.keys
+            ]
@@ -1,5 +1,6 @@
 from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
+from services.scheduler import Priority
 
 
 class LiquidationBaseService(CoinglassAPIBase):
@@ -23,9 +24,10 @@ class LiquidationHistoryService(LiquidationBaseService):
 class AggregatedLiquidationHistoryService(LiquidationBaseService):
     """Service for fetching aggregated liquidation history across all exchanges"""
     
-    def fetch_data(self, symbol: str, interval: str = "1h") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, interval: str = "1h", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/aggregated-history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
@@ -47,6 +49,7 @@ class LiquidationExchangeListService(LiquidationBaseService):
 
 class LiquidationOrderService(LiquidationBaseService):
     """Service for fetching recent large liquidation orders"""
+    priority = Priority.HIGH
     
     def fetch_data(self) -> Dict[str, Any]:
         endpoint_suffix = "/order"
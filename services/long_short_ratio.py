@@ -1,41 +1,53 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
 
 
 class GlobalAccountRatioService(CoinglassAPIBase):
-    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/global-long-short-account-ratio/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "exchange": exchange, "interval": interval,
+                  **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
 
 class TopAccountRatioHistoryService(CoinglassAPIBase):
-    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/top-long-short-account-ratio/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "exchange": exchange, "interval": interval,
+                  **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
 
 class TopPositionRatioHistoryService(CoinglassAPIBase):
-    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/top-long-short-position-ratio/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "exchange": exchange, "interval": interval,
+                  **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
 
 class AggregatedTakerBuySellHistoryService(CoinglassAPIBase):
-    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/aggregated-taker-buy-sell-volume/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "exchange_list": exchange, "interval": interval,
+                  **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
-    
+
 class AggregatedTakerBuySellVolumeHistoryService(CoinglassAPIBase):
-    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/aggregated-taker-buy-sell-volume/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "exchange_list": exchange, "interval": interval,
+                  **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
 
 class TakerBuySellRatioHistoryService(CoinglassAPIBase):
-    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, exchange: str = "Binance", interval: str = "1d", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/taker-buy-sell-volume/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "exchange": exchange, "interval": interval,
+                  **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
 
 class ExchangeTakerBuySellRatioHistoryService(CoinglassAPIBase):
@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
 
 
@@ -14,36 +14,40 @@ class OpenInterestBaseService(CoinglassAPIBase):
 class OpenInterestHistoryService(OpenInterestBaseService):
     """Service for fetching open interest history for a specific trading pair"""
     
-    def fetch_data(self, symbol: str, interval: str = "4h") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, interval: str = "4h", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
 class AggregatedOpenInterestHistoryService(OpenInterestBaseService):
     """Service for fetching aggregated open interest history across all exchanges"""
     
-    def fetch_data(self, symbol: str, interval: str = "4h") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, interval: str = "4h", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/aggregated-history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
 class StablecoinMarginOpenInterestHistoryService(OpenInterestBaseService):
     """Service for fetching stablecoin-margined futures open interest history"""
     
-    def fetch_data(self, symbol: str, interval: str = "4h") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, interval: str = "4h", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/aggregated-stablecoin-margin-history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
 class CoinMarginOpenInterestHistoryService(OpenInterestBaseService):
     """Service for fetching coin-margined futures open interest history"""
     
-    def fetch_data(self, symbol: str, interval: str = "4h") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, interval: str = "4h", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint_suffix = "/aggregated-coin-margin-history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request_with_prefix(endpoint_suffix, params)
 
 
@@ -59,7 +63,11 @@ class OpenInterestExchangeListService(OpenInterestBaseService):
 class OpenInterestExchangeHistoryChartService(OpenInterestBaseService):
     """Service for fetching historical open interest distribution across exchanges"""
     
-    def fetch_data(self, symbol: str) -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, range: Optional[str] = None, unit: Optional[str] = None) -> Dict[str, Any]:
         endpoint_suffix = "/exchange-history-chart"
         params = {"symbol": symbol}
+        if range:
+            params["range"] = range
+        if unit:
+            params["unit"] = unit
         return self._make_request_with_prefix(endpoint_suffix, params)
\ No newline at end of file
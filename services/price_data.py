@@ -1,11 +1,12 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from services.base import CoinglassAPIBase
 
 
 class PriceHistoryService(CoinglassAPIBase):
     """Service for fetching historical OHLC price data"""
     
-    def fetch_data(self, symbol: str, interval: str = "1h") -> Dict[str, Any]:
+    def fetch_data(self, symbol: str, interval: str = "1h", start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
         endpoint = "/futures/price/history"
-        params = {"symbol": symbol, "interval": interval}
+        params = {"symbol": symbol, "interval": interval, **self._window_params(start_time, end_time, limit)}
         return self._make_request(endpoint, params)
\ No newline at end of file
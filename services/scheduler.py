@@ -0,0 +1,195 @@
+"""Priority-aware request scheduler with deadlines and fair queuing between workloads"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request could not be started or finished before its deadline"""
+
+
+_request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("coinglass_request_context", default=None)
+
+
+class request_context:
+    """
+    Override priority, workload and deadline for every request issued inside the block
+
+        with request_context(priority=Priority.LOW, workload="backfill"):
+            service.fetch_data(symbol="BTC", interval="1m")
+    """
+
+    def __init__(self, priority: Optional[Priority] = None, workload: Optional[str] = None,
+                 deadline: Optional[float] = None):
+        self.overrides = {k: v for k, v in
+                          (("priority", priority), ("workload", workload), ("deadline", deadline)) if v is not None}
+        self._token = None
+
+    def __enter__(self) -> "request_context":
+        merged = dict(_request_context.get() or {})
+        merged.update(self.overrides)
+        self._token = _request_context.set(merged)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _request_context.reset(self._token)
+
+
+def current_request_context() -> Dict[str, Any]:
+    return _request_context.get() or {}
+
+
+class _Job:
+    __slots__ = ("func", "priority", "workload", "deadline", "future", "enqueued", "sequence")
+
+    def __init__(self, func: Callable[[], Any], priority: Priority, workload: str, deadline: Optional[float],
+                 sequence: int):
+        self.func = func
+        self.priority = priority
+        self.workload = workload
+        self.deadline = deadline
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+        self.sequence = sequence
+
+
+class RequestScheduler:
+    """
+    Runs request callables on a fixed pool of worker threads.
+
+    Jobs are queued per priority class and, inside a class, per workload. Workers always
+    serve the highest non-empty priority class and rotate round-robin between its
+    workloads, so a burst from one backfill cannot starve another workload of the same
+    class, and any HIGH job jumps ahead of all queued LOW work. `reserved_workers` threads
+    only ever serve HIGH/CRITICAL jobs so alerts never wait behind in-flight backfills.
+    Jobs whose deadline passes while queued are failed with `DeadlineExceeded`.
+
+    :param max_concurrency: Total worker threads (i.e. max in-flight upstream requests).
+    :param reserved_workers: Workers dedicated to HIGH and CRITICAL jobs.
+    :param default_deadline: Deadline in seconds applied when a job does not set one.
+    """
+
+    def __init__(self, max_concurrency: int = 4, reserved_workers: int = 1, default_deadline: Optional[float] = None):
+        if reserved_workers >= max_concurrency:
+            raise ValueError("reserved_workers must be smaller than max_concurrency")
+        self.default_deadline = default_deadline
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[_Job]]"] = {p: OrderedDict() for p in Priority}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._closed = False
+        self.completed = 0
+        self.expired = 0
+        self._workers: List[threading.Thread] = []
+        for index in range(max_concurrency):
+            min_priority = Priority.HIGH if index < reserved_workers else Priority.LOW
+            worker = threading.Thread(target=self._work, args=(min_priority,), daemon=True,
+                                      name=f"coinglass-scheduler-{index}")
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, func: Callable[[], Any], priority: Priority = Priority.NORMAL, workload: str = "default",
+               deadline: Optional[float] = None) -> Future:
+        """
+        Queue a callable
+
+        :param priority: Priority class of the job.
+        :param workload: Fair-queuing bucket; jobs of one priority are interleaved across workloads.
+        :param deadline: Seconds from now after which the job is dropped if it has not started.
+        :return: Future resolved with the callable's result or exception.
+        """
+        deadline = deadline if deadline is not None else self.default_deadline
+        job = _Job(func, Priority(priority), workload, time.monotonic() + deadline if deadline else None,
+                   next(self._sequence))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("RequestScheduler has been shut down")
+            self._queues[job.priority].setdefault(workload, deque()).append(job)
+            self._condition.notify_all()
+        return job.future
+
+    def run(self, func: Callable[[], Any], priority: Priority = Priority.NORMAL, workload: str = "default",
+            deadline: Optional[float] = None) -> Any:
+        """Submit a callable and wait for its result, honouring the deadline while waiting"""
+        deadline = deadline if deadline is not None else self.default_deadline
+        future = self.submit(func, priority, workload, deadline)
+        try:
+            return future.result(timeout=deadline)
+        except DeadlineExceeded:
+            raise
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"Request in workload '{workload}' exceeded its {deadline}s deadline") from None
+
+    def _next_job(self, min_priority: Priority) -> Optional[_Job]:
+        now = time.monotonic()
+        for priority in Priority:
+            if priority > min_priority:
+                break
+            workloads = self._queues[priority]
+            while workloads:
+                workload, jobs = next(iter(workloads.items()))
+                job = jobs.popleft()
+                if jobs:
+                    workloads.move_to_end(workload)
+                else:
+                    del workloads[workload]
+                if job.future.cancelled():
+                    continue
+                if job.deadline is not None and now > job.deadline:
+                    self.expired += 1
+                    job.future.set_exception(DeadlineExceeded(
+                        f"Request in workload '{job.workload}' expired after {now - job.enqueued:.3f}s in queue"))
+                    continue
+                return job
+        return None
+
+    def _work(self, min_priority: Priority) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job(min_priority)
+                while job is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    job = self._next_job(min_priority)
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = job.func()
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            with self._condition:
+                self.completed += 1
+
+    def queued(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth per priority class and workload"""
+        with self._condition:
+            return {
+                priority.name: {workload: len(jobs) for workload, jobs in workloads.items()}
+                for priority, workloads in self._queues.items() if workloads
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs; workers exit once the queues are drained"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
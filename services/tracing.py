@@ -0,0 +1,322 @@
+"""Lightweight tracing hooks spanning manager -> service -> HTTP call"""
+
+import functools
+import inspect
+import itertools
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+
+_span_ids = itertools.count(1)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("coinglass_current_span", default=None)
+
+# Call arguments copied onto spans when a traced function receives them
+TAGGED_ARGUMENTS = ("symbol", "interval", "exchange")
+
+
+class Span:
+    """A single timed unit of work (manager call, service fetch or HTTP request)"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "start_time", "end_time",
+                 "attributes", "error", "kind", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else random.getrandbits(64)
+        self.span_id = next(_span_ids)
+        self.start_time = time.perf_counter()
+        self.end_time: Optional[float] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        # "service" on spans opened by `traced_fetch`, None otherwise
+        self.kind: Optional[str] = None
+        self._token = None
+
+    @property
+    def parent_id(self) -> Optional[int]:
+        return self.parent.span_id if self.parent else None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Span duration in seconds, None while the span is still open"""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration": self.duration,
+            "attributes": dict(self.attributes),
+            "error": self.error,
+        }
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+
+class _NoopSpan:
+    """Shared span returned while tracing is disabled; every operation is a no-op"""
+
+    __slots__ = ()
+
+    name = None
+    attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Registry of start/finish hooks.
+
+    Tracing is disabled while no hook or exporter is registered: `start_span` then
+    returns the shared no-op span without allocating anything.
+    """
+
+    def __init__(self):
+        self._start_hooks: List[Callable[[Span], None]] = []
+        self._finish_hooks: List[Callable[[Span], None]] = []
+        self.enabled = False
+
+    def add_hooks(self, on_start: Optional[Callable[[Span], None]] = None,
+                  on_finish: Optional[Callable[[Span], None]] = None) -> None:
+        """
+        Register callbacks invoked when a span starts and when it finishes
+
+        :param on_start: Called with the span right after it is opened.
+        :param on_finish: Called with the span once its duration and error are known.
+        """
+        if on_start is not None:
+            self._start_hooks.append(on_start)
+        if on_finish is not None:
+            self._finish_hooks.append(on_finish)
+        self.enabled = bool(self._start_hooks or self._finish_hooks)
+
+    def remove_hooks(self, on_start: Optional[Callable[[Span], None]] = None,
+                     on_finish: Optional[Callable[[Span], None]] = None) -> None:
+        if on_start in self._start_hooks:
+            self._start_hooks.remove(on_start)
+        if on_finish in self._finish_hooks:
+            self._finish_hooks.remove(on_finish)
+        self.enabled = bool(self._start_hooks or self._finish_hooks)
+
+    def add_exporter(self, exporter: Any) -> None:
+        """Register an object exposing `on_start(span)` and `on_finish(span)`"""
+        self.add_hooks(exporter.on_start, exporter.on_finish)
+
+    def remove_exporter(self, exporter: Any) -> None:
+        self.remove_hooks(exporter.on_start, exporter.on_finish)
+
+    def clear(self) -> None:
+        self._start_hooks.clear()
+        self._finish_hooks.clear()
+        self.enabled = False
+
+    def start_span(self, name: str, **attributes) -> Any:
+        """
+        Open a span as a child of the current span and make it current
+
+        :param name: Span name (e.g. 'MarketDataManager.get_coin_analysis').
+        :return: The new span, or the shared no-op span when tracing is disabled.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        span = Span(name, _current_span.get(), attributes)
+        span._token = _current_span.set(span)
+        for hook in self._start_hooks:
+            hook(span)
+        return span
+
+    def finish_span(self, span: Any, error: Optional[BaseException] = None) -> None:
+        """Close a span opened with `start_span` and restore its parent as current"""
+        if span is NOOP_SPAN:
+            return
+        span.end_time = time.perf_counter()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        if span._token is not None:
+            try:
+                _current_span.reset(span._token)
+            except ValueError:
+                # Finished from another context; fall back to re-parenting
+                _current_span.set(span.parent)
+            span._token = None
+        for hook in self._finish_hooks:
+            hook(span)
+
+    def current_span(self) -> Any:
+        """Return the innermost open span, or the no-op span"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return _current_span.get() or NOOP_SPAN
+
+    def current_service_span(self) -> Any:
+        """Return the current span if `traced_fetch` opened it, otherwise the no-op span"""
+        if not self.enabled:
+            return NOOP_SPAN
+        span = _current_span.get()
+        return span if span is not None and span.kind == "service" else NOOP_SPAN
+
+    def span(self, name: str, **attributes) -> "_SpanContext":
+        """Context manager form of `start_span`/`finish_span`"""
+        return _SpanContext(self, name, attributes)
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "name", "attributes", "span")
+
+    def __init__(self, tracer: Tracer, name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span = NOOP_SPAN
+
+    def __enter__(self):
+        self.span = self.tracer.start_span(self.name, **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.finish_span(self.span, exc)
+        return False
+
+
+tracer = Tracer()
+
+
+def _tagged_arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    try:
+        bound = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return {}
+    return {name: bound[name] for name in TAGGED_ARGUMENTS if bound.get(name) is not None}
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator opening a span around a function or method
+
+    The span is named after the function's qualified name unless `name` is given and is
+    tagged with any `symbol`, `interval` or `exchange` argument the call receives.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            span = tracer.start_span(span_name, **_tagged_arguments(signature, args, kwargs))
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                tracer.finish_span(span, e)
+                raise
+            tracer.finish_span(span)
+            return result
+
+        wrapper.__traced__ = True
+        return wrapper
+
+    return decorator
+
+
+def traced_fetch(func: Callable) -> Callable:
+    """Wrap a service `fetch_data` so each call opens a span named '<Service>.fetch_data'"""
+    if getattr(func, "__traced__", False):
+        return func
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not tracer.enabled:
+            return func(self, *args, **kwargs)
+        span = tracer.start_span(f"{type(self).__name__}.fetch_data",
+                                 **_tagged_arguments(signature, (self,) + args, kwargs))
+        span.kind = "service"
+        try:
+            result = func(self, *args, **kwargs)
+        except BaseException as e:
+            tracer.finish_span(span, e)
+            raise
+        tracer.finish_span(span)
+        return result
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+class SpanRecorder:
+    """Exporter keeping finished spans in memory, handy for ad-hoc profiling"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_finish(self, span: Span) -> None:
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+
+    def slowest(self, top_n: int = 10) -> List[Span]:
+        return sorted(self.spans, key=lambda s: s.duration or 0, reverse=True)[:top_n]
+
+    def children_of(self, span: Span) -> List[Span]:
+        return [s for s in self.spans if s.parent_id == span.span_id]
+
+
+class OpenTelemetryExporter:
+    """
+    Exporter mirroring spans into an OpenTelemetry tracer.
+
+    Requires the optional `opentelemetry-api` package; the SDK/exporter pipeline is
+    configured by the application as usual.
+    """
+
+    def __init__(self, otel_tracer: Any = None, instrumentation_name: str = "coinglass"):
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetryExporter requires the 'opentelemetry-api' package") from e
+        self._otel_trace = otel_trace
+        self._tracer = otel_tracer or otel_trace.get_tracer(instrumentation_name)
+        self._open: Dict[int, Any] = {}
+        # perf_counter -> epoch nanoseconds offset for OpenTelemetry timestamps
+        self._clock_offset = time.time_ns() - int(time.perf_counter() * 1e9)
+
+    def _to_ns(self, timestamp: float) -> int:
+        return int(timestamp * 1e9) + self._clock_offset
+
+    def on_start(self, span: Span) -> None:
+        parent = self._open.get(span.parent_id) if span.parent_id else None
+        context = self._otel_trace.set_span_in_context(parent) if parent is not None else None
+        self._open[span.span_id] = self._tracer.start_span(
+            span.name, context=context, start_time=self._to_ns(span.start_time)
+        )
+
+    def on_finish(self, span: Span) -> None:
+        otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if span.error:
+            otel_span.set_status(self._otel_trace.Status(self._otel_trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=self._to_ns(span.end_time))
@@ -0,0 +1,187 @@
+"""Pluggable HTTP transports for CoinglassAPIBase: live, recording and replay"""
+
+import gzip
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+
+class TransportResponse:
+    """Minimal response object shared by all transports"""
+
+    __slots__ = ("url", "status_code", "headers", "content", "elapsed", "source", "_json")
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes,
+                 elapsed: float, source: str = "network"):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+        self.source = source
+        self._json = None
+
+    def json(self) -> Any:
+        # Decoded once: the key pool reads the body code before the service reads the data
+        if self._json is None:
+            self._json = json.loads(self.content)
+        return self._json
+
+    def raise_for_status(self) -> None:
+        if 400 <= self.status_code < 600:
+            kind = "Client" if self.status_code < 500 else "Server"
+            raise requests.HTTPError(f"{self.status_code} {kind} Error for url: {self.url}", response=self)
+
+
+class HTTPTransport:
+    """Live transport backed by a pooled `requests.Session`"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        # One session per thread keeps connection pooling without sharing a Session across threads
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def send(self, url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        start = time.perf_counter()
+        response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+        return TransportResponse(response.url, response.status_code, dict(response.headers),
+                                 response.content, time.perf_counter() - start)
+
+
+# Response headers worth keeping in recordings; the rest only bloats the archive
+RECORDED_HEADERS = ("content-type", "date", "api-key-max-limit", "api-key-use-limit")
+ARCHIVE_FORMAT = "coinglass-replay"
+ARCHIVE_VERSION = 1
+
+
+def request_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Host-independent key for a request: the path after `/api` plus sorted parameters"""
+    path = urlsplit(url).path
+    if path.startswith("/api/"):
+        path = path[4:]
+    if not params:
+        return path
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    return f"{path}?{query}" if query else path
+
+
+class RecordingTransport:
+    """
+    Transport that forwards to an inner transport and records every exchange.
+
+    The archive is a gzip-compressed JSON-lines file: a header line followed by one
+    entry per response with its key, status, selected headers, body, latency and offset
+    from the start of the recording. Call `save()` (or use as a context manager) to write it.
+    """
+
+    def __init__(self, path: str, inner: Optional[Any] = None):
+        self.path = path
+        self.inner = inner or HTTPTransport()
+        self.entries: List[Dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def send(self, url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        offset = time.monotonic() - self._started
+        response = self.inner.send(url, headers, params)
+        entry = {
+            "key": request_key(url, params),
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in RECORDED_HEADERS},
+            "body": response.content.decode("utf-8", errors="replace"),
+            "elapsed": round(response.elapsed, 6),
+            "offset": round(offset, 6),
+        }
+        with self._lock:
+            self.entries.append(entry)
+        return response
+
+    def save(self) -> None:
+        with self._lock:
+            entries = list(self.entries)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION,
+                                "recorded_at": time.time(), "entries": len(entries)}) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def __enter__(self) -> "RecordingTransport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.save()
+
+
+class ReplayMissError(LookupError):
+    """Raised when a replayed request has no recorded response"""
+
+
+class ReplayTransport:
+    """
+    Transport serving responses from a recording made by `RecordingTransport`.
+
+    Responses recorded for the same key are served in recording order; once exhausted
+    the last one keeps being served (or `ReplayMissError` is raised when `loop=False`).
+
+    :param path: Archive written by `RecordingTransport.save()`.
+    :param honor_timing: Sleep for the recorded latency before returning each response.
+    :param speed: Divides recorded latencies when `honor_timing` is set (2.0 = twice as fast).
+    :param loop: Keep serving the last response for a key once its sequence is exhausted.
+    """
+
+    def __init__(self, path: str, honor_timing: bool = False, speed: float = 1.0, loop: bool = True):
+        self.path = path
+        self.honor_timing = honor_timing
+        self.speed = speed
+        self.loop = loop
+        self._responses: Dict[str, List[Tuple[int, Dict[str, str], bytes, float]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != ARCHIVE_FORMAT:
+                raise ValueError(f"{self.path} is not a replay archive")
+            for line in f:
+                entry = json.loads(line)
+                self._responses.setdefault(entry["key"], []).append(
+                    (entry["status"], entry["headers"], entry["body"].encode("utf-8"), entry["elapsed"])
+                )
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._responses)
+
+    def rewind(self) -> None:
+        with self._lock:
+            self._cursors.clear()
+
+    def send(self, url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> TransportResponse:
+        key = request_key(url, params)
+        recorded = self._responses.get(key)
+        if not recorded:
+            raise ReplayMissError(f"No recorded response for {key}")
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            if cursor >= len(recorded):
+                if not self.loop:
+                    raise ReplayMissError(f"Recorded responses for {key} exhausted")
+                cursor = len(recorded) - 1
+            self._cursors[key] = cursor + 1
+        status, response_headers, body, elapsed = recorded[cursor]
+        if self.honor_timing and elapsed:
+            time.sleep(elapsed / self.speed)
+        return TransportResponse(url, status, dict(response_headers), body, elapsed, source="replay")
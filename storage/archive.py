@@ -0,0 +1,515 @@
+"""
+Append-only, memory-mappable archive of history series.
+
+One file per (endpoint, symbol, interval), laid out as `<root>/<endpoint slug>/<SYMBOL>/<interval>.cga`.
+
+File format (version 1, little-endian):
+
+    Header, 4096 bytes
+        0   8s   magic b"CGARCHV1"
+        8   H    format version (1)
+        10  H    field count
+        12  I    record size in bytes (8 * field count)
+        16  q    committed record count
+        24  q    revision count (records superseded by a later record with the same time)
+        32  q    bar interval in milliseconds (0 if unknown)
+        40  24x  reserved
+        64  32 bytes per field: 31s UTF-8 name (NUL padded) + 1s typecode ('q' or 'd')
+    Records, starting at byte 4096
+        Fixed-width rows of 8-byte values in field order. The first field is always
+        `time` (int64 milliseconds); the others are float64, NaN when missing.
+
+Rows are ordered by time. An appended row with the same time as the last row is a
+revision of that (still open) bar: it supersedes the earlier row, which stays on disk
+until `compact` rewrites the file. Rows older than the last stored time, and revisions
+identical to the last row, are ignored by appends; `fill` inserts missing older rows by
+rewriting the file.
+
+A single writer appends rows, flushes them, and only then bumps the committed count in
+the header. Concurrent readers map the file and never look past the committed count,
+so they need no locks. Writers take an exclusive lock on `<file>.lock`.
+"""
+
+import argparse
+import bisect
+import heapq
+import math
+import mmap
+import os
+import struct
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
+
+from services.base import CoinglassAPIBase
+from services.funding_rates import OHLCHistoryService
+from services.liquidation import AggregatedLiquidationHistoryService
+from services.open_interest import OpenInterestHistoryService
+from services.price_data import PriceHistoryService
+from storage.columnar import ColumnBatch
+
+try:
+    import fcntl
+except ImportError:  # Windows: the single-writer rule is not enforced
+    fcntl = None
+
+
+MAGIC = b"CGARCHV1"
+VERSION = 1
+HEADER_SIZE = 4096
+FIELD_SLOT = 32
+MAX_FIELDS = (HEADER_SIZE - 64) // FIELD_SLOT
+_HEADER = struct.Struct("<8sHHIqqq24x")
+_FIELD = struct.Struct("<31s1s")
+_COUNT_OFFSET = 16
+_COUNTS = struct.Struct("<qq")
+
+INTERVAL_MS: Dict[str, int] = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "4h": 14_400_000, "6h": 21_600_000, "8h": 28_800_000, "12h": 43_200_000,
+    "1d": 86_400_000, "1w": 604_800_000,
+}
+
+
+class ArchiveDataset:
+    """A history endpoint stored in the archive, with the service that fetches it and its fields"""
+
+    def __init__(self, endpoint: str, service: Type[CoinglassAPIBase], fields: Sequence[str]):
+        self.endpoint = endpoint
+        self.service = service
+        self.fields = tuple(fields)
+
+    @property
+    def slug(self) -> str:
+        return endpoint_slug(self.endpoint)
+
+
+DATASETS: Dict[str, ArchiveDataset] = {
+    "price": ArchiveDataset("/futures/price/history", PriceHistoryService,
+                            ("time", "open", "high", "low", "close", "volume_usd")),
+    "open_interest": ArchiveDataset("/futures/open-interest/history", OpenInterestHistoryService,
+                                    ("time", "open", "high", "low", "close")),
+    "liquidation": ArchiveDataset("/futures/liquidation/aggregated-history", AggregatedLiquidationHistoryService,
+                                  ("time", "long_liquidation_usd", "short_liquidation_usd")),
+    "funding": ArchiveDataset("/futures/funding-rate/history", OHLCHistoryService,
+                              ("time", "open", "high", "low", "close")),
+}
+
+
+def endpoint_slug(endpoint: str) -> str:
+    return endpoint.strip("/").replace("/", ".")
+
+
+class ArchiveFormatError(ValueError):
+    """Raised when a file is not an archive or does not match the expected layout"""
+
+
+def _read_header(buffer: Any) -> Tuple[List[Tuple[str, str]], int, int, int, int]:
+    if len(buffer) < HEADER_SIZE:
+        raise ArchiveFormatError("File is shorter than the archive header")
+    magic, version, field_count, record_size, count, revisions, interval_ms = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ArchiveFormatError("Not a CoinGlass archive file")
+    if version != VERSION:
+        raise ArchiveFormatError(f"Unsupported archive version {version}")
+    fields = []
+    for i in range(field_count):
+        name, typecode = _FIELD.unpack_from(buffer, 64 + i * FIELD_SLOT)
+        fields.append((name.rstrip(b"\0").decode(), typecode.decode()))
+    if record_size != 8 * field_count:
+        raise ArchiveFormatError(f"Record size {record_size} does not match {field_count} fields")
+    return fields, record_size, count, revisions, interval_ms
+
+
+def _build_header(fields: Sequence[str], count: int, revisions: int, interval_ms: int) -> bytes:
+    if not fields or fields[0] != "time":
+        raise ValueError("The first archive field must be 'time'")
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f"An archive holds at most {MAX_FIELDS} fields")
+    header = bytearray(HEADER_SIZE)
+    _HEADER.pack_into(header, 0, MAGIC, VERSION, len(fields), 8 * len(fields), count, revisions, interval_ms)
+    for i, name in enumerate(fields):
+        encoded = name.encode()
+        if len(encoded) > 31:
+            raise ValueError(f"Field name too long for the archive: {name}")
+        _FIELD.pack_into(header, 64 + i * FIELD_SLOT, encoded, b"q" if i == 0 else b"d")
+    return bytes(header)
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value) if value not in (None, "") else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _rows(records: Union[ColumnBatch, Iterable[Dict[str, Any]]], fields: Sequence[str]) -> List[Tuple]:
+    if isinstance(records, ColumnBatch):
+        nan_column = [math.nan] * len(records)
+        columns = [records[f] if f in records else nan_column for f in fields[1:]]
+        rows = [(int(t), *values) for t, *values in zip(records["time"], *columns)]
+    else:
+        rows = [(int(_to_float(r.get("time"))), *(_to_float(r.get(f)) for f in fields[1:]))
+                for r in records if r.get("time") not in (None, "")]
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+class ArchiveWriter:
+    """
+    The single writer of one archive file.
+
+    :param path: File to append to; created with `fields` if missing.
+    :param fields: Field names, `time` first; checked against an existing file.
+    :param interval_ms: Bar interval stored in the header of a new file.
+    :param durable: fsync after every append instead of only flushing to the OS.
+    :raises BlockingIOError: If another writer holds the file.
+    """
+
+    def __init__(self, path: str, fields: Optional[Sequence[str]] = None, interval_ms: int = 0,
+                 durable: bool = False):
+        self.path = path
+        self.durable = durable
+        self._lock_file = open(f"{path}.lock", "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock_file.close()
+                raise BlockingIOError(f"Archive {path} already has a writer")
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            if fields is None:
+                raise ValueError(f"Archive {path} does not exist and no fields were given")
+            with open(path, "wb") as f:
+                f.write(_build_header(list(fields), 0, 0, interval_ms))
+        self._file = open(path, "r+b")
+        header_fields, self.record_size, self.count, self.revisions, self.interval_ms = \
+            _read_header(self._file.read(HEADER_SIZE))
+        self.fields = [name for name, _ in header_fields]
+        if fields is not None and list(fields) != self.fields:
+            raise ArchiveFormatError(f"Archive {path} has fields {self.fields}, not {list(fields)}")
+        self._struct = struct.Struct("<q" + "d" * (len(self.fields) - 1))
+        # Drop a torn tail left by a writer that died between writing rows and committing them
+        self._file.truncate(HEADER_SIZE + self.count * self.record_size)
+        self.last_time: Optional[int] = None
+        self._last_row = b""
+        if self.count:
+            self._file.seek(HEADER_SIZE + (self.count - 1) * self.record_size)
+            self._last_row = self._file.read(self.record_size)
+            self.last_time = struct.unpack_from("<q", self._last_row)[0]
+
+    def append(self, records: Union[ColumnBatch, Iterable[Dict[str, Any]]]) -> int:
+        """
+        Append rows newer than (or revising) the last stored one
+
+        :param records: CoinGlass records or a `ColumnBatch`, in any order.
+        :return: Number of rows written.
+        """
+        pack = self._struct.pack
+        chunks = []
+        revisions = 0
+        last_time, last_row = self.last_time, self._last_row
+        for row in _rows(records, self.fields):
+            if last_time is not None and row[0] < last_time:
+                continue
+            packed = pack(*row)
+            if row[0] == last_time:
+                if packed == last_row:
+                    continue
+                revisions += 1
+            chunks.append(packed)
+            last_time, last_row = row[0], packed
+        if not chunks:
+            return 0
+
+        self._file.seek(HEADER_SIZE + self.count * self.record_size)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+        # Rows are in place before the count that makes them visible to readers
+        self.count += len(chunks)
+        self.revisions += revisions
+        self.last_time, self._last_row = last_time, last_row
+        self._file.seek(_COUNT_OFFSET)
+        self._file.write(_COUNTS.pack(self.count, self.revisions))
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+        return len(chunks)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if not self._lock_file.closed:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Zero-parse, read-only view of one archive file.
+
+    The file is memory-mapped and columns are strided memoryviews over the mapping, so
+    opening years of 1m bars costs one `mmap` call. `refresh()` picks up rows committed
+    by the writer since the file was opened and maps the file anew; the previous mapping
+    is closed as soon as no `range()` batch taken from it is alive any more.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map: Optional[mmap.mmap] = None
+        self._views: List[memoryview] = []
+        # Superseded mappings still referenced by batches handed out earlier
+        self._retired: List[mmap.mmap] = []
+        self.refresh()
+
+    def refresh(self) -> int:
+        """Map rows committed since the last refresh; returns the row count"""
+        size = os.fstat(self._file.fileno()).st_size
+        mapping = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        fields, self.record_size, count, self.revisions, self.interval_ms = _read_header(mapping)
+        # The writer may be mid-append: never read past what the mapping actually covers
+        self.count = min(count, (size - HEADER_SIZE) // self.record_size)
+        self.fields = [name for name, _ in fields]
+        width = len(self.fields)
+        records = memoryview(mapping)[HEADER_SIZE:HEADER_SIZE + self.count * self.record_size]
+        as_int, as_float = records.cast("q"), records.cast("d")
+        self.columns: Dict[str, memoryview] = {
+            name: (as_int if typecode == "q" else as_float)[i::width]
+            for i, (name, typecode) in enumerate(fields)
+        }
+        self._release()
+        self._map = mapping
+        self._views = [records, as_int, as_float, *self.columns.values()]
+        self._close_retired()
+        return self.count
+
+    def _release(self) -> None:
+        """Drop the current mapping's views and retire the mapping"""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._retired.append(self._map)
+            self._map = None
+
+    def _close_retired(self) -> None:
+        retired, self._retired = self._retired, []
+        for mapping in retired:
+            try:
+                mapping.close()
+            except BufferError:
+                # A batch from `range()` still points into it; retried on the next refresh
+                self._retired.append(mapping)
+
+    @property
+    def times(self) -> memoryview:
+        return self.columns["time"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def first_time(self) -> Optional[int]:
+        return self.times[0] if self.count else None
+
+    @property
+    def last_time(self) -> Optional[int]:
+        return self.times[-1] if self.count else None
+
+    def index_of(self, timestamp: int) -> int:
+        """Position of the first row at or after `timestamp` (binary search)"""
+        return bisect.bisect_left(self.times, timestamp)
+
+    def get(self, timestamp: int) -> Optional[Dict[str, Any]]:
+        """The row stored for exactly this bar time (its latest revision), if any"""
+        index = bisect.bisect_right(self.times, timestamp) - 1
+        if index < 0 or self.times[index] != timestamp:
+            return None
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> ColumnBatch:
+        """
+        Rows with `start <= time < end`
+
+        Zero-copy unless the file holds uncompacted revisions, in which case superseded
+        rows are dropped from a copy.
+        """
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = self.count if end is None else bisect.bisect_left(self.times, end)
+        batch = ColumnBatch({name: column[lo:hi] for name, column in self.columns.items()})
+        if not self.revisions:
+            return batch
+        times = batch["time"]
+        keep = [i for i in range(len(times)) if i + 1 == len(times) or times[i + 1] != times[i]]
+        return ColumnBatch({name: array(column.format, (column[i] for i in keep))
+                            for name, column in batch.columns.items()})
+
+    def to_batch(self) -> ColumnBatch:
+        return self.range()
+
+    def close(self) -> None:
+        """
+        Unmap the file
+
+        Batches returned by `range()` must no longer be in use; a mapping they still
+        reference is left to the garbage collector.
+        """
+        self.columns = {}
+        self._release()
+        self._close_retired()
+        self._retired.clear()
+        self._file.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _rewrite(path: str, writer: ArchiveWriter, rows: Iterable[Tuple], count: int) -> None:
+    """Write `rows` to a new file and atomically swap it in (the caller holds the writer lock)"""
+    temp = f"{path}.rewrite"
+    pack = struct.Struct("<q" + "d" * (len(writer.fields) - 1)).pack
+    with open(temp, "wb") as f:
+        f.write(_build_header(writer.fields, count, 0, writer.interval_ms))
+        for row in rows:
+            f.write(pack(*row))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def compact(path: str, before: Optional[int] = None) -> Dict[str, int]:
+    """
+    Rewrite an archive without superseded revisions (and rows older than `before`)
+
+    Holds the writer lock while rewriting and swaps the file in atomically; readers that
+    already mapped the old file keep reading it until they reopen.
+
+    :return: Row counts before and after.
+    """
+    with ArchiveWriter(path) as writer, ArchiveReader(path) as reader:
+        batch = reader.range(start=before)
+        stats = {"rows_before": reader.count, "rows_after": len(batch)}
+        _rewrite(path, writer, zip(*[batch[name] for name in writer.fields]), len(batch))
+        # Mapped views must be gone before the reader can unmap the old file
+        del batch
+    return stats
+
+
+def fill(path: str, records: Union[ColumnBatch, Iterable[Dict[str, Any]]]) -> int:
+    """
+    Insert rows for bar times missing from an archive, e.g. to repair gaps
+
+    Rows for times already stored are ignored, never replaced. Like `compact`, this
+    rewrites the file under the writer lock and swaps it in atomically.
+
+    :return: Number of rows inserted.
+    """
+    with ArchiveWriter(path) as writer, ArchiveReader(path) as reader:
+        times = reader.times
+        missing: Dict[int, Tuple] = {}
+        for row in _rows(records, writer.fields):
+            index = bisect.bisect_left(times, row[0])
+            if index == len(times) or times[index] != row[0]:
+                missing[row[0]] = row
+        del times
+        if not missing:
+            return 0
+        batch = reader.range()
+        existing = zip(*[batch[name] for name in writer.fields])
+        merged = heapq.merge(existing, sorted(missing.values()), key=lambda row: row[0])
+        _rewrite(path, writer, merged, len(batch) + len(missing))
+        del batch, existing, merged
+    return len(missing)
+
+
+class HistoryArchive:
+    """
+    Directory of archive files, one per (endpoint, symbol, interval).
+
+    :param root: Archive root directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, dataset: str, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, DATASETS[dataset].slug, symbol.upper(), f"{interval}.cga")
+
+    def writer(self, dataset: str, symbol: str, interval: str, durable: bool = False) -> ArchiveWriter:
+        path = self.path_for(dataset, symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return ArchiveWriter(path, DATASETS[dataset].fields, INTERVAL_MS.get(interval, 0), durable)
+
+    def reader(self, dataset: str, symbol: str, interval: str) -> ArchiveReader:
+        return ArchiveReader(self.path_for(dataset, symbol, interval))
+
+    def exists(self, dataset: str, symbol: str, interval: str) -> bool:
+        return os.path.exists(self.path_for(dataset, symbol, interval))
+
+    def ingest(self, dataset: str, symbol: str, interval: str, service: Optional[CoinglassAPIBase] = None) -> int:
+        """
+        Fetch a history endpoint and append what is new
+
+        :return: Number of rows appended.
+        """
+        service = service or DATASETS[dataset].service()
+        data = service.fetch_data(symbol=symbol, interval=interval)
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching {dataset} history: {data.get('msg')}")
+        with self.writer(dataset, symbol, interval) as writer:
+            return writer.append(data.get("data") or [])
+
+    def series(self) -> List[Tuple[str, str, str]]:
+        """Every stored (dataset, symbol, interval)"""
+        slugs = {dataset.slug: name for name, dataset in DATASETS.items()}
+        found = []
+        for slug in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []:
+            if slug not in slugs:
+                continue
+            for symbol in sorted(os.listdir(os.path.join(self.root, slug))):
+                for filename in sorted(os.listdir(os.path.join(self.root, slug, symbol))):
+                    if filename.endswith(".cga"):
+                        found.append((slugs[slug], symbol, filename[:-4]))
+        return found
+
+    def compact(self, before: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """Compact every file in the archive"""
+        return {self.path_for(*key): compact(self.path_for(*key), before) for key in self.series()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and compact a CoinGlass history archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="List stored series with row counts and time ranges")
+    info.add_argument("root")
+    compact_parser = sub.add_parser("compact", help="Drop superseded revisions (and optionally old rows)")
+    compact_parser.add_argument("root")
+    compact_parser.add_argument("--before", type=int, help="Also drop rows older than this time (ms)")
+    args = parser.parse_args()
+
+    archive = HistoryArchive(args.root)
+    if args.command == "info":
+        for key in archive.series():
+            with archive.reader(*key) as reader:
+                print(f"{'/'.join(key):40} rows={len(reader):>9} revisions={reader.revisions:>6} "
+                      f"first={reader.first_time} last={reader.last_time}")
+    else:
+        for path, stats in archive.compact(args.before).items():
+            print(f"{path}: {stats['rows_before']} -> {stats['rows_after']} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Column-oriented batches of numeric series and their compact binary encoding"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+TIME_FIELDS = ("time", "t", "timestamp", "create_time", "date")
+
+# b"CGCB" + u32 header length + JSON header + column buffers (little-endian, in header order)
+MAGIC = b"CGCB"
+_PREFIX = struct.Struct("<4sI")
+
+
+def _to_float(value: Any) -> float:
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _to_int(value: Any) -> int:
+    number = _to_float(value)
+    return 0 if math.isnan(number) else int(number)
+
+
+def typecode_of(column: Any) -> str:
+    """Typecode of an `array` or of a memoryview cast to one"""
+    return getattr(column, "typecode", None) or column.format
+
+
+def _is_numeric(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+class ColumnBatch:
+    """
+    Table of equally long typed arrays, one per field.
+
+    Time columns are stored as int64 ('q'), everything else as float64 ('d') with NaN for
+    missing values. Compared to a list of dicts a batch is a handful of contiguous buffers,
+    so it pickles, ships between processes and writes to disk at memcpy speed. Columns may
+    also be memoryviews over shared or mapped memory (see `storage.shared`).
+    """
+
+    __slots__ = ("columns",)
+
+    def __init__(self, columns: Optional[Dict[str, array]] = None):
+        self.columns: Dict[str, array] = dict(columns or {})
+        lengths = {len(col) for col in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]], fields: Optional[Iterable[str]] = None,
+                     time_fields: Sequence[str] = TIME_FIELDS) -> "ColumnBatch":
+        """
+        Build a batch from CoinGlass records
+
+        :param records: List of dicts as returned in a response's `data`.
+        :param fields: Fields to keep; by default every numeric field of the first record.
+        :param time_fields: Fields stored as int64 timestamps.
+        """
+        if fields is None:
+            first = records[0] if records else {}
+            fields = [name for name, value in first.items() if _is_numeric(value)]
+        columns: Dict[str, array] = {}
+        for name in fields:
+            if name in time_fields:
+                columns[name] = array("q", (_to_int(r.get(name)) for r in records))
+            else:
+                columns[name] = array("d", (_to_float(r.get(name)) for r in records))
+        return cls(columns)
+
+    @classmethod
+    def concat(cls, batches: Sequence["ColumnBatch"]) -> "ColumnBatch":
+        batches = [b for b in batches if b.columns]
+        if not batches:
+            return cls()
+        names = batches[0].names
+        columns = {name: array(typecode_of(batches[0].columns[name])) for name in names}
+        for batch in batches:
+            if batch.names != names:
+                raise ValueError("Cannot concatenate batches with different columns")
+            for name in names:
+                columns[name].extend(batch.columns[name])
+        return cls(columns)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def __len__(self) -> int:
+        for col in self.columns.values():
+            return len(col)
+        return 0
+
+    def __getitem__(self, name: str) -> array:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ColumnBatch) and self.columns == other.columns
+
+    def __repr__(self) -> str:
+        return f"ColumnBatch(rows={len(self)}, columns={self.names})"
+
+    def slice(self, start: int, stop: Optional[int] = None) -> "ColumnBatch":
+        return ColumnBatch({name: col[start:stop] for name, col in self.columns.items()})
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        names = self.names
+        return [dict(zip(names, row)) for row in zip(*self.columns.values())]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in self.columns.values())
+
+    def schema(self) -> List[Tuple[str, str]]:
+        return [(name, typecode_of(col)) for name, col in self.columns.items()]
+
+    def to_bytes(self) -> bytes:
+        """Encode as a self-describing buffer (see `MAGIC` for the layout)"""
+        header = json.dumps({"rows": len(self), "columns": self.schema()}, separators=(",", ":")).encode()
+        parts = [_PREFIX.pack(MAGIC, len(header)), header]
+        for col in self.columns.values():
+            if sys.byteorder == "big":
+                col = array(typecode_of(col), col)
+                col.byteswap()
+            parts.append(col.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ColumnBatch":
+        magic, header_len = _PREFIX.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a column batch buffer")
+        offset = _PREFIX.size
+        header = json.loads(bytes(data[offset:offset + header_len]))
+        offset += header_len
+        rows = header["rows"]
+        columns: Dict[str, array] = {}
+        for name, typecode in header["columns"]:
+            col = array(typecode)
+            size = col.itemsize * rows
+            col.frombytes(data[offset:offset + size])
+            if sys.byteorder == "big":
+                col.byteswap()
+            columns[name] = col
+            offset += size
+        return cls(columns)
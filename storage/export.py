@@ -0,0 +1,419 @@
+"""
+Export history endpoints to partitioned Parquet (or Arrow IPC) files for dataframe tools.
+
+Layout (Hive-style, readable with `pyarrow.dataset`, pandas, polars, DuckDB, Spark):
+
+    <root>/<source>/symbol=<SYMBOL>/interval=<interval>/date=<YYYY-MM-DD>/part.parquet
+
+Each partition holds one UTC day of one series. A per-source `_manifest.json` records a
+content hash per partition, so re-exports only rewrite days whose data changed. Requires
+the optional `pyarrow` package (`pip install "coinglass[export]"`).
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from services.base import CoinglassAPIBase
+from services.etf import (
+    BitcoinETFFlowHistoryService,
+    EthereumETFFlowHistoryService,
+    GrayscalePremiumHistoryService,
+    HKBitcoinETFFlowHistoryService,
+    HKEthereumETFFlowHistoryService,
+)
+from services.funding_rates import OHLCHistoryService, OIWeightOHLCHistoryService, VolWeightOHLCHistoryService
+from services.liquidation import AggregatedLiquidationHistoryService, LiquidationHistoryService
+from services.long_short_ratio import (
+    AggregatedTakerBuySellVolumeHistoryService,
+    GlobalAccountRatioService,
+    TakerBuySellRatioHistoryService,
+    TopAccountRatioHistoryService,
+    TopPositionRatioHistoryService,
+)
+from services.open_interest import AggregatedOpenInterestHistoryService, OpenInterestHistoryService
+from services.price_data import PriceHistoryService
+from storage.archive import HistoryArchive
+from storage.columnar import TIME_FIELDS
+
+
+MANIFEST = "_manifest.json"
+# Manifest entry holding the column kinds a source was exported with
+SCHEMA_KEY = "_schema"
+DAY_MS = 86_400_000
+
+
+class ExportSource:
+    """
+    A history service that can be exported, and how to call it
+
+    :param service: Service class.
+    :param takes_symbol: Whether `fetch_data` accepts `symbol`.
+    :param takes_interval: Whether `fetch_data` accepts `interval`.
+    :param symbol: Partition symbol for endpoints without a symbol parameter (e.g. BTC ETF flows).
+    """
+
+    def __init__(self, service: Type[CoinglassAPIBase], takes_symbol: bool = True, takes_interval: bool = True,
+                 symbol: Optional[str] = None):
+        self.service = service
+        self.takes_symbol = takes_symbol
+        self.takes_interval = takes_interval
+        self.symbol = symbol
+
+    def fetch(self, service: CoinglassAPIBase, symbol: str, interval: str) -> List[Dict[str, Any]]:
+        params = {}
+        if self.takes_symbol:
+            params["symbol"] = symbol
+        if self.takes_interval:
+            params["interval"] = interval
+        data = service.fetch_data(**params)
+        if data.get("code") != "0":
+            raise ValueError(f"Error fetching {self.service.__name__} data: {data.get('msg')}")
+        records = data.get("data") or []
+        if not isinstance(records, list):
+            raise ValueError(f"{self.service.__name__} does not return a list of records")
+        return records
+
+
+EXPORT_SOURCES: Dict[str, ExportSource] = {
+    "price": ExportSource(PriceHistoryService),
+    "open_interest": ExportSource(OpenInterestHistoryService),
+    "open_interest_aggregated": ExportSource(AggregatedOpenInterestHistoryService),
+    "liquidation": ExportSource(AggregatedLiquidationHistoryService),
+    "liquidation_pair": ExportSource(LiquidationHistoryService),
+    "funding": ExportSource(OHLCHistoryService),
+    "funding_oi_weighted": ExportSource(OIWeightOHLCHistoryService),
+    "funding_vol_weighted": ExportSource(VolWeightOHLCHistoryService),
+    "long_short_global_account": ExportSource(GlobalAccountRatioService),
+    "long_short_top_account": ExportSource(TopAccountRatioHistoryService),
+    "long_short_top_position": ExportSource(TopPositionRatioHistoryService),
+    "taker_buy_sell_volume": ExportSource(AggregatedTakerBuySellVolumeHistoryService),
+    "taker_buy_sell_ratio": ExportSource(TakerBuySellRatioHistoryService),
+    "etf_btc_flows": ExportSource(BitcoinETFFlowHistoryService, False, False, symbol="BTC"),
+    "etf_eth_flows": ExportSource(EthereumETFFlowHistoryService, False, False, symbol="ETH"),
+    "hk_etf_btc_flows": ExportSource(HKBitcoinETFFlowHistoryService, False, False, symbol="BTC"),
+    "hk_etf_eth_flows": ExportSource(HKEthereumETFFlowHistoryService, False, False, symbol="ETH"),
+    "grayscale_premium": ExportSource(GrayscalePremiumHistoryService, takes_interval=False),
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow export requires the optional 'pyarrow' package; install it with "
+                          "`pip install \"coinglass[export]\"` or `pip install pyarrow`") from e
+    return pyarrow
+
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def _to_ms(value: Any) -> Optional[int]:
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    # Second-resolution timestamps are scaled to milliseconds
+    return number * 1000 if number < 100_000_000_000 else number
+
+
+def _columns(records: List[Dict[str, Any]],
+             known: Optional[Dict[str, str]] = None) -> Tuple[Optional[str], Dict[str, Tuple[str, List[Any]]]]:
+    """
+    Typed columns of the scalar fields of `records`: name -> (kind, values)
+
+    A column without any value takes its kind from `known` (the kinds earlier exports
+    used), or 'null' when it never had a value, so day partitions keep one schema.
+    """
+    known = known or {}
+    names: Dict[str, None] = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+    time_field = next((f for f in TIME_FIELDS if f in names), None)
+
+    columns: Dict[str, Tuple[str, List[Any]]] = {}
+    for name in names:
+        values = [record.get(name) for record in records]
+        present = [v for v in values if v is not None and v != ""]
+        if any(isinstance(v, (dict, list)) for v in present):
+            continue
+        if name == time_field:
+            columns[name] = ("time", [_to_ms(v) for v in values])
+        elif not present:
+            columns[name] = (known.get(name, "null"), [None] * len(values))
+        elif present and all(isinstance(v, bool) for v in present):
+            columns[name] = ("bool", [v if isinstance(v, bool) else None for v in values])
+        elif all(_is_number(v) for v in present):
+            columns[name] = ("float", [float(v) if v is not None and v != "" else None for v in values])
+        else:
+            columns[name] = ("string", [None if v is None else str(v) for v in values])
+    return time_field, columns
+
+
+def _day(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _partition_hash(columns: Dict[str, Tuple[str, List[Any]]]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for name, (kind, values) in columns.items():
+        digest.update(json.dumps([name, kind, values], separators=(",", ":"), default=str).encode())
+    return digest.hexdigest()
+
+
+class ParquetExporter:
+    """
+    Streams history services into partitioned Parquet (or Arrow IPC) files.
+
+    Series are fetched and written one at a time per worker, so memory stays bounded by
+    `max_workers` responses however large the universe. Within a series only partitions
+    (UTC days) whose content hash differs from the manifest are rewritten; each write goes
+    to a temporary file that is atomically renamed into place.
+
+    :param root: Output directory.
+    :param file_format: 'parquet' or 'arrow' (Arrow IPC / Feather v2).
+    :param compression: Codec passed to the writer (e.g. 'zstd', 'snappy', None).
+    :param max_workers: Series fetched and written concurrently by `export_many`.
+    """
+
+    def __init__(self, root: str, file_format: str = "parquet", compression: Optional[str] = "zstd",
+                 max_workers: int = 4):
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"Unknown export format: {file_format}")
+        self.pa = _require_pyarrow()
+        self.root = root
+        self.file_format = file_format
+        self.compression = compression
+        self.max_workers = max_workers
+        self._manifests: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    # Manifest
+
+    def _manifest(self, source: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if source not in self._manifests:
+                path = os.path.join(self.root, source, MANIFEST)
+                manifest = {}
+                if os.path.exists(path):
+                    with open(path) as f:
+                        manifest = json.load(f)
+                self._manifests[source] = manifest
+            return self._manifests[source]
+
+    def _save_manifest(self, source: str) -> None:
+        with self._lock:
+            path = os.path.join(self.root, source, MANIFEST)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp, "w") as f:
+                json.dump(self._manifests.get(source, {}), f, indent=1, sort_keys=True)
+            os.replace(temp, path)
+
+    # Writing
+
+    def _table(self, time_field: Optional[str], columns: Dict[str, Tuple[str, List[Any]]]):
+        pa = self.pa
+        types = {"float": pa.float64(), "string": pa.string(), "bool": pa.bool_(), "null": pa.null()}
+        arrays, names = [], []
+        for name, (kind, values) in columns.items():
+            if kind == "time":
+                arrays.append(pa.array(values, pa.int64()).cast(pa.timestamp("ms", tz="UTC")))
+            else:
+                arrays.append(pa.array(values, types[kind]))
+            names.append(name)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def _write(self, path: str, table) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.tmp"
+        if self.file_format == "parquet":
+            self.pa.parquet.write_table(table, temp, compression=self.compression)
+        else:
+            self.pa.feather.write_feather(table, temp, compression=self.compression or "uncompressed")
+        os.replace(temp, path)
+
+    def partition_path(self, source: str, symbol: str, interval: str, day: str) -> str:
+        extension = "parquet" if self.file_format == "parquet" else "arrow"
+        return os.path.join(self.root, source, f"symbol={symbol}", f"interval={interval}", f"date={day}",
+                            f"part.{extension}")
+
+    def export_records(self, source: str, symbol: str, interval: str, records: List[Dict[str, Any]],
+                       save_manifest: bool = True) -> Dict[str, int]:
+        """
+        Write one series given as CoinGlass records, skipping unchanged days
+
+        :param save_manifest: Persist the source manifest afterwards; `export_many` and
+            `export_archive` pass False and write it once at the end.
+        :return: Counts of partitions written and skipped, and rows written.
+        """
+        stats = {"partitions_written": 0, "partitions_skipped": 0, "rows_written": 0}
+        if not records:
+            return stats
+        manifest = self._manifest(source)
+        with self._lock:
+            schema = dict(manifest.get(SCHEMA_KEY, {}))
+        time_field, columns = _columns(records, schema)
+        if time_field is None:
+            raise ValueError(f"{source} records have no time field")
+        with self._lock:
+            manifest.setdefault(SCHEMA_KEY, {}).update(
+                (name, kind) for name, (kind, _) in columns.items() if kind not in ("time", "null"))
+
+        # Group row indexes by UTC day
+        days: Dict[str, List[int]] = {}
+        for index, ms in enumerate(columns[time_field][1]):
+            if ms is not None:
+                days.setdefault(_day(ms), []).append(index)
+
+        for day, indexes in sorted(days.items()):
+            part = {name: (kind, [values[i] for i in indexes]) for name, (kind, values) in columns.items()}
+            path = self.partition_path(source, symbol, interval, day)
+            key = os.path.relpath(path, os.path.join(self.root, source))
+            digest = _partition_hash(part)
+            entry = manifest.get(key)
+            if entry is not None and entry.get("hash") == digest and os.path.exists(path):
+                stats["partitions_skipped"] += 1
+                continue
+            self._write(path, self._table(time_field, part))
+            with self._lock:
+                manifest[key] = {"hash": digest, "rows": len(indexes)}
+            stats["partitions_written"] += 1
+            stats["rows_written"] += len(indexes)
+        if stats["partitions_written"] and save_manifest:
+            self._save_manifest(source)
+        return stats
+
+    def export(self, source: str, symbol: Optional[str] = None, interval: str = "1d",
+               service: Optional[CoinglassAPIBase] = None, save_manifest: bool = True) -> Dict[str, int]:
+        """
+        Fetch one series from its history service and export it
+
+        :param source: Key of `EXPORT_SOURCES`.
+        :param symbol: Coin, or None for sources with a fixed symbol (ETF flows).
+        :param interval: History interval (ignored by sources without one).
+        """
+        spec = EXPORT_SOURCES[source]
+        symbol = symbol or spec.symbol
+        if symbol is None:
+            raise ValueError(f"Source {source} needs a symbol")
+        records = spec.fetch(service or spec.service(), symbol, interval)
+        return self.export_records(source, symbol, interval if spec.takes_interval else "none", records,
+                                   save_manifest)
+
+    def export_many(self, source: str, symbols: Sequence[Optional[str]], intervals: Sequence[str] = ("1d",),
+                    on_error=None) -> Dict[str, Any]:
+        """
+        Export every (symbol, interval) series of a source with bounded concurrency
+
+        :param on_error: Called with ((symbol, interval), exception); by default failures are only counted.
+        :return: Totals plus the failed series.
+        """
+        spec = EXPORT_SOURCES[source]
+        tasks = [(symbol, interval) for symbol in symbols
+                 for interval in (intervals if spec.takes_interval else ("none",))]
+        totals: Dict[str, Any] = {"series": len(tasks), "partitions_written": 0, "partitions_skipped": 0,
+                                  "rows_written": 0, "failed": {}}
+        service = spec.service()
+
+        def run(task):
+            try:
+                return task, self.export(source, task[0], task[1], service, save_manifest=False), None
+            except Exception as e:
+                return task, None, e
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for task, stats, error in executor.map(run, tasks):
+                    if error is not None:
+                        totals["failed"][f"{task[0]}/{task[1]}"] = str(error)
+                        if on_error is not None:
+                            on_error(task, error)
+                        continue
+                    for name, value in stats.items():
+                        totals[name] += value
+        finally:
+            # One manifest write for the whole run, also keeping the days written before a failure
+            if totals["partitions_written"]:
+                self._save_manifest(source)
+        return totals
+
+    def export_archive(self, archive: HistoryArchive, datasets: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Export series stored in a `HistoryArchive`, one UTC day at a time from the memory map
+
+        Archive datasets map onto the export sources of the same name.
+        """
+        totals = {"partitions_written": 0, "partitions_skipped": 0, "rows_written": 0}
+        wanted = set(datasets) if datasets is not None else None
+        changed = set()
+        try:
+            for dataset, symbol, interval in archive.series():
+                if wanted is not None and dataset not in wanted:
+                    continue
+                with archive.reader(dataset, symbol, interval) as reader:
+                    if not len(reader):
+                        continue
+                    day_start = reader.first_time // DAY_MS * DAY_MS
+                    while day_start <= reader.last_time:
+                        batch = reader.range(day_start, day_start + DAY_MS)
+                        if len(batch):
+                            records = [{name: (None if isinstance(value, float) and math.isnan(value) else value)
+                                        for name, value in record.items()} for record in batch.to_records()]
+                            del batch
+                            stats = self.export_records(dataset, symbol, interval, records, save_manifest=False)
+                            if stats["partitions_written"]:
+                                changed.add(dataset)
+                            for name, value in stats.items():
+                                totals[name] += value
+                        else:
+                            del batch
+                        day_start += DAY_MS
+        finally:
+            # Manifests are written once per source rather than after every exported day
+            for dataset in sorted(changed):
+                self._save_manifest(dataset)
+        return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export CoinGlass history to partitioned Parquet/Arrow files")
+    parser.add_argument("root", help="Output directory")
+    parser.add_argument("source", choices=sorted(EXPORT_SOURCES))
+    parser.add_argument("--symbols", default="BTC", help="Comma-separated symbols")
+    parser.add_argument("--intervals", default="1d", help="Comma-separated intervals")
+    parser.add_argument("--format", dest="file_format", default="parquet", choices=("parquet", "arrow"))
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    try:
+        exporter = ParquetExporter(args.root, args.file_format, args.compression, args.workers)
+    except ImportError as e:
+        parser.error(str(e))
+    totals = exporter.export_many(args.source, args.symbols.split(","), args.intervals.split(","))
+    print(json.dumps(totals, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Gap detection, coverage reports and targeted repair for interval series in a `HistoryArchive`"""
+
+import argparse
+import contextvars
+import json
+import operator
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress, count, islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.scheduler import request_context
+from storage.archive import DATASETS, INTERVAL_MS, HistoryArchive, fill
+
+
+class Gap:
+    """Run of missing bars; `start` and `end` are the open times of the first and last missing bar"""
+
+    __slots__ = ("start", "end", "interval_ms")
+
+    def __init__(self, start: int, end: int, interval_ms: int):
+        self.start = start
+        self.end = end
+        self.interval_ms = interval_ms
+
+    @property
+    def bars(self) -> int:
+        return (self.end - self.start) // self.interval_ms + 1
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"start": self.start, "end": self.end, "bars": self.bars}
+
+    def __repr__(self) -> str:
+        return f"Gap({self.start}..{self.end}, bars={self.bars})"
+
+
+# Ranges at most this long are diffed directly instead of being bisected further
+_LINEAR_SCAN = 256
+
+
+def _jumps(times: Sequence[int], interval_ms: int, lo: int, hi: int) -> Iterable[int]:
+    """Indexes i in [lo, hi) where the step from times[i] to times[i + 1] exceeds the interval"""
+    diffs = map(operator.sub, islice(times, lo + 1, hi + 1), islice(times, lo, hi))
+    return compress(count(lo), map(interval_ms.__lt__, diffs))
+
+
+def _strict_jumps(times: Sequence[int], interval_ms: int) -> List[int]:
+    # Without repeated times, a range spanning exactly (hi - lo) intervals has no hole,
+    # so complete stretches are skipped in O(1) and only ranges holding gaps are scanned
+    found: List[int] = []
+    stack = [(0, len(times) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi <= lo or times[hi] - times[lo] == (hi - lo) * interval_ms:
+            continue
+        if hi - lo <= _LINEAR_SCAN:
+            found.extend(_jumps(times, interval_ms, lo, hi))
+            continue
+        mid = (lo + hi) // 2
+        stack.append((mid, hi))
+        stack.append((lo, mid))
+    found.sort()
+    return found
+
+
+def find_gaps(times: Sequence[int], interval_ms: int, start: Optional[int] = None,
+              end: Optional[int] = None, strict: bool = False) -> List[Gap]:
+    """
+    Missing bars in a sorted time column
+
+    Consecutive differences are computed with `map`/`compress` over the buffer, so the
+    scan runs in C and only the (few) gap positions reach Python code. Repeated times
+    (revisions) are not gaps.
+
+    :param times: Bar open times in ms, ascending (an archive column, array or list).
+    :param start: Open time of the first expected bar; earlier missing bars count as a gap.
+    :param end: Open time of the last expected bar; missing trailing bars count as a gap.
+    :param strict: Times are known to be strictly increasing (e.g. a compacted archive);
+        complete stretches are then skipped by bisection instead of being diffed.
+    """
+    gaps: List[Gap] = []
+    n = len(times)
+    if n == 0:
+        if start is not None and end is not None and end >= start:
+            gaps.append(Gap(start, end, interval_ms))
+        return gaps
+    if start is not None and times[0] > start:
+        gaps.append(Gap(start, times[0] - interval_ms, interval_ms))
+    jumps = _strict_jumps(times, interval_ms) if strict else _jumps(times, interval_ms, 0, n - 1)
+    for i in jumps:
+        gaps.append(Gap(times[i] + interval_ms, times[i + 1] - interval_ms, interval_ms))
+    if end is not None and times[n - 1] < end:
+        gaps.append(Gap(times[n - 1] + interval_ms, end, interval_ms))
+    return [gap for gap in gaps if gap.end >= gap.start]
+
+
+def gaps_in_records(records: Iterable[Dict[str, Any]], interval: str, time_field: str = "time") -> List[Gap]:
+    """Gaps in a fetched history response, before it is stored"""
+    times = sorted(int(r[time_field]) for r in records if r.get(time_field) is not None)
+    return find_gaps(times, INTERVAL_MS[interval])
+
+
+def plan_refetches(gaps: Sequence[Gap], interval_ms: int, max_bars: int = 1000) -> List[Tuple[int, int]]:
+    """
+    Fewest (start_time, end_time) windows of at most `max_bars` bars covering every gap
+
+    Nearby gaps share a window; gaps longer than `max_bars` are split.
+    """
+    span = (max_bars - 1) * interval_ms
+    windows: List[List[int]] = []
+    for gap in sorted(gaps, key=lambda g: g.start):
+        cursor = gap.start
+        while cursor <= gap.end:
+            if windows and cursor <= windows[-1][0] + span:
+                window = windows[-1]
+            else:
+                window = [cursor, cursor]
+                windows.append(window)
+            window[1] = min(gap.end, window[0] + span)
+            cursor = window[1] + interval_ms
+    return [(start, end) for start, end in windows]
+
+
+class SeriesCoverage:
+    """Coverage of one stored (dataset, symbol, interval) series"""
+
+    def __init__(self, dataset: str, symbol: str, interval: str, first: Optional[int], last: Optional[int],
+                 bars: int, gaps: List[Gap], stale_bars: int):
+        self.dataset = dataset
+        self.symbol = symbol
+        self.interval = interval
+        self.first = first
+        self.last = last
+        self.bars = bars
+        self.gaps = gaps
+        self.stale_bars = stale_bars
+
+    @property
+    def missing(self) -> int:
+        return sum(gap.bars for gap in self.gaps)
+
+    @property
+    def expected(self) -> int:
+        return self.bars + self.missing
+
+    @property
+    def coverage(self) -> float:
+        return self.bars / self.expected if self.expected else 1.0
+
+    def to_dict(self, max_gaps: int = 20) -> Dict[str, Any]:
+        largest = max(self.gaps, key=lambda g: g.bars, default=None)
+        return {
+            "dataset": self.dataset, "symbol": self.symbol, "interval": self.interval,
+            "first": self.first, "last": self.last, "bars": self.bars, "expected": self.expected,
+            "missing": self.missing, "coverage": round(self.coverage, 6), "gap_count": len(self.gaps),
+            "largest_gap": largest.to_dict() if largest else None, "stale_bars": self.stale_bars,
+            "gaps": [gap.to_dict() for gap in self.gaps[:max_gaps]],
+        }
+
+    def __repr__(self) -> str:
+        return (f"SeriesCoverage({self.dataset}/{self.symbol}/{self.interval}, bars={self.bars}, "
+                f"missing={self.missing}, coverage={self.coverage:.2%})")
+
+
+class GapRepairer:
+    """
+    Finds holes in archived interval series and refetches only the missing windows.
+
+    Refetches go through the dataset's history service with `start_time`/`end_time`, in
+    as few requests as `plan_refetches` allows, under the 'gap-repair' workload so a
+    `RequestScheduler` queues them behind interactive traffic. Fetched bars are merged
+    into the archive with `fill`, which never overwrites stored bars.
+
+    :param archive: Archive to inspect and repair.
+    :param max_bars_per_request: Bars one history request may return.
+    :param max_workers: Concurrent refetch requests per series.
+    """
+
+    def __init__(self, archive: HistoryArchive, max_bars_per_request: int = 1000, max_workers: int = 4):
+        self.archive = archive
+        self.max_bars_per_request = max_bars_per_request
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _last_expected(interval_ms: int, until: Optional[int], anchor: Optional[int]) -> Optional[int]:
+        """
+        Open time of the last bar closed by `until`, on the series' own bar grid
+
+        Bars are aligned to `anchor` (any stored bar time) rather than to the epoch, since
+        e.g. weekly bars open on Monday while epoch-aligned weeks start on a Thursday.
+        """
+        if until is None or anchor is None:
+            return None
+        return until - (until - anchor) % interval_ms - interval_ms
+
+    def coverage_of(self, dataset: str, symbol: str, interval: str, until: Optional[int] = None) -> SeriesCoverage:
+        """
+        Coverage of one series
+
+        :param until: Time in ms (e.g. now) by which every earlier closed bar should be stored;
+            missing trailing bars then count as a gap. Without it only interior holes count.
+        """
+        interval_ms = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        with self.archive.reader(dataset, symbol, interval) as reader:
+            first, last = reader.first_time, reader.last_time
+            gaps = find_gaps(reader.times, interval_ms, end=self._last_expected(interval_ms, until, last),
+                             strict=not reader.revisions)
+            bars = len(reader) - reader.revisions
+        # Bars opened after the last stored one, counted on its own grid, less the one still open
+        stale = max(0, (now - last) // interval_ms - 1) if last is not None else 0
+        return SeriesCoverage(dataset, symbol, interval, first, last, bars, gaps, stale)
+
+    def coverage(self, datasets: Optional[Iterable[str]] = None, until: Optional[int] = None) -> List[SeriesCoverage]:
+        """Coverage report of every stored series (optionally limited to some datasets)"""
+        wanted = set(datasets) if datasets is not None else None
+        return [self.coverage_of(dataset, symbol, interval, until)
+                for dataset, symbol, interval in self.archive.series()
+                if (wanted is None or dataset in wanted) and interval in INTERVAL_MS]
+
+    def plan(self, dataset: str, symbol: str, interval: str, until: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Refetch windows needed to fill a series"""
+        report = self.coverage_of(dataset, symbol, interval, until)
+        return plan_refetches(report.gaps, INTERVAL_MS[interval], self.max_bars_per_request)
+
+    def repair(self, dataset: str, symbol: str, interval: str, until: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Refetch and fill the gaps of one series
+
+        :return: Gaps before and after, requests made, bars filled and failed windows.
+        """
+        before = self.coverage_of(dataset, symbol, interval, until)
+        windows = plan_refetches(before.gaps, INTERVAL_MS[interval], self.max_bars_per_request)
+        stats: Dict[str, Any] = {"missing_before": before.missing, "requests": len(windows), "bars_filled": 0,
+                                 "failed_windows": []}
+        if not windows:
+            stats["missing_after"] = before.missing
+            return stats
+
+        service = DATASETS[dataset].service()
+
+        def fetch(window: Tuple[int, int]):
+            with request_context(workload="gap-repair"):
+                data = service.fetch_data(symbol=symbol, interval=interval, start_time=window[0],
+                                          end_time=window[1], limit=self.max_bars_per_request)
+            if data.get("code") != "0":
+                raise ValueError(f"Error fetching {dataset} history: {data.get('msg')}")
+            return data.get("data") or []
+
+        records: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(window, executor.submit(contextvars.copy_context().run, fetch, window))
+                       for window in windows]
+            for window, future in futures:
+                try:
+                    records.extend(r for r in future.result() if window[0] <= int(r.get("time") or 0) <= window[1])
+                except Exception as e:
+                    stats["failed_windows"].append({"start": window[0], "end": window[1], "error": str(e)})
+
+        if records:
+            stats["bars_filled"] = fill(self.archive.path_for(dataset, symbol, interval), records)
+        stats["missing_after"] = self.coverage_of(dataset, symbol, interval, until).missing
+        return stats
+
+    def repair_all(self, datasets: Optional[Iterable[str]] = None, until: Optional[int] = None) -> Dict[str, Any]:
+        """Repair every stored series that has gaps"""
+        results = {}
+        for report in self.coverage(datasets, until):
+            if report.gaps:
+                key = f"{report.dataset}/{report.symbol}/{report.interval}"
+                results[key] = self.repair(report.dataset, report.symbol, report.interval, until)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and repair gaps in a CoinGlass history archive")
+    parser.add_argument("root", help="Archive root directory")
+    parser.add_argument("--dataset", action="append", help="Limit to these datasets")
+    parser.add_argument("--until-now", action="store_true", help="Count missing bars up to the current time")
+    parser.add_argument("--repair", action="store_true", help="Refetch and fill the gaps")
+    args = parser.parse_args()
+
+    repairer = GapRepairer(HistoryArchive(args.root))
+    until = int(time.time() * 1000) if args.until_now else None
+    if args.repair:
+        print(json.dumps(repairer.repair_all(args.dataset, until), indent=2))
+    else:
+        print(json.dumps([report.to_dict() for report in repairer.coverage(args.dataset, until)], indent=2))
+
+
+if __name__ == "__main__":
+    main()
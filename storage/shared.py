@@ -0,0 +1,232 @@
+"""
+Columnar batches in named shared memory, attachable zero-copy from other processes.
+
+Segment layout (all little-endian):
+
+    b"CGSM" | u32 header length | JSON header | padding to 8 bytes | column buffers
+
+The header is `{"rows": n, "columns": [[name, typecode, offset], ...]}` with every column
+buffer starting at an 8-byte aligned offset from the start of the segment.
+"""
+
+import atexit
+import json
+import struct
+import sys
+import threading
+import uuid
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional
+
+from storage.columnar import ColumnBatch, typecode_of
+
+
+MAGIC = b"CGSM"
+_PREFIX = struct.Struct("<4sI")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _open_segment(name: Optional[str], size: int = 0, create: bool = False, track: bool = True
+                  ) -> shared_memory.SharedMemory:
+    """Open a segment, optionally keeping it away from the resource tracker (which would unlink it at exit)"""
+    if track:
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    # Older versions always register the segment; take this process's registration back out.
+    # When the owner shares this tracker its crash-cleanup registration goes with it, but the
+    # owner still unlinks the segment on close().
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+class SharedBatch:
+    """
+    A `ColumnBatch` stored in a named shared memory segment.
+
+    `batch` exposes the columns as memoryviews straight over the segment, so a consumer
+    that attaches by name reads the producer's data without copying or unpickling.
+    The owner unlinks the segment on `close()`; attached consumers only unmap it.
+    """
+
+    def __init__(self, segment: shared_memory.SharedMemory, owner: bool):
+        self.segment = segment
+        self.owner = owner
+        self.closed = False
+        magic, header_len = _PREFIX.unpack_from(segment.buf)
+        if magic != MAGIC:
+            segment.close()
+            raise ValueError(f"Shared memory segment {segment.name!r} does not hold a column batch")
+        header = json.loads(bytes(segment.buf[_PREFIX.size:_PREFIX.size + header_len]))
+        self.rows: int = header["rows"]
+        self._views: List[memoryview] = []
+        columns: Dict[str, memoryview] = {}
+        for name, typecode, offset in header["columns"]:
+            raw = segment.buf[offset:offset + array(typecode).itemsize * self.rows]
+            view = raw.cast(typecode)
+            self._views.extend((raw, view))
+            columns[name] = view
+        self.batch = ColumnBatch(columns)
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    @classmethod
+    def create(cls, batch: ColumnBatch, name: Optional[str] = None, track: bool = True) -> "SharedBatch":
+        """
+        Copy a batch into a new segment owned by the calling process
+
+        :param name: Segment name; a unique one is generated by default.
+        :param track: Let the resource tracker unlink the segment if this process dies without
+            closing it. Pass False when ownership is handed to another process (see `adopt`).
+        """
+        header = {"rows": len(batch), "columns": []}
+        offset = 0
+        for column_name, column in batch.columns.items():
+            header["columns"].append([column_name, typecode_of(column), 0])
+        # Offsets depend on the header size, which depends on the offsets' digits; settle iteratively
+        for _ in range(3):
+            encoded = json.dumps(header, separators=(",", ":")).encode()
+            offset = _align(_PREFIX.size + len(encoded))
+            for entry, column in zip(header["columns"], batch.columns.values()):
+                entry[2] = offset
+                offset = _align(offset + column.itemsize * len(column))
+        encoded = json.dumps(header, separators=(",", ":")).encode()
+
+        segment = _open_segment(name or f"cg_{uuid.uuid4().hex[:16]}", max(offset, 1), create=True, track=track)
+        _PREFIX.pack_into(segment.buf, 0, MAGIC, len(encoded))
+        segment.buf[_PREFIX.size:_PREFIX.size + len(encoded)] = encoded
+        for (_, _, start), column in zip(header["columns"], batch.columns.values()):
+            data = column.tobytes() if sys.byteorder == "little" else _swapped(column)
+            segment.buf[start:start + len(data)] = data
+        return cls(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedBatch":
+        """Map an existing segment read-side; closing it leaves the segment alive for others"""
+        return cls(_open_segment(name, track=False), owner=False)
+
+    @classmethod
+    def adopt(cls, name: str) -> "SharedBatch":
+        """Map a segment created with `track=False` elsewhere and take over unlinking it"""
+        segment = _open_segment(name, track=False)
+        if sys.version_info < (3, 13):
+            resource_tracker.register(segment._name, "shared_memory")
+        return cls(segment, owner=True)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, column: str) -> memoryview:
+        return self.batch[column]
+
+    def __repr__(self) -> str:
+        return f"SharedBatch({self.name!r}, rows={self.rows}, columns={self.batch.names}, owner={self.owner})"
+
+    def copy(self) -> ColumnBatch:
+        """Detach the data into a regular, process-local batch"""
+        return ColumnBatch({name: array(typecode_of(col), col) for name, col in self.batch.columns.items()})
+
+    def handoff(self) -> str:
+        """Unmap without unlinking, leaving the segment to whoever adopts it by name; returns the name"""
+        self.owner = False
+        self.close()
+        return self.segment.name
+
+    def close(self) -> None:
+        """
+        Unmap the segment, and unlink it if this process owns it
+
+        Views obtained from `batch` or slices of them must no longer be in use.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.batch = ColumnBatch()
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self.segment.close()
+        if self.owner:
+            try:
+                self.segment.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "SharedBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _swapped(column: Any) -> bytes:
+    copy = array(typecode_of(column), column)
+    copy.byteswap()
+    return copy.tobytes()
+
+
+class SharedBatchRegistry:
+    """
+    Owns the shared batches a process publishes and cleans them up.
+
+    Every batch published (or adopted) through the registry is unlinked on `close()`, on
+    leaving the `with` block, or at interpreter exit, so segments never outlive their owner.
+    """
+
+    def __init__(self):
+        self._batches: Dict[str, SharedBatch] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def publish(self, batch: ColumnBatch, name: Optional[str] = None) -> SharedBatch:
+        """Copy a batch into shared memory; consumers call `SharedBatch.attach(shared.name)`"""
+        shared = SharedBatch.create(batch, name)
+        with self._lock:
+            self._batches[shared.name] = shared
+        return shared
+
+    def adopt(self, name: str) -> SharedBatch:
+        """Take ownership of a segment published with `track=False` by another process"""
+        shared = SharedBatch.adopt(name)
+        with self._lock:
+            self._batches[shared.name] = shared
+        return shared
+
+    def get(self, name: str) -> Optional[SharedBatch]:
+        return self._batches.get(name)
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            shared = self._batches.pop(name, None)
+        if shared is not None:
+            shared.close()
+
+    def names(self) -> List[str]:
+        return list(self._batches)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(shared.segment.size for shared in self._batches.values())
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+    def close(self) -> None:
+        with self._lock:
+            batches, self._batches = list(self._batches.values()), {}
+        for shared in batches:
+            shared.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self) -> "SharedBatchRegistry":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,146 @@
+import math
+import os
+import struct
+
+import pytest
+
+from storage.archive import (
+    HEADER_SIZE,
+    ArchiveFormatError,
+    ArchiveReader,
+    ArchiveWriter,
+    compact,
+    fill,
+)
+
+
+FIELDS = ("time", "open", "close")
+HOUR = 3_600_000
+
+
+def bars(start, count, price=100.0):
+    return [{"time": start + i * HOUR, "open": price + i, "close": price + i + 0.5} for i in range(count)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "series.cga")
+
+
+def test_round_trip(path):
+    with ArchiveWriter(path, FIELDS, HOUR) as writer:
+        assert writer.append(bars(0, 5)) == 5
+    with ArchiveReader(path) as reader:
+        assert reader.fields == list(FIELDS)
+        assert reader.interval_ms == HOUR
+        assert len(reader) == 5
+        assert list(reader.times) == [i * HOUR for i in range(5)]
+        assert list(reader.columns["close"]) == [100.5 + i for i in range(5)]
+        assert reader.get(2 * HOUR) == {"time": 2 * HOUR, "open": 102.0, "close": 102.5}
+        assert reader.get(2 * HOUR + 1) is None
+        batch = reader.range(HOUR, 3 * HOUR)
+        assert list(batch["time"]) == [HOUR, 2 * HOUR]
+        del batch
+
+
+def test_reopened_writer_appends_only_newer_rows(path):
+    with ArchiveWriter(path, FIELDS, HOUR) as writer:
+        writer.append(bars(0, 3))
+    with ArchiveWriter(path, FIELDS) as writer:
+        assert writer.last_time == 2 * HOUR
+        assert writer.append(bars(0, 5)) == 2
+        assert writer.append(bars(0, 5)) == 0
+    with ArchiveReader(path) as reader:
+        assert list(reader.times) == [i * HOUR for i in range(5)]
+
+
+def test_missing_values_are_nan(path):
+    with ArchiveWriter(path, FIELDS) as writer:
+        writer.append([{"time": 0, "open": "1.5", "close": None}])
+    with ArchiveReader(path) as reader:
+        row = reader.get(0)
+        assert row["open"] == 1.5 and math.isnan(row["close"])
+
+
+def test_revisions_supersede_the_last_row(path):
+    with ArchiveWriter(path, FIELDS) as writer:
+        writer.append(bars(0, 2))
+        assert writer.append([{"time": HOUR, "open": 1.0, "close": 2.0}]) == 1
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 3 and reader.revisions == 1
+        assert reader.get(HOUR)["close"] == 2.0
+        batch = reader.range()
+        assert list(batch["time"]) == [0, HOUR] and list(batch["close"]) == [100.5, 2.0]
+        del batch
+    assert compact(path) == {"rows_before": 3, "rows_after": 2}
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 2 and reader.revisions == 0
+
+
+def test_fill_inserts_missing_rows(path):
+    rows = bars(0, 6)
+    with ArchiveWriter(path, FIELDS) as writer:
+        writer.append(rows[:2] + rows[4:])
+    assert fill(path, rows) == 2
+    with ArchiveReader(path) as reader:
+        assert list(reader.times) == [i * HOUR for i in range(6)]
+
+
+def test_torn_tail_is_truncated(path):
+    with ArchiveWriter(path, FIELDS) as writer:
+        writer.append(bars(0, 3))
+    # A writer that died after writing rows but before committing the count
+    with open(path, "ab") as f:
+        f.write(struct.pack("<qdd", 3 * HOUR, 1.0, 2.0))
+        f.write(b"\x01\x02\x03")
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 3
+    with ArchiveWriter(path, FIELDS) as writer:
+        assert os.path.getsize(path) == HEADER_SIZE + 3 * writer.record_size
+        assert writer.last_time == 2 * HOUR
+        assert writer.append(bars(0, 4)) == 1
+    with ArchiveReader(path) as reader:
+        assert list(reader.times) == [i * HOUR for i in range(4)]
+
+
+def test_uncommitted_rows_stay_invisible_to_readers(path):
+    with ArchiveWriter(path, FIELDS) as writer:
+        writer.append(bars(0, 2))
+    with open(path, "ab") as f:
+        f.write(struct.pack("<qdd", 2 * HOUR, 1.0, 2.0))
+    with ArchiveReader(path) as reader:
+        assert len(reader) == 2 and reader.last_time == HOUR
+
+
+def test_refresh_sees_new_rows_and_releases_old_mappings(path):
+    with ArchiveWriter(path, FIELDS) as writer:
+        writer.append(bars(0, 1))
+        with ArchiveReader(path) as reader:
+            held = reader.range()
+            for i in range(1, 50):
+                writer.append(bars(i * HOUR, 1, price=100.0 + i))
+                assert reader.refresh() == i + 1
+            # Only the current mapping and the one `held` still points into stay open
+            assert len(reader._retired) == 1
+            assert list(held["time"]) == [0]
+            del held
+            reader.refresh()
+            assert reader._retired == []
+            assert reader.last_time == 49 * HOUR
+
+
+def test_rejects_other_files_and_mismatched_fields(path, tmp_path):
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"\0" * HEADER_SIZE)
+    with pytest.raises(ArchiveFormatError):
+        ArchiveReader(str(other))
+    with ArchiveWriter(path, FIELDS):
+        pass
+    with pytest.raises(ArchiveFormatError):
+        ArchiveWriter(path, ("time", "close"))
+
+
+def test_single_writer(path):
+    with ArchiveWriter(path, FIELDS):
+        with pytest.raises(BlockingIOError):
+            ArchiveWriter(path, FIELDS)
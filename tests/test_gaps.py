@@ -0,0 +1,32 @@
+from storage.archive import INTERVAL_MS, HistoryArchive
+from storage.gaps import GapRepairer, find_gaps
+
+
+WEEK = INTERVAL_MS["1w"]
+DAY = INTERVAL_MS["1d"]
+MONDAY = 4 * DAY                     # 1970-01-05, epoch-aligned weeks start on Thursday
+
+
+def test_find_gaps_interior_and_edges():
+    times = [0, 1, 2, 5, 6, 9]
+    gaps = find_gaps(times, 1, start=-2, end=11)
+    assert [(g.start, g.end, g.bars) for g in gaps] == [(-2, -1, 2), (3, 4, 2), (7, 8, 2), (10, 11, 2)]
+
+
+def test_weekly_trailing_gap_follows_monday_opens(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    start = MONDAY + 2800 * WEEK
+    with archive.writer("price", "BTC", "1w") as writer:
+        writer.append([{"time": start + i * WEEK, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0,
+                        "volume_usd": 1.0} for i in (0, 1, 3)])
+
+    # Wednesday of the week after the last stored one: that week is still open
+    until = start + 4 * WEEK + 2 * DAY
+    report = GapRepairer(archive).coverage_of("price", "BTC", "1w", until=until)
+    assert [(g.start, g.end) for g in report.gaps] == [(start + 2 * WEEK, start + 2 * WEEK)]
+
+    # Next Monday closes the last stored bar's successor, which is then missing
+    report = GapRepairer(archive).coverage_of("price", "BTC", "1w", until=start + 5 * WEEK)
+    assert [(g.start, g.end) for g in report.gaps] == [(start + 2 * WEEK, start + 2 * WEEK),
+                                                       (start + 4 * WEEK, start + 4 * WEEK)]
+    assert all((g.start - MONDAY) % WEEK == 0 for g in report.gaps)
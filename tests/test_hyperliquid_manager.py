@@ -0,0 +1,37 @@
+from managers import hyperliquid_manager
+from managers.hyperliquid_manager import HyperliquidManager, LocalOrderbook, TradeRing
+
+
+def consolidate(funding, market, now_ms=0, ring=None):
+    return HyperliquidManager._consolidate("BTC", market, funding, {}, {"volume_usd": 0}, {"open_interest_usd": 0.0},
+                                           LocalOrderbook(), ring or TradeRing(16), now_ms)
+
+
+def test_zero_values_are_not_replaced_by_market_data():
+    snapshot = consolidate({"funding_rate": 0.0},
+                           {"funding_rate": 0.0001, "open_interest_usd": 5e8, "volume_usd_24h": 1e9})
+    assert snapshot["funding_rate"] == 0.0
+    assert snapshot["open_interest_usd"] == 0.0
+    assert snapshot["volume_usd_24h"] == 0.0
+    assert consolidate({}, {"funding_rate": 0.0001})["funding_rate"] == 0.0001
+
+
+def test_trade_flow_ageing_out_is_not_a_change(monkeypatch):
+    manager = HyperliquidManager(symbols=["BTC"], max_workers=2)
+    ok = lambda data: (lambda **kwargs: {"code": "0", "data": data})
+    manager.market_data_service.fetch_data = ok([{"symbol": "BTC", "mark_price": 100.0}])
+    manager.funding_service.fetch_data = ok([{"symbol": "BTC", "funding_rate": 0.0}])
+    manager.liquidations_service.fetch_data = ok([])
+    manager.volume_service.fetch_data = ok([])
+    manager.open_interest_service.fetch_data = ok([])
+    manager.orderbook_service.fetch_data = ok({"bids": [[99.0, 1.0]], "asks": [[101.0, 1.0]], "time": 1})
+    manager.trades_service.fetch_data = ok([{"tid": 1, "price": 100.0, "size": 2.0, "side": "buy", "time": 1_000}])
+
+    with manager:
+        monkeypatch.setattr(hyperliquid_manager.time, "time", lambda: 1.0)
+        assert len(manager.refresh().diff.added) == 1
+        assert manager.get_snapshot("BTC")["buy_usd_1m"] == 200.0
+        monkeypatch.setattr(hyperliquid_manager.time, "time", lambda: 120.0)
+        update = manager.refresh()
+    assert manager.get_snapshot("BTC")["buy_usd_1m"] == 0.0
+    assert not update.diff.changed
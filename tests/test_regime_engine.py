@@ -0,0 +1,98 @@
+import math
+from array import array
+
+from managers.indicators_manager import IndicatorsManager
+from managers.regime_engine import DAY_MS, RegimeEngine
+
+
+class FakeLoader:
+    """Serves fixed histories per indicator; tests publish new days by appending to them"""
+
+    def __init__(self):
+        self.series = {"fear_greed": {}, "ahr999": {}, "nupl": {}, "coinbase_premium": {}}
+
+    def publish(self, indicator, day, value):
+        self.series[indicator][day * DAY_MS] = value
+
+    def load(self, names=None, force=False):
+        return {"fetched": [], "errors": {}}
+
+    def history(self, name, field=None):
+        points = sorted(self.series[name].items())
+        return array("q", (t for t, _ in points)), array("d", (v for _, v in points))
+
+
+def engine_for(loader, max_stale_days=3):
+    return RegimeEngine(loader=loader, manager=IndicatorsManager(loader=loader), max_stale_days=max_stale_days)
+
+
+def columns(engine):
+    return {"days": list(engine.days), "composite": list(engine.composite), "percentile": list(engine.percentile),
+            **{f"value:{name}": list(values) for name, values in engine.values.items()}}
+
+
+def rebuilt(engine):
+    fresh = engine_for(engine.loader, engine.max_stale_days)
+    fresh.update()
+    return columns(fresh)
+
+
+def same(left, right):
+    assert left.keys() == right.keys()
+    for key in left:
+        assert len(left[key]) == len(right[key]), key
+        for a, b in zip(left[key], right[key]):
+            assert (math.isnan(a) and math.isnan(b)) or a == b, key
+
+
+def test_lagging_daily_indicator_lands_on_its_own_day():
+    loader = FakeLoader()
+    for day in range(10):
+        loader.publish("fear_greed", day, 50.0)
+        loader.publish("ahr999", day, 1.0)
+        loader.publish("nupl", day, 0.6)
+        loader.publish("coinbase_premium", day, 0.1)
+    engine = engine_for(loader)
+    engine.update()
+
+    # The intraday premium moves the table two days ahead before the daily NUPL publishes
+    loader.publish("coinbase_premium", 10, 0.1)
+    loader.publish("coinbase_premium", 11, 0.1)
+    assert engine.update() == 2
+    loader.publish("nupl", 10, -0.1)
+    assert engine.update() == 0
+
+    assert engine.values["nupl"][10] == -0.1
+    assert engine.values["nupl"][11] == -0.1
+    same(columns(engine), rebuilt(engine))
+
+
+def test_incremental_updates_equal_rebuild():
+    loader = FakeLoader()
+    for day in range(30):
+        loader.publish("fear_greed", day, 10.0 + 3 * day)
+        loader.publish("ahr999", day, 0.3 + 0.05 * day)
+        if day % 4:
+            loader.publish("nupl", day, -0.2 + 0.04 * day)
+        loader.publish("coinbase_premium", day, (-1) ** day * 0.3 * day / 30)
+    engine = engine_for(loader, max_stale_days=2)
+    assert engine.update() == 30
+
+    # Revise the last days, publish new ones out of step and leave gaps longer than the carry window
+    loader.publish("fear_greed", 29, 90.0)
+    for day in range(30, 36):
+        loader.publish("coinbase_premium", day, -0.6)
+    engine.update()
+    same(columns(engine), rebuilt(engine))
+
+    for day in range(30, 33):
+        loader.publish("nupl", day, 0.8)
+        loader.publish("ahr999", day, 1.5)
+    engine.update()
+    same(columns(engine), rebuilt(engine))
+
+    loader.publish("fear_greed", 40, 5.0)
+    assert engine.update() == 5
+    same(columns(engine), rebuilt(engine))
+    assert engine.update() == 0
+    same(columns(engine), rebuilt(engine))
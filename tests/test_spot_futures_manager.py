@@ -0,0 +1,34 @@
+from managers.spot_futures_manager import SpotFuturesManager
+
+
+def snapshots(open_interest=100.0, spot_price=10.0):
+    return {
+        "spot": [{"symbol": "BTC", "current_price": spot_price, "volume_usd_24h": 50.0,
+                  "buy_volume_usd_24h": 30.0, "sell_volume_usd_24h": 20.0}],
+        "futures": [{"symbol": "BTC", "current_price": 10.5, "volume_usd_24h": 200.0,
+                     "open_interest_usd": open_interest}],
+    }
+
+
+def manager_serving(*rounds):
+    manager = SpotFuturesManager(include_pairs=False)
+    queue = list(rounds)
+    manager._fetch = lambda: queue.pop(0)
+    return manager
+
+
+def test_input_only_change_is_reported():
+    manager = manager_serving(snapshots(), snapshots(open_interest=999.0))
+    assert [r["symbol"] for r in manager.refresh().added] == ["BTC"]
+
+    diff = manager.refresh()
+    assert [r["open_interest"] for r in diff.changed] == [999.0]
+    assert manager.get_symbol("BTC")["open_interest"] == 999.0
+
+
+def test_derived_change_is_reported_once_and_unchanged_input_is_not():
+    manager = manager_serving(snapshots(), snapshots(spot_price=10.5), snapshots(spot_price=10.5))
+    manager.refresh()
+    diff = manager.refresh()
+    assert len(diff.changed) == 1 and diff.changed[0]["basis_pct"] == 0.0
+    assert manager.refresh().changed == []